@@ -8,7 +8,11 @@ root_path = next(
 if root_path:
     sys.path.insert(0, str(root_path))
 
-from utils.data_loading import load_tohlcv_from_csv, convert_tohlcv_numpy
+from utils.data_loading import (
+    load_tohlcv_from_csv,
+    convert_tohlcv_numpy,
+    get_synthetic_tohlcv,
+)
 from utils.config_utils import get_dtype_dict
 import pytest
 
@@ -36,3 +40,12 @@ def np_data(df_data, dtype_dict):
     将 df_data 转换为 NumPy 格式并提供，用于模块内的所有测试。
     """
     return convert_tohlcv_numpy(df_data, dtype_dict=dtype_dict)
+
+
+@pytest.fixture(scope="module")
+def synthetic_np_data(dtype_dict):
+    """
+    随机游走生成的 OHLCV 数据, 不依赖 database 下的 csv 文件, 用于测试引擎自身的一致性。
+    和基准测试使用同一个生成函数 get_synthetic_tohlcv。
+    """
+    return get_synthetic_tohlcv(2000, dtype_dict)
@@ -164,3 +164,51 @@ def test_pandas_ta_and_talib_sma_same(
             bbands_name,
             f"period {bbands_period} std_mult {bbands_std_mult}",
         )
+
+
+def test_rolling_same_as_exact(np_data, dtype_dict, assert_func=assert_indicator_same):
+    """
+    比较 O(n) 滑动窗口 bbands (rolling=1) 和逐窗口精确 bbands (rolling=0) 的结果是否相同。
+    两种算法放在同一波并发里, config 0 用精确版本, config 1 用滑动窗口版本。
+    """
+    params_array = [[10, 2.0], [50, 2.5], [200, 3.0]]
+
+    for p in params_array:
+        bbands_period = p[0]
+        bbands_std_mult = p[1]
+
+        params = get_params(
+            num=2,
+            indicator_update={
+                bbands_name: [
+                    [bbands_period, bbands_std_mult, 0],
+                    [bbands_period, bbands_std_mult, 1],
+                ],
+            },
+            indicator_enabled={bbands_name: True},
+            dtype_dict=dtype_dict,
+        )
+
+        result = entry_func(
+            "njit",
+            np_data,
+            params["indicator_params"],
+            params["indicator_enabled"],
+            params["signal_params"],
+            params["backtest_params"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=False,
+        )
+
+        # indicator_result 按去重后的参数行存储, 用 indicator_index 找到每个 config 对应的行
+        exact_row, rolling_row = result["indicator_index"][:, bbands_id]
+        for col in range(3):
+            exact_result = result["indicator_result"][bbands_id][exact_row][:, col]
+            rolling_result = result["indicator_result"][bbands_id][rolling_row][:, col]
+
+            assert_func(
+                exact_result,
+                rolling_result,
+                bbands_name,
+                f"period {bbands_period} std_mult {bbands_std_mult} col {col}",
+            )
@@ -104,3 +104,41 @@ def test_pandas_ta_and_talib_sma_same(
         talib_sma = ta.sma(close_series, length=int(sma_period), talib=True)
 
         assert_func(pandas_sma, talib_sma, sma_name, f"period {sma_period}")
+
+
+def test_rolling_same_as_exact(np_data, dtype_dict, assert_func=assert_indicator_same):
+    """
+    比较 O(n) 滑动窗口 sma (rolling=1) 和逐窗口精确 sma (rolling=0) 的结果是否相同。
+    两种算法放在同一波并发里, config 0 用精确版本, config 1 用滑动窗口版本。
+    """
+    params_array = [[10], [50], [200]]
+
+    for p in params_array:
+        sma_period = p[0]
+
+        params = get_params(
+            num=2,
+            indicator_update={
+                sma_name: [[sma_period, 0], [sma_period, 1]],
+            },
+            indicator_enabled={sma_name: True},
+            dtype_dict=dtype_dict,
+        )
+
+        result = entry_func(
+            "njit",
+            np_data,
+            params["indicator_params"],
+            params["indicator_enabled"],
+            params["signal_params"],
+            params["backtest_params"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=False,
+        )
+
+        # indicator_result 按去重后的参数行存储, 用 indicator_index 找到每个 config 对应的行
+        exact_row, rolling_row = result["indicator_index"][:, sma_id]
+        exact_result = result["indicator_result"][sma_id][exact_row][:, 0]
+        rolling_result = result["indicator_result"][sma_id][rolling_row][:, 0]
+
+        assert_func(exact_result, rolling_result, sma_name, f"period {sma_period}")
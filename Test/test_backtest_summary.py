@@ -0,0 +1,157 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+from src.optimizer import backtest_params_name
+from src.backtest.calculate_summary import backtest_summary_name
+
+
+def test_summary_only_same_as_full(synthetic_np_data, dtype_dict):
+    """
+    summary_only 模式只分配 slot_count 份工作缓冲区,
+    每个 config 的 backtest_summary 要和完整模式的结果相同。
+    """
+    num = 7
+    sma_periods = [10, 20, 30, 10, 20, 30, 40]
+
+    params = get_params(
+        num=num,
+        indicator_update={"sma": [[i] for i in sma_periods]},
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+
+    full_result = entry_func(*args, dtype_dict=dtype_dict, reuse_outputs=False)
+    summary_result = entry_func(
+        *args,
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        summary_only=True,
+        slot_count=3,
+    )
+
+    assert list(summary_result.keys()) == ["backtest_summary"]
+    backtest_summary = summary_result["backtest_summary"]
+    assert backtest_summary.shape == (num, len(backtest_summary_name))
+
+    np.testing.assert_array_equal(backtest_summary, full_result["backtest_summary"])
+
+    balance_col = 4
+    for idx in range(num):
+        final_balance = full_result["backtest_result"][idx][-1, balance_col]
+        assert (
+            backtest_summary[idx, backtest_summary_name.index("final_balance")]
+            == final_balance
+        )
+
+
+def test_prune_on_drawdown_limit(synthetic_np_data, dtype_dict):
+    """
+    回撤超过 max_drawdown_limit 后停止回测, 已计算的k线和不终止时相同。
+    """
+    indicator_update = {"sma": [[10], [10]], "sma2": [[30], [30]]}
+    params = get_params(num=2, indicator_update=indicator_update, dtype_dict=dtype_dict)
+    base = entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+    drawdown_col = 5
+    max_drawdown = np.nanmax(base["backtest_result"][0][:, drawdown_col])
+    assert max_drawdown > 0
+
+    limit = max_drawdown / 2
+    params = get_params(
+        num=2,
+        indicator_update=indicator_update,
+        backtest_params={"max_drawdown_limit": limit},
+        dtype_dict=dtype_dict,
+    )
+    # 第二个 config 不启用提前终止
+    params["backtest_params"][1, backtest_params_name.index("max_drawdown_limit")] = 0.0
+    result = entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+
+    pruned_col = backtest_summary_name.index("pruned")
+    summary = result["backtest_summary"]
+    assert summary[0, pruned_col] == 1
+    assert summary[1, pruned_col] == 0
+    np.testing.assert_array_equal(summary[1], base["backtest_summary"][1])
+
+    drawdown = base["backtest_result"][0][:, drawdown_col]
+    end = np.argmax(drawdown > limit) + 1
+    np.testing.assert_array_equal(
+        result["backtest_result"][0][:end], base["backtest_result"][0][:end]
+    )
+    assert np.isnan(result["backtest_result"][0][end:, drawdown_col]).all()
+    assert summary[0, backtest_summary_name.index("max_drawdown")] > limit
+
+
+def test_metrics_match_numpy(synthetic_np_data, dtype_dict):
+    """
+    内核中一次循环算出的风险收益指标要和用 numpy 从逐k线结果计算的相同。
+    """
+    params = get_params(
+        num=1,
+        indicator_update={"sma": [[10]], "sma2": [[30]]},
+        dtype_dict=dtype_dict,
+    )
+    result = entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+    summary = dict(zip(backtest_summary_name, result["backtest_summary"][0]))
+    backtest_result = result["backtest_result"][0]
+    position_status = backtest_result[:, 0]
+    equity = backtest_result[:, 3]
+    balance = backtest_result[:, 4]
+
+    time_arr = synthetic_np_data[:, 0]
+    bars_per_year = (
+        365 * 24 * 3600 * 1000 * (len(time_arr) - 1) / (time_arr[-1] - time_arr[0])
+    )
+    returns = equity[1:] / equity[:-1] - 1
+    total_return = equity[-1] / equity[0] - 1
+    annual_return = (1 + total_return) ** (bars_per_year / (len(equity) - 1)) - 1
+    sharpe = returns.mean() / returns.std(ddof=1) * np.sqrt(bars_per_year)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    sortino = returns.mean() / downside * np.sqrt(bars_per_year)
+
+    closed = np.isin(position_status[1:], (3, -3, 4, -4))
+    pnl = np.diff(balance)[closed]
+    profit_factor = pnl[pnl > 0].sum() / -pnl[pnl <= 0].sum()
+
+    np.testing.assert_allclose(summary["total_return"], total_return)
+    np.testing.assert_allclose(summary["annual_return"], annual_return)
+    np.testing.assert_allclose(summary["sharpe"], sharpe)
+    np.testing.assert_allclose(summary["sortino"], sortino)
+    np.testing.assert_allclose(
+        summary["calmar"], annual_return / summary["max_drawdown"]
+    )
+    np.testing.assert_allclose(summary["profit_factor"], profit_factor)
@@ -0,0 +1,65 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+from src.batch_interface import concat_tohlcv, entry_func_batch, get_symbol_output
+
+
+def test_batch_matches_entry_func(synthetic_np_data, dtype_dict):
+    """
+    多品种批量计算的每个品种的结果和单独调用 entry_func 完全相同, 品种的k线数量不同。
+    """
+    tohlcv_list = [
+        synthetic_np_data[:700],
+        synthetic_np_data[300:650],
+        synthetic_np_data[1000:1900],
+    ]
+    tohlcv, offsets = concat_tohlcv(tohlcv_list, dtype_dict)
+    params = get_params(
+        num=3,
+        indicator_update={
+            "sma": [[10, 1], [14, 0], [10, 1]],
+            "bbands": [[14, 2.0, 0], [20, 2.0, 1], [14, 2.0, 0]],
+        },
+        indicator_enabled={"bbands": True, "atr": True, "psar": True},
+        indicator_enabled2={"bbands": True, "psar": True},
+        backtest_params={
+            "pct_sl_enable": True,
+            "pct_tp_enable": True,
+            "psar_enable": True,
+        },
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        tohlcv2_multiple=4,
+        dtype_dict=dtype_dict,
+        max_trades=4,
+    )
+    batch = entry_func_batch("njit", tohlcv, offsets, *args, slot_count=4, **kwargs)
+    summary = entry_func_batch(
+        "njit", tohlcv, offsets, *args, summary_only=True, **kwargs
+    )
+    assert batch["backtest_summary"].shape[:2] == (3, 3)
+
+    for s, _tohlcv in enumerate(tohlcv_list):
+        result = entry_func("njit", _tohlcv, *args, reuse_outputs=False, **kwargs)
+        output = get_symbol_output(batch, s)
+        for k, v in output.items():
+            if isinstance(v, tuple):
+                for a, b in zip(v, result[k]):
+                    assert np.array_equal(a, b, equal_nan=True), k
+            else:
+                assert np.array_equal(v, result[k], equal_nan=True), k
+
+        output = get_symbol_output(summary, s)
+        assert "backtest_result" not in output
+        for k in ["backtest_summary", "trade_result", "trade_count"]:
+            assert np.array_equal(output[k], result[k], equal_nan=True), k
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from Test.conftest import synthetic_np_data
+from utils.config_utils import get_dtype_dict, perpare_data
+from utils.data_loading import (
+    tohlcv_name,
+    load_tohlcv_from_csv,
+    convert_tohlcv_numpy,
+    load_tohlcv_numpy,
+    get_tohlcv_cache_path,
+    convert_tohlcv_dataframe,
+)
+
+
+@pytest.mark.parametrize("enable64", [True, False])
+def test_cache_same_as_csv(synthetic_np_data, tmp_path, enable64):
+    """
+    二进制缓存加载的结果, 形状和 dtype 都要和直接解析 csv 相同,
+    csv 变化后缓存要失效。
+    """
+    dtype_dict = get_dtype_dict(enable64)
+    csv_path = tmp_path / "data.csv"
+    pd.DataFrame(synthetic_np_data, columns=tohlcv_name).to_csv(csv_path, index=False)
+
+    for data_size in [None, 100]:
+        expected = convert_tohlcv_numpy(
+            load_tohlcv_from_csv(csv_path, data_size, dtype_dict), dtype_dict
+        )
+        # 第一次写入缓存, 第二次读取缓存
+        for _ in range(2):
+            result = load_tohlcv_numpy(csv_path, data_size, dtype_dict)
+            assert result.dtype == expected.dtype
+            assert result.flags["C_CONTIGUOUS"]
+            np.testing.assert_array_equal(result, expected)
+
+    data_path, meta_path = get_tohlcv_cache_path(csv_path, dtype_dict)
+    assert data_path.is_file() and meta_path.is_file()
+
+    pd.DataFrame(synthetic_np_data[:50], columns=tohlcv_name).to_csv(
+        csv_path, index=False
+    )
+    result = load_tohlcv_numpy(csv_path, None, dtype_dict)
+    assert result.shape == (50, len(tohlcv_name))
+
+
+def test_cached_dataframe_keeps_index(synthetic_np_data, tmp_path):
+    """
+    通过缓存加载的 DataFrame 和直接解析 csv 的 index 相同, 取最后 data_size 行时也是 csv 中的行号,
+    但是只有 tohlcv 和 date 列, csv 的其他列不保留。
+    """
+    dtype_dict = get_dtype_dict(True)
+    csv_path = tmp_path / "data.csv"
+    df = pd.DataFrame(synthetic_np_data, columns=tohlcv_name)
+    df["extra"] = np.arange(len(df))
+    df.to_csv(csv_path, index=False)
+
+    for data_size in [None, 100]:
+        expected = load_tohlcv_from_csv(csv_path, data_size, dtype_dict)
+        result, _ = perpare_data(csv_path, data_size, dtype_dict, use_cache=True)
+        pd.testing.assert_index_equal(result.index, expected.index)
+        assert "extra" in expected.columns and "extra" not in result.columns
+        pd.testing.assert_frame_equal(result, expected.drop(columns="extra"))
+
+    result = convert_tohlcv_dataframe(synthetic_np_data[:3], start=5)
+    assert result.index.tolist() == [5, 6, 7]
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.distributed import (
+    DistributedExecutor,
+    LocalTransport,
+    parse_cpulist,
+    get_numa_cpus,
+)
+from src.interface import entry_func
+from src.optimizer import run_sweep
+
+
+def test_parse_cpulist():
+    assert parse_cpulist("0-3,8-9,12\n") == [0, 1, 2, 3, 8, 9, 12]
+    assert parse_cpulist("") == []
+    assert all(len(cpus) > 0 for cpus in get_numa_cpus())
+
+
+def test_distributed_matches_entry_func(synthetic_np_data, dtype_dict):
+    """
+    拆分到多个 worker 进程计算并合并的统计量和交易记录, 和在当前进程中调用 entry_func 相同。
+    """
+    tohlcv = synthetic_np_data[:2000]
+    num = 9
+    params = get_params(
+        num=num,
+        indicator_update={"sma": [[5 + i, i % 2] for i in range(num)]},
+        indicator_enabled={"bbands": True},
+        backtest_params={"pct_sl_enable": True, "pct_tp_enable": True},
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        tohlcv2_multiple=4,
+        dtype_dict=dtype_dict,
+        max_trades=3,
+    )
+    result = entry_func(*args, summary_only=True, reuse_outputs=False, **kwargs)
+
+    cpu = sorted(os.sched_getaffinity(0))[0] if hasattr(os, "sched_getaffinity") else 0
+    for share in ["shm", "npy"]:
+        transport = LocalTransport(cpu_sets=[[cpu], [cpu]], share=share)
+        with DistributedExecutor(transport) as executor:
+            merged = executor.run(*args, chunk_count=3, **kwargs)
+            assert list(merged["bounds"]) == [0, 3, 6, 9]
+            for k in ["backtest_summary", "trade_result", "trade_count"]:
+                assert np.array_equal(merged[k], result[k], equal_nan=True), k
+
+            # worker 在多次调用之间保持运行
+            sweep = run_sweep(
+                "njit",
+                tohlcv,
+                {"sma": [[5, 10, 20]]},
+                top_k=2,
+                batch_size=2,
+                dtype_dict=dtype_dict,
+                executor=executor,
+            )
+            expected = run_sweep(
+                "njit",
+                tohlcv,
+                {"sma": [[5, 10, 20]]},
+                top_k=2,
+                batch_size=2,
+                dtype_dict=dtype_dict,
+            )
+            assert sweep["configs"] == expected["configs"]
+            assert np.array_equal(
+                sweep["backtest_summary"], expected["backtest_summary"], equal_nan=True
+            )
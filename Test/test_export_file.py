@@ -0,0 +1,87 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.export_file import export_columnar, load_columnar
+from utils.precision_utils import get_precision_columns
+from src.interface import entry_func
+from src.calculate_signals import signal_result_name
+from src.backtest.calculate_backtest import backtest_result_name
+from src.backtest.calculate_summary import backtest_summary_name
+
+
+def test_export_columnar_roundtrip(tmp_path, synthetic_np_data, dtype_dict):
+    """
+    列存导出后按 config_idx 取出的每一列和 entry_func 的输出相同, 读取是只读的内存映射。
+    """
+    tohlcv = synthetic_np_data[:500]
+    params = get_params(
+        num=4,
+        indicator_update={"sma": [[5, 0], [10, 0], [5, 0], [20, 1]]},
+        indicator_enabled={"bbands": True},
+        backtest_params={"pct_sl_enable": True},
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+    result = entry_func(*args, **kwargs)
+    columns = get_precision_columns(result)
+
+    config_idx = [3, 1, 2]
+    manifest = export_columnar(tmp_path, result, config_idx=config_idx)
+    tables = load_columnar(tmp_path)
+
+    assert manifest["config_count"] == 3
+    assert np.array_equal(tables["tohlcv"]["close"], tohlcv[:, 4])
+    assert isinstance(tables["backtest"]["equity"], np.memmap)
+    assert not tables["backtest"]["equity"].flags.writeable
+    rows = tohlcv.shape[0]
+    assert tables["signal"]["config_idx"].shape == (rows * 3,)
+
+    for n, c in enumerate(config_idx):
+        block = slice(n * rows, (n + 1) * rows)
+        for table in ["indicator", "indicator2", "signal", "backtest"]:
+            assert np.all(tables[table]["config_idx"][block] == c)
+        for name in ["sma", "bbands_middle"]:
+            assert np.array_equal(
+                tables["indicator"][name][block],
+                columns[f"indicator:{name}"][c],
+                equal_nan=True,
+            )
+        for col, name in enumerate(signal_result_name):
+            assert np.array_equal(
+                tables["signal"][name][block], result["signal_result"][c, :, col]
+            )
+        for col, name in enumerate(backtest_result_name):
+            assert np.array_equal(
+                tables["backtest"][name][block],
+                result["backtest_result"][c, :, col],
+                equal_nan=True,
+            )
+        for col, name in enumerate(backtest_summary_name):
+            assert np.array_equal(
+                tables["summary"][name][n : n + 1],
+                result["backtest_summary"][c, col : col + 1],
+                equal_nan=True,
+            )
+
+    # summary_only 时没有每根k线的回测结果, pack_signals 时信号从 signal_bits 展开
+    packed = entry_func(*args, summary_only=True, pack_signals=True, **kwargs)
+    export_columnar(tmp_path / "summary", packed, rows=rows)
+    tables = load_columnar(tmp_path / "summary", tables=["signal", "summary"])
+    assert set(tables) == {"signal", "summary"}
+    assert np.array_equal(
+        tables["signal"]["enter_long"].reshape(4, rows),
+        result["signal_result"][:, :, 0],
+    )
@@ -0,0 +1,76 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+
+from src.indicators.indicators_wrapper import indicators_spec
+
+sma_id = indicators_spec["sma"]["id"]
+sma2_id = indicators_spec["sma2"]["id"]
+
+
+def test_dedup_same_as_private(synthetic_np_data, dtype_dict):
+    """
+    相同参数的指标只计算一次, 每个 config 通过 indicator_index 取到的结果,
+    要和每个 config 单独运行的结果相同。
+    """
+    num = 6
+    sma_periods = [10, 20, 10, 20, 10, 30]
+    sma2_periods = [50, 50, 50, 50, 50, 50]
+
+    params = get_params(
+        num=num,
+        indicator_update={
+            "sma": [[i] for i in sma_periods],
+            "sma2": [[i] for i in sma2_periods],
+        },
+        dtype_dict=dtype_dict,
+    )
+
+    result = entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+
+    indicator_index = result["indicator_index"]
+    assert result["indicator_result"][sma_id].shape[0] == len(set(sma_periods))
+    assert result["indicator_result"][sma2_id].shape[0] == len(set(sma2_periods))
+
+    for idx in range(num):
+        single_params = get_params(
+            num=1,
+            indicator_update={
+                "sma": [[sma_periods[idx]]],
+                "sma2": [[sma2_periods[idx]]],
+            },
+            dtype_dict=dtype_dict,
+        )
+        single_result = entry_func(
+            "njit",
+            synthetic_np_data,
+            single_params["indicator_params"],
+            single_params["indicator_enabled"],
+            single_params["signal_params"],
+            single_params["backtest_params"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=False,
+        )
+
+        for _id in (sma_id, sma2_id):
+            np.testing.assert_array_equal(
+                result["indicator_result"][_id][indicator_index[idx, _id]],
+                single_result["indicator_result"][_id][0],
+            )
+
+        np.testing.assert_array_equal(
+            result["signal_result"][idx], single_result["signal_result"][0]
+        )
+        np.testing.assert_array_equal(
+            result["backtest_result"][idx], single_result["backtest_result"][0]
+        )
@@ -0,0 +1,96 @@
+import pytest
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params, get_mapping_data
+from src.signal.signal_tool import map_timeframe
+from src.interface import entry_func
+
+
+def _resample(data, n):
+    """
+    每 n 根k线合成一根大周期k线, 只用来构造测试数据。
+    """
+    rows = len(data) // n * n
+    group = data[:rows].reshape(-1, n, data.shape[1])
+    return np.ascontiguousarray(
+        np.stack(
+            [
+                group[:, 0, 0],
+                group[:, 0, 1],
+                group[:, :, 2].max(axis=1),
+                group[:, :, 3].min(axis=1),
+                group[:, -1, 4],
+                group[:, :, 5].sum(axis=1),
+            ],
+            axis=1,
+        )
+    )
+
+
+def test_mapping_data_no_lookahead(synthetic_np_data, dtype_dict):
+    """
+    每根k线映射到最后一根已收盘的大周期k线,
+    大周期k线收盘价等于它最后一根小周期k线的收盘价, 可以用来检查没有未来函数。
+    """
+    n = 4
+    data2 = _resample(synthetic_np_data, n)
+    mapping_data = get_mapping_data(synthetic_np_data, data2, dtype_dict)
+
+    assert mapping_data.dtype == dtype_dict["np"]["int"]
+    assert mapping_data.shape == (synthetic_np_data.shape[0],)
+
+    for i in range(len(mapping_data)):
+        j = mapping_data[i]
+        # 第 j 根大周期k线在第 (j + 1) * n - 1 根小周期k线收盘
+        expected = (i + 1) // n - 1
+        assert j == min(expected, len(data2) - 1)
+        if j >= 0:
+            assert (j + 1) * n - 1 <= i
+
+    output = np.empty(len(mapping_data), dtype=dtype_dict["np"]["float"])
+    map_timeframe(data2[:, 4], mapping_data, output)
+    assert np.isnan(output[: n - 1]).all()
+    for i in range(n - 1, len(output)):
+        j = mapping_data[i]
+        assert output[i] == synthetic_np_data[(j + 1) * n - 1, 4]
+
+
+def test_mapping_data_same_timeframe(synthetic_np_data, dtype_dict):
+    mapping_data = get_mapping_data(synthetic_np_data, synthetic_np_data, dtype_dict)
+    np.testing.assert_array_equal(mapping_data, np.arange(len(synthetic_np_data)))
+
+
+def test_mapping_data_single_bar(synthetic_np_data, dtype_dict):
+    """
+    只有一根大周期k线时无法推断周期, 不能当作 0 (开盘就可见), 需要传入 interval_ms2。
+    """
+    n = 4
+    data2 = _resample(synthetic_np_data[:n], n)
+    with pytest.raises(ValueError):
+        get_mapping_data(synthetic_np_data[:n], data2, dtype_dict)
+
+    mapping_data = get_mapping_data(
+        synthetic_np_data[:n], data2, dtype_dict, interval_ms2=n * 15 * 60 * 1000
+    )
+    np.testing.assert_array_equal(mapping_data, [-1, -1, -1, 0])
+
+
+@pytest.mark.parametrize("rows, min_rows", [(300, 1), (1, 0)])
+def test_entry_func_without_tohlcv2(synthetic_np_data, dtype_dict, rows, min_rows):
+    """
+    没有传入 tohlcv2 时不推断k线周期, min_rows > 0 (tohlcv2 只有一根k线) 和一根k线的输入都可以运行。
+    """
+    params = get_params(num=2, dtype_dict=dtype_dict)
+    result = entry_func(
+        "njit",
+        synthetic_np_data[:rows],
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        min_rows=min_rows,
+    )
+    np.testing.assert_array_equal(result["mapping_data"], np.zeros(rows))
+    assert result["backtest_result"].shape[:2] == (2, rows)
@@ -0,0 +1,41 @@
+import pytest
+from utils.json_tool import (
+    numba_config_env,
+    read_numba_config,
+    write_numba_config,
+    load_numba_config,
+)
+from utils.numba_params import nb_params
+
+
+def test_config_from_environ():
+    environ = {}
+    write_numba_config(
+        mode="cuda",
+        cache=False,
+        enable64=False,
+        max_registers=32,
+        lazy=False,
+        profile=True,
+        environ=environ,
+    )
+    assert read_numba_config(environ) == {
+        "mode": "cuda",
+        "cache": False,
+        "enable64": False,
+        "max_registers": 32,
+        "lazy": False,
+        "profile": True,
+    }
+
+
+def test_load_after_import(monkeypatch):
+    """
+    utils.numba_params 已经导入后, 只允许用相同的配置初始化。
+    """
+    for k, v in nb_params.items():
+        monkeypatch.setenv(numba_config_env[k], str(v))
+
+    assert load_numba_config(**nb_params) == nb_params
+    with pytest.raises(RuntimeError):
+        load_numba_config(**{**nb_params, "enable64": not nb_params["enable64"]})
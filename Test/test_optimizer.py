@@ -0,0 +1,103 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+from src.optimizer import (
+    run_sweep,
+    get_sweep_dims,
+    iter_grid_configs,
+    get_sweep_batch_size,
+)
+from src.backtest.calculate_backtest import default_backtest_params
+from src.backtest.calculate_summary import backtest_summary_name
+from src.backtest.calculate_trades import trade_result_count
+
+
+def test_sweep_top_k_same_as_full_run(synthetic_np_data, dtype_dict):
+    """
+    分批搜索的 top_k, 要和一次性运行全部组合后排序的结果相同。
+    """
+    indicator_ranges = {"sma": [[5, 10, 20]], "sma2": [[30, 60]]}
+    backtest_ranges = {"atr_sl_multiplier": [1.0, 2.0]}
+    top_k = 4
+
+    result = run_sweep(
+        "njit",
+        synthetic_np_data,
+        indicator_ranges,
+        backtest_ranges,
+        top_k=top_k,
+        batch_size=5,
+        dtype_dict=dtype_dict,
+    )
+    assert result["evaluated"] == 12
+    assert len(result["configs"]) == top_k
+
+    dims = get_sweep_dims(indicator_ranges, backtest_ranges)
+    configs = list(iter_grid_configs(dims))
+    params = get_params(
+        num=len(configs),
+        indicator_update={
+            "sma": [[c[0]] for c in configs],
+            "sma2": [[c[1]] for c in configs],
+        },
+        dtype_dict=dtype_dict,
+    )
+    col = list(default_backtest_params.keys()).index("atr_sl_multiplier")
+    params["backtest_params"][:, col] = [c[2] for c in configs]
+    full = entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        summary_only=True,
+    )
+    metric = full["backtest_summary"][:, backtest_summary_name.index("final_balance")]
+    order = np.argsort(-metric, kind="stable")[:top_k]
+
+    np.testing.assert_array_equal(result["metric"], metric[order])
+    for i, idx in enumerate(order):
+        config = result["configs"][i]
+        assert config["indicator"]["sma"][0] == configs[idx][0]
+        assert config["indicator"]["sma2"][0] == configs[idx][1]
+        assert config["backtest"]["atr_sl_multiplier"] == configs[idx][2]
+
+
+def test_random_sweep_count(synthetic_np_data, dtype_dict):
+    result = run_sweep(
+        "njit",
+        synthetic_np_data,
+        {"sma": [[5, 10, 20, 40]]},
+        method="random",
+        n_samples=7,
+        seed=0,
+        metric="max_drawdown",
+        ascending=True,
+        top_k=3,
+        batch_size=3,
+        dtype_dict=dtype_dict,
+    )
+    assert result["evaluated"] == 7
+    assert len(result["configs"]) == 3
+    assert np.all(np.diff(result["metric"]) >= 0)
+
+
+def test_batch_size_includes_trades(dtype_dict):
+    """
+    max_trades > 0 时每个 config 的内存还包括 trade_result 和 trade_count。
+    """
+    params = get_params(num=1, dtype_dict=dtype_dict)
+    args = (1000, 1000, params["indicator_enabled"], params["indicator_enabled2"])
+    budget = 64 * 1024 * 1024
+    batch_size = get_sweep_batch_size(*args, budget, dtype_dict)
+    per_config = budget // batch_size
+
+    max_trades = 1000
+    trade_bytes = max_trades * trade_result_count * 8 + 8
+    batch_size_trades = get_sweep_batch_size(*args, budget, dtype_dict, max_trades)
+    assert batch_size_trades < batch_size
+    assert batch_size_trades == budget // (per_config + trade_bytes)
@@ -0,0 +1,84 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.numba_unpack import ArraySpec
+from utils.outputs_global import OutputsCache, get_spec_key, get_spec_nbytes
+from utils.outputs_global import clear_outputs_cache, get_outputs_cache_stats
+from src.interface import entry_func
+
+
+def _spec(rows, cols):
+    return (ArraySpec((rows, cols), np.float64), (ArraySpec((rows,), np.bool_),))
+
+
+def test_lru_hits_views_and_evictions():
+    key = get_spec_key(_spec(10, 3))
+    nbytes = get_spec_nbytes(key)
+    assert nbytes == 10 * 3 * 8 + 10
+
+    cache = OutputsCache(max_bytes=nbytes * 2)
+    outputs = (np.zeros((10, 3)), (np.zeros(10, dtype=np.bool_),))
+
+    assert cache.acquire("njit", key) == (None, None)
+    cache.release("njit", (key, outputs))
+
+    # 形状相同, 直接命中, 取出后在放回之前不会被再次取到
+    hit, handle = cache.acquire("njit", key)
+    assert hit is outputs
+    assert cache.acquire("njit", key) == (None, None)
+    cache.release("njit", handle)
+
+    # 更小的形状, 复用切片视图, 放回的是完整的数组
+    view, handle = cache.acquire("njit", get_spec_key(_spec(4, 2)))
+    assert view[0].shape == (4, 2) and view[1][0].shape == (4,)
+    assert np.shares_memory(view[0], outputs[0])
+    assert handle[1] is outputs
+    cache.release("njit", handle)
+
+    # 更大的形状和不同的 mode 不能复用
+    assert cache.acquire("njit", get_spec_key(_spec(11, 3))) == (None, None)
+    assert cache.acquire("cuda", key) == (None, None)
+
+    # 超过字节数上限时淘汰最久没有使用的
+    for _ in range(2):
+        cache.release("njit", (key, outputs))
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["nbytes"] <= stats["max_bytes"]
+    assert (stats["hits"], stats["view_hits"]) == (1, 1)
+
+
+def test_entry_func_view_reuse(synthetic_np_data, dtype_dict):
+    """
+    conf_count 变小时复用上一次更大的结果数组的视图, 结果和重新分配时相同。
+    """
+    clear_outputs_cache()
+
+    def run(num, reuse_outputs):
+        params = get_params(
+            num=num,
+            indicator_update={"sma": [[10 + i] for i in range(num)]},
+            dtype_dict=dtype_dict,
+        )
+        result = entry_func(
+            "njit",
+            synthetic_np_data,
+            params["indicator_params"],
+            params["indicator_enabled"],
+            params["signal_params"],
+            params["backtest_params"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=reuse_outputs,
+            slot_count=1,
+        )
+        return {k: v.copy() for k, v in result.items() if isinstance(v, np.ndarray)}
+
+    run(5, True)
+    before = get_outputs_cache_stats()["view_hits"]
+    reused = run(3, True)
+    assert get_outputs_cache_stats()["view_hits"] == before + 1
+
+    fresh = run(3, False)
+    for key in ["signal_result", "backtest_result", "backtest_summary"]:
+        np.testing.assert_array_equal(reused[key], fresh[key])
@@ -0,0 +1,83 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.outputs_file import load_outputs_file
+from utils.profile_utils import TimingReport
+from src.interface import entry_func
+
+
+def test_output_dir_chunks_match_in_memory(tmp_path, synthetic_np_data, dtype_dict):
+    """
+    结果写入内存映射文件并分块计算时, 结果和在内存中一次计算完全相同, 之后可以从文件读取。
+    """
+    tohlcv = synthetic_np_data[:600]
+    num = 7
+    params = get_params(
+        num=num,
+        indicator_update={
+            "sma": [[5 + i, i % 2] for i in range(num)],
+            "bbands": [[10 + 2 * i, 2.0, 0] for i in range(num)],
+        },
+        indicator_enabled={"bbands": True, "atr": True},
+        indicator_enabled2={"psar": True},
+        backtest_params={"pct_sl_enable": True, "pct_tp_enable": True},
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        tohlcv2_multiple=4,
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        max_trades=3,
+        slot_count=2,
+    )
+    result = entry_func(*args, **kwargs)
+
+    report = TimingReport()
+    # 每块只能放下一个 config, 块大小取工作线程数
+    chunked = entry_func(
+        *args, output_dir=tmp_path, working_set_bytes=1, report=report, **kwargs
+    )
+    assert report.chunk_count == 4
+
+    loaded = load_outputs_file(tmp_path)
+    for output in [chunked, loaded]:
+        for k in [
+            "indicator_result",
+            "indicator_result2",
+            "signal_result",
+            "backtest_result",
+            "backtest_summary",
+            "trade_result",
+            "trade_count",
+            "indicator_index",
+        ]:
+            if isinstance(result[k], tuple):
+                for a, b in zip(output[k], result[k]):
+                    assert np.array_equal(a, b, equal_nan=True), k
+            else:
+                assert np.array_equal(output[k], result[k], equal_nan=True), k
+    assert np.array_equal(loaded["backtest_params"], params["backtest_params"])
+    assert not loaded["backtest_result"].flags.writeable
+
+    # summary_only 时逐k线的数组是工作缓冲区, 不写文件
+    summary = entry_func(
+        *args, output_dir=tmp_path / "summary", summary_only=True, **kwargs
+    )
+    loaded = load_outputs_file(tmp_path / "summary")
+    assert "backtest_result" not in loaded
+    assert np.array_equal(
+        loaded["backtest_summary"], result["backtest_summary"], equal_nan=True
+    )
+    assert np.array_equal(
+        summary["backtest_summary"], result["backtest_summary"], equal_nan=True
+    )
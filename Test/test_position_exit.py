@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+from src.backtest.calculate_backtest import (
+    default_backtest_params,
+    backtest_result_name,
+)
+
+backtest_params_name = list(default_backtest_params.keys())
+exit_enable_name = [k for k in backtest_params_name if k.endswith("_enable")]
+
+
+@pytest.mark.parametrize(
+    "enable_name, price_name, sign",
+    [
+        ("pct_sl_enable", "pct_sl", 1),
+        ("pct_tp_enable", "pct_tp", -1),
+        ("atr_sl_enable", "atr_sl_price", 1),
+    ],
+)
+def test_short_exit_without_psar(
+    synthetic_np_data, dtype_dict, enable_name, price_name, sign
+):
+    """
+    只启用一个止盈止损条件 (不启用 psar) 时, 空头持仓满足条件的k线产生离场信号,
+    下一根k线不再继续持有这笔空头。
+    """
+    params = get_params(
+        num=1,
+        indicator_update={"sma": [[10, 0]], "sma2": [[30, 0]]},
+        dtype_dict=dtype_dict,
+    )
+    # 信号模板的 exit_control 会覆盖 get_params 的开关, 直接修改 backtest_params
+    for name in exit_enable_name:
+        params["backtest_params"][:, backtest_params_name.index(name)] = (
+            name == enable_name
+        )
+    result = entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+    backtest_result = result["backtest_result"][0]
+    position = backtest_result[:, backtest_result_name.index("position_status")]
+    price = backtest_result[:, backtest_result_name.index(price_name)]
+    # 空头用最高价检查止盈止损
+    high = synthetic_np_data[:, 2]
+
+    is_short = np.isin(position, (-1, -2, -4))
+    triggered = np.flatnonzero(is_short & (sign * (high - price) > 0))
+    assert len(triggered) > 0
+
+    exit_short_signal = result["signal_result"][0][:, 3]
+    assert exit_short_signal[triggered].all()
+    following = triggered[triggered + 1 < len(position)] + 1
+    assert not np.isin(position[following], (-2,)).any()
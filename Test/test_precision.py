@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+from Test.conftest import root_path, synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.json_tool import numba_config_env
+from utils.precision_utils import get_precision_columns, compare_precision
+from src.interface import entry_func
+
+
+def test_compare_precision():
+    reference = {
+        "a": np.array([1.0, 2.0, np.nan, 4.0]),
+        "b": np.array([np.inf, 1.0]),
+        "only_reference": np.zeros(3),
+    }
+    candidate = {
+        "a": np.array([1.0, 2.001, np.nan, np.nan]),
+        "b": np.array([np.inf, 1.0]),
+    }
+    a, b = compare_precision(reference, candidate, threshold=1e-4)
+
+    assert a["name"] == "a"
+    assert np.isclose(a["max_abs"], 0.001)
+    assert np.isclose(a["max_rel"], 0.001 / 2.0)
+    assert a["nan_mismatch"] == 1
+    assert a["mismatch"] == 2 and a["size"] == 4
+    # 相同的 inf 视为相同
+    assert b["max_abs"] == 0.0 and b["mismatch"] == 0
+
+
+def test_rolling_sma_compensated(dtype_dict):
+    """
+    滑动窗口 sma 的补偿求和和逐窗口精确求和的偏差不随k线数量累积。
+    """
+    rows = 200000
+    close = 1e4 + np.cumsum(np.random.default_rng(3).normal(0, 10, rows))
+    tohlcv = np.ascontiguousarray(np.repeat(close[:, None], 6, axis=1))
+    tohlcv[:, 0] = np.arange(rows) * 60000.0
+    params = get_params(
+        num=2,
+        indicator_update={"sma": [[30, 1], [30, 0]]},
+        dtype_dict=dtype_dict,
+    )
+    result = entry_func(
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+    columns = get_precision_columns(result)
+    sma = columns["indicator:sma"]
+    (row,) = compare_precision({"sma": sma[1]}, {"sma": sma[0]}, threshold=1e-15)
+    assert row["nan_mismatch"] == 0
+    assert row["max_rel"] < 1e-15
+
+
+# float32 模式是编译期开关, 需要在新进程中通过环境变量开启
+float32_script = """
+import json
+import numpy as np
+from utils.config_utils import get_dtype_dict, get_params
+from utils.precision_utils import get_precision_columns, compare_precision
+from src.interface import entry_func
+
+rows = 200000
+period = 30
+dtype_dict = get_dtype_dict(False)
+close = 1e4 + np.cumsum(np.random.default_rng(3).normal(0, 10, rows))
+tohlcv = np.repeat(close[:, None], 6, axis=1).astype(np.float32)
+tohlcv[:, 0] = np.arange(rows)
+params = get_params(
+    num=1,
+    indicator_update={"sma": [[period, 1]]},
+    dtype_dict=dtype_dict,
+)
+result = entry_func(
+    "njit",
+    tohlcv,
+    params["indicator_params"],
+    params["indicator_enabled"],
+    params["signal_params"],
+    params["backtest_params"],
+    dtype_dict=dtype_dict,
+    reuse_outputs=False,
+)
+sma = get_precision_columns(result)["indicator:sma"][0]
+
+# 参考值: 同样的 float32 输入, 逐窗口 float64 精确求和
+close = tohlcv[:, 4].astype(np.float64)
+reference = np.full(rows, np.nan)
+window = np.lib.stride_tricks.sliding_window_view(close, period)
+reference[period - 1 :] = window.sum(axis=1) / period
+
+# 不补偿的 float32 滑动窗口累加和
+plain = np.full(rows, np.nan, dtype=np.float32)
+sum_val = np.float32(0.0)
+close32 = tohlcv[:, 4]
+for i in range(rows):
+    sum_val += close32[i]
+    if i >= period:
+        sum_val -= close32[i - period]
+    if i >= period - 1:
+        plain[i] = sum_val / np.float32(period)
+
+(compensated,) = compare_precision({"sma": reference}, {"sma": sma}, threshold=1e-6)
+(uncompensated,) = compare_precision({"sma": reference}, {"sma": plain}, threshold=1e-6)
+print(json.dumps({"compensated": compensated, "uncompensated": uncompensated}))
+"""
+
+
+def test_rolling_sma_compensated_float32():
+    """
+    float32 模式下滑动窗口 sma 的误差只有写入结果时的一次舍入,
+    不补偿的 float32 累加和误差随k线数量累积, 大一个数量级以上。
+    """
+    env = dict(os.environ, PYTHONPATH=str(root_path))
+    env[numba_config_env["mode"]] = "njit"
+    env[numba_config_env["enable64"]] = "False"
+    output = subprocess.run(
+        [sys.executable, "-c", float32_script],
+        cwd=root_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    row = json.loads(output.strip().splitlines()[-1])
+    compensated = row["compensated"]
+    uncompensated = row["uncompensated"]
+
+    assert compensated["nan_mismatch"] == 0
+    # float32 的单次舍入误差不超过 2 ** -24
+    assert compensated["max_rel"] < 2.0**-23
+    assert uncompensated["max_rel"] > 10 * compensated["max_rel"]
@@ -0,0 +1,38 @@
+import json
+from utils.precompile import (
+    build_bundle,
+    check_bundle,
+    bundle_manifest_name,
+    bundle_cache_name,
+)
+
+
+def _snapshot(path):
+    return {
+        str(i.relative_to(path)): i.stat().st_mtime_ns
+        for i in sorted(path.rglob("*"))
+        if i.is_file()
+    }
+
+
+def test_bundle_has_no_missing_signatures(tmp_path):
+    """
+    构建预编译包之后, 在新进程中加载时所有签名都命中缓存。
+    检查不修改预编译包, 缺少签名的预编译包每次检查都报告缺少。
+    """
+    manifest = build_bundle(tmp_path, enable64_list=(True,))
+    assert len(manifest["signatures"]["True"]) > 0
+
+    with open(tmp_path / bundle_manifest_name, "r", encoding="utf-8") as file:
+        assert json.load(file)["signatures"] == manifest["signatures"]
+
+    assert check_bundle(tmp_path) == {"True": []}
+
+    # 删除一个函数的缓存, 模拟过期的预编译包
+    for i in (tmp_path / bundle_cache_name).rglob("*calc_trades*"):
+        i.unlink()
+    before = _snapshot(tmp_path)
+    for _ in range(2):
+        missing = check_bundle(tmp_path)["True"]
+        assert any(i["name"].endswith("calc_trades") for i in missing)
+    assert _snapshot(tmp_path) == before
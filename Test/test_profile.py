@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import subprocess
+from Test.conftest import root_path, synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.json_tool import numba_config_env
+from utils.profile_utils import TimingReport
+from src.interface import entry_func
+
+
+def test_report_without_profile(synthetic_np_data, dtype_dict):
+    """
+    没有开启阶段计时时, 报告只有主机端的耗时, 内核计数为 None。
+    """
+    params = get_params(num=2, dtype_dict=dtype_dict)
+    report = TimingReport()
+    entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        report=report,
+    )
+    assert set(report.timings) == {"plan", "allocation", "kernel", "transfer"}
+    assert report.outputs_reused is False
+    assert report.counters is None
+    assert report.stage_totals() == {}
+
+
+# 阶段计时是编译期开关, 需要在新进程中通过环境变量开启
+profile_script = """
+import json
+from utils.config_utils import get_dtype_dict, get_params
+from utils.data_loading import get_synthetic_tohlcv
+from utils.profile_utils import TimingReport
+from src.interface import entry_func
+
+dtype_dict = get_dtype_dict(True)
+params = get_params(
+    num=5,
+    indicator_update={"sma": [[10], [20], [10], [20], [30]]},
+    dtype_dict=dtype_dict,
+)
+report = TimingReport()
+entry_func(
+    "njit",
+    get_synthetic_tohlcv(500, dtype_dict),
+    params["indicator_params"],
+    params["indicator_enabled"],
+    params["signal_params"],
+    params["backtest_params"],
+    dtype_dict=dtype_dict,
+    reuse_outputs=False,
+    report=report,
+)
+print(json.dumps(report.to_dict()))
+"""
+
+
+def test_profile_counters():
+    """
+    开启 NUMBA_QUANT_PROFILE 后, 每个 config 的每个阶段各计时一次, 去重后的指标参数各计时一次。
+    """
+    env = dict(os.environ, PYTHONPATH=str(root_path))
+    env[numba_config_env["mode"]] = "njit"
+    env[numba_config_env["profile"]] = "True"
+    output = subprocess.run(
+        [sys.executable, "-c", profile_script],
+        cwd=root_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    stages = json.loads(output.strip().splitlines()[-1])["stages"]
+
+    for name in ["init_data", "signal", "backtest", "trades", "pack_signal"]:
+        assert stages[name]["count"] == 5
+        assert stages[name]["cycles"] >= 0
+    # sma 的参数 10, 20, 30 去重后只计算 3 次
+    assert stages["indicator:sma"]["count"] == 3
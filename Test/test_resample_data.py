@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_mapping_data
+from utils.resample_data import resample_tohlcv
+
+
+@pytest.mark.parametrize("multiple", [1, 4, 16])
+def test_resample_same_as_reference(synthetic_np_data, dtype_dict, multiple):
+    """
+    重采样的结果和按时间桶分组的参考实现相同, mapping_data 和 get_mapping_data 相同。
+    """
+    # 去掉开头几根, 让第一个桶不完整
+    data = synthetic_np_data[3:]
+    tohlcv2, mapping_data = resample_tohlcv(data, multiple, dtype_dict)
+
+    interval2 = 15 * 60 * 1000 * multiple
+    bucket = np.floor(data[:, 0] / interval2) * interval2
+    starts, first = np.unique(bucket, return_index=True)
+    last = np.r_[first[1:], len(data)] - 1
+
+    assert tohlcv2.shape == (len(starts), 6)
+    np.testing.assert_array_equal(tohlcv2[:, 0], starts)
+    np.testing.assert_array_equal(tohlcv2[:, 1], data[first, 1])
+    np.testing.assert_array_equal(tohlcv2[:, 2], np.maximum.reduceat(data[:, 2], first))
+    np.testing.assert_array_equal(tohlcv2[:, 3], np.minimum.reduceat(data[:, 3], first))
+    np.testing.assert_array_equal(tohlcv2[:, 4], data[last, 4])
+    np.testing.assert_allclose(tohlcv2[:, 5], np.add.reduceat(data[:, 5], first))
+
+    np.testing.assert_array_equal(
+        mapping_data, get_mapping_data(data, tohlcv2, dtype_dict)
+    )
+
+
+def test_resample_invalid_multiple(synthetic_np_data, dtype_dict):
+    with pytest.raises(ValueError):
+        resample_tohlcv(synthetic_np_data, 2.5, dtype_dict)
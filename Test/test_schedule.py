@@ -0,0 +1,123 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.schedule_utils import (
+    backtest_params_name,
+    get_schedule,
+    get_indicator_tasks,
+)
+from src.interface import entry_func
+
+
+def get_slot_load(cost, order, offsets):
+    slot_count = len(offsets) - 1
+    return np.array(
+        [cost[order[offsets[i] : offsets[i + 1]]].sum() for i in range(slot_count)]
+    )
+
+
+def test_get_schedule_balanced():
+    """
+    按计算量分配后每个 slot 的总计算量接近, 每个任务恰好分配一次, slot 内按下标升序。
+    """
+    # 轮流分配时计算量大的任务 (下标是 4 的倍数) 都落在第 0 个 slot
+    cost = np.where(np.arange(40) % 4 == 0, 12.5, 1.0)
+
+    order, offsets = get_schedule(cost, 4, cost_aware=False)
+    np.testing.assert_array_equal(order[offsets[1] : offsets[2]], np.arange(1, 40, 4))
+    round_robin = get_slot_load(cost, order, offsets)
+
+    order, offsets = get_schedule(cost, 4)
+    np.testing.assert_array_equal(np.sort(order), np.arange(40))
+    assert offsets[0] == 0 and offsets[-1] == 40
+    for i in range(4):
+        assert np.all(np.diff(order[offsets[i] : offsets[i + 1]]) > 0)
+    load = get_slot_load(cost, order, offsets)
+    assert round_robin.max() == 125.0
+    assert load.max() - load.min() <= cost.max()
+    assert load.max() < 0.5 * round_robin.max()
+
+
+def test_indicator_tasks_cost():
+    """
+    逐窗口计算的指标计算量和 period 成正比, 滑动窗口的计算量不随 period 变化。
+    """
+    indicator_params = (
+        np.array([[200.0, 0.0], [200.0, 1.0], [10.0, 0.0]]),
+        np.zeros((1, 2)),
+        np.array([[200.0, 2.0, 0.0]]),
+        np.zeros((1, 1)),
+        np.zeros((1, 3)),
+    )
+    indicator_enabled = np.array([True, False, True, False, False])
+    tasks, cost = get_indicator_tasks(
+        indicator_params,
+        indicator_params,
+        indicator_enabled,
+        np.zeros(5, dtype=bool),
+    )
+    np.testing.assert_array_equal(tasks, [[0, 0, 0], [0, 0, 1], [0, 0, 2], [0, 2, 0]])
+    assert cost[0] > 10 * cost[1] and cost[1] < cost[2] < cost[0]
+    assert cost[3] > cost[0]
+
+    # 默认参数 (sma, sma2, bbands) 是逐窗口计算
+    default = get_params(num=1, indicator_enabled={"bbands": True})
+    _, cost = get_indicator_tasks(
+        default["indicator_params"],
+        default["indicator_params"],
+        default["indicator_enabled"],
+        np.zeros(5, dtype=bool),
+    )
+    np.testing.assert_allclose(cost, [1.0 + 14 / 20, 1.0 + 14 / 20, 3.0 + 14 / 8])
+
+
+def test_cost_schedule_same_result(synthetic_np_data, dtype_dict):
+    """
+    按计算量分配和轮流分配只改变计算的线程, 结果完全相同。
+    """
+    tohlcv = synthetic_np_data[:800]
+    num = 9
+    params = get_params(
+        num=num,
+        indicator_update={
+            "sma": [[5 + 20 * i, i % 2] for i in range(num)],
+            "bbands": [[10 + 15 * i, 2.0, 0] for i in range(num)],
+        },
+        indicator_enabled={"bbands": True, "atr": True},
+        indicator_enabled2={"psar": True},
+        backtest_params={"atr_sl_enable": False, "atr_tp_enable": False},
+        dtype_dict=dtype_dict,
+    )
+    params["backtest_params"][::3, backtest_params_name.index("atr_tsl_enable")] = 0.0
+    args = (
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        tohlcv2_multiple=4,
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        max_trades=3,
+        slot_count=4,
+    )
+    expected = entry_func(*args, cost_schedule=False, **kwargs)
+    result = entry_func(*args, cost_schedule=True, **kwargs)
+    for k in [
+        "indicator_result",
+        "indicator_result2",
+        "signal_result",
+        "backtest_result",
+        "backtest_summary",
+        "trade_result",
+        "trade_count",
+    ]:
+        a = expected[k] if isinstance(expected[k], tuple) else (expected[k],)
+        b = result[k] if isinstance(result[k], tuple) else (result[k],)
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
@@ -0,0 +1,41 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+
+
+def test_temp_arrays_per_slot(synthetic_np_data, dtype_dict):
+    """
+    临时数组只按 slot_count 分配, 多个 config 复用同一份临时数组,
+    结果要和每个 config 独占临时数组时相同。
+    """
+    num = 5
+    params = get_params(
+        num=num,
+        indicator_update={"sma": [[i] for i in [10, 20, 30, 40, 50]]},
+        indicator_enabled={"sma": True, "bbands": True, "atr": True, "psar": True},
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+
+    pooled = entry_func(*args, dtype_dict=dtype_dict, reuse_outputs=False, slot_count=2)
+    private = entry_func(
+        *args, dtype_dict=dtype_dict, reuse_outputs=False, slot_count=num
+    )
+
+    assert pooled["float_temp_array"].shape[0] == 2
+    assert private["float_temp_array"].shape[0] == num
+
+    for key in ["signal_result", "backtest_result", "backtest_summary"]:
+        np.testing.assert_array_equal(pooled[key], private[key])
+    for _id in range(len(pooled["indicator_result"])):
+        np.testing.assert_array_equal(
+            pooled["indicator_result"][_id], private["indicator_result"][_id]
+        )
@@ -0,0 +1,113 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+from src.calculate_signals import get_signal_words, unpack_signal_bits
+from src.backtest.clean_signal import clean_signal, clean_signal_bits
+from src.signal.signal_tool import (
+    bool_compare,
+    bool_compare_bits,
+    pack_bits,
+    unpack_bits,
+    ComparisonOperator as co,
+    AssignOperator as ao,
+    TriggerOperator as to,
+)
+
+
+def test_bool_compare_bits_matches_bool_compare():
+    """
+    按字计算的比较, 赋值和边缘触发和逐元素的 bool_compare 结果相同, 包括跨字的边缘和 nan。
+    """
+    rng = np.random.default_rng(1)
+    rows = 200
+    array1 = np.round(rng.normal(0, 1, rows), 1)
+    array2 = np.round(rng.normal(0, 1, rows), 1)
+    array1[[0, 63, 64, 130]] = np.nan
+
+    for comparison_mode in co:
+        for assign_mode in ao:
+            for trigger_mode in to:
+                initial = rng.random(rows) > 0.5
+                output = initial.copy()
+                temp = np.zeros(rows, dtype=np.bool_)
+                bool_compare(
+                    array1,
+                    array2,
+                    output,
+                    temp,
+                    comparison_mode,
+                    assign_mode,
+                    trigger_mode,
+                )
+
+                output_bits = np.zeros(get_signal_words(rows), dtype=np.uint64)
+                pack_bits(initial, output_bits)
+                bool_compare_bits(
+                    array1,
+                    array2,
+                    output_bits,
+                    comparison_mode,
+                    assign_mode,
+                    trigger_mode,
+                )
+                unpacked = np.zeros(rows, dtype=np.bool_)
+                unpack_bits(output_bits, unpacked)
+                assert np.array_equal(unpacked, output)
+                # 最后一个字中超出k线数量的位保持为 0
+                assert output_bits[-1] >> np.uint64(rows % 64) == 0
+
+
+def test_clean_signal_bits_matches_clean_signal():
+    rng = np.random.default_rng(2)
+    rows = 150
+    signal = rng.random((rows, 4)) > 0.5
+
+    signal_bits = np.zeros((4, get_signal_words(rows)), dtype=np.uint64)
+    for k in range(4):
+        pack_bits(signal[:, k], signal_bits[k])
+
+    clean_signal(signal)
+    clean_signal_bits(signal_bits)
+    assert np.array_equal(unpack_signal_bits(signal_bits[None], rows)[0], signal)
+
+
+def test_pack_signals_matches_signal_result(synthetic_np_data, dtype_dict):
+    """
+    pack_signals=True 时按位保存的信号展开后和 signal_result 相同, 包括回测阶段写入的离场信号。
+    """
+    tohlcv = synthetic_np_data[:1000]
+    params = get_params(
+        num=5,
+        indicator_update={"sma": [[5, 0], [10, 0], [14, 1], [20, 0], [30, 0]]},
+        backtest_params={"pct_sl_enable": True, "pct_tp_enable": True},
+        dtype_dict=dtype_dict,
+    )
+    args = (
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        slot_count=2,
+    )
+    result = entry_func(*args, **kwargs)
+    packed = entry_func(*args, pack_signals=True, **kwargs)
+
+    assert packed["signal_result"].shape[0] == 2
+    assert packed["signal_bits"].shape == (5, 4, get_signal_words(tohlcv.shape[0]))
+    signal = unpack_signal_bits(packed["signal_bits"], tohlcv.shape[0])
+    assert np.array_equal(signal, result["signal_result"])
+    assert np.array_equal(
+        packed["backtest_summary"], result["backtest_summary"], equal_nan=True
+    )
+
+    summary = entry_func(*args, pack_signals=True, summary_only=True, **kwargs)
+    assert np.array_equal(summary["signal_bits"], packed["signal_bits"])
@@ -0,0 +1,81 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.resample_data import resample_tohlcv
+from src.interface import entry_func
+from src.stream_interface import StreamEngine
+
+
+def test_stream_matches_batch(synthetic_np_data, dtype_dict):
+    """
+    预热后逐根k线更新的结果和对完整数据调用 entry_func 得到的同一行完全相同。
+    """
+    tohlcv = synthetic_np_data[:600]
+    tohlcv2, mapping_data = resample_tohlcv(tohlcv, 4, dtype_dict)
+    params = get_params(
+        num=3,
+        indicator_update={
+            "sma": [[10, 1], [10, 0], [20, 1]],
+            "bbands": [[14, 2.0, 1], [14, 2.0, 0], [20, 2.0, 1]],
+        },
+        indicator_enabled={"bbands": True, "atr": True, "psar": True},
+        indicator_enabled2={"bbands": True, "atr": True, "psar": True},
+        backtest_params={
+            "pct_sl_enable": True,
+            "pct_tp_enable": True,
+            "pct_tsl_enable": True,
+            "psar_enable": True,
+        },
+        dtype_dict=dtype_dict,
+    )
+    kwargs = dict(
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        dtype_dict=dtype_dict,
+    )
+    result = entry_func(
+        "njit",
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        tohlcv2=tohlcv2,
+        mapping_data=mapping_data,
+        reuse_outputs=False,
+        **kwargs,
+    )
+    engine = StreamEngine(
+        "njit",
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        **kwargs,
+    )
+
+    warmup = 400
+    count2 = mapping_data[warmup - 1] + 1
+    engine.update_many(tohlcv[:warmup], tohlcv2[:count2], mapping_data[:warmup])
+    assert engine.bar_count == warmup
+
+    indicator_index = result["indicator_index"]
+    for i in range(warmup, tohlcv.shape[0]):
+        bar2 = None
+        if mapping_data[i] >= count2:
+            bar2 = tohlcv2[count2]
+            count2 += 1
+        latest = engine.update(tohlcv[i], bar2)
+
+        for j, r in enumerate(result["indicator_result"]):
+            if r.shape[1] > 0:
+                expected = r[indicator_index[:, j], i]
+                assert np.array_equal(
+                    expected, latest["indicator_result"][j], equal_nan=True
+                )
+        assert np.array_equal(result["signal_result"][:, i], latest["signal_result"])
+        assert np.array_equal(
+            result["backtest_result"][:, i],
+            latest["backtest_result"],
+            equal_nan=True,
+        )
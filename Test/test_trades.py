@@ -0,0 +1,92 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from src.interface import entry_func
+from src.backtest.calculate_summary import backtest_summary_name
+from src.backtest.calculate_trades import get_trade_records
+from src.backtest.trigger_position_exit import ExitReason
+
+
+def _run(synthetic_np_data, dtype_dict, **kwargs):
+    num = 3
+    params = get_params(
+        num=num,
+        indicator_update={"sma": [[10], [20], [10]], "sma2": [[30], [40], [30]]},
+        dtype_dict=dtype_dict,
+    )
+    return entry_func(
+        "njit",
+        synthetic_np_data,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+        **kwargs,
+    )
+
+
+def test_trades_match_summary(synthetic_np_data, dtype_dict):
+    """
+    已平仓的交易数量和盈亏之和要和 backtest_summary 一致。
+    """
+    result = _run(synthetic_np_data, dtype_dict, max_trades=len(synthetic_np_data))
+    records = get_trade_records(result["trade_result"], result["trade_count"])
+    summary = result["backtest_summary"]
+    init_money = result["backtest_result"][0][0, 4]
+
+    for idx in range(summary.shape[0]):
+        trades = records[records["config_idx"] == idx]
+        closed = trades[(trades["exit_reason"] & ExitReason.open) == 0]
+        assert len(closed) > 0
+        assert len(closed) == summary[idx, backtest_summary_name.index("trade_count")]
+        np.testing.assert_allclose(
+            init_money + closed["pnl"].sum(),
+            summary[idx, backtest_summary_name.index("final_balance")],
+        )
+        assert (trades["entry_bar"] <= trades["exit_bar"]).all()
+        assert np.isin(trades["side"], (1, -1)).all()
+
+
+def test_ring_buffer_keeps_latest(synthetic_np_data, dtype_dict):
+    """
+    max_trades 小于交易数时只保留最近的交易, summary_only 模式下结果相同。
+    """
+    full = _run(synthetic_np_data, dtype_dict, max_trades=len(synthetic_np_data))
+    full_records = get_trade_records(full["trade_result"], full["trade_count"])
+
+    max_trades = 3
+    for summary_only in (False, True):
+        result = _run(
+            synthetic_np_data,
+            dtype_dict,
+            max_trades=max_trades,
+            summary_only=summary_only,
+            slot_count=2,
+        )
+        np.testing.assert_array_equal(result["trade_count"], full["trade_count"])
+        records = get_trade_records(result["trade_result"], result["trade_count"])
+        for idx in range(len(full["trade_count"])):
+            expected = full_records[full_records["config_idx"] == idx][-max_trades:]
+            np.testing.assert_array_equal(
+                records[records["config_idx"] == idx], expected
+            )
+
+
+def test_unused_rows_are_nan(synthetic_np_data, dtype_dict):
+    """
+    交易数少于 max_trades 时, trade_result 中没有交易的行是 nan, 完整模式和 summary_only 模式相同。
+    """
+    max_trades = len(synthetic_np_data)
+    for summary_only in (False, True):
+        result = _run(
+            synthetic_np_data,
+            dtype_dict,
+            max_trades=max_trades,
+            summary_only=summary_only,
+        )
+        for idx, count in enumerate(result["trade_count"]):
+            assert 0 < count < max_trades
+            assert not np.isnan(result["trade_result"][idx, :count]).any()
+            assert np.isnan(result["trade_result"][idx, count:]).all()
@@ -0,0 +1,103 @@
+import numpy as np
+from Test.conftest import synthetic_np_data, dtype_dict
+from utils.config_utils import get_params
+from utils.resample_data import resample_tohlcv
+from utils.outputs_global import clear_outputs_cache, get_outputs_cache_stats
+from utils.profile_utils import TimingReport
+from src.interface import entry_func, get_indicator_start
+from src.optimizer import backtest_params_name
+
+
+def test_warm_start_matches_full(synthetic_np_data, dtype_dict):
+    """
+    追加k线和修改最后一根未收盘的k线之后, 只重新计算变化部分的结果和完整计算完全相同。
+    """
+    params = get_params(
+        num=4,
+        indicator_update={
+            "sma": [[10, 1], [10, 0], [20, 0], [5, 0]],
+            "bbands": [[14, 2.0, 0], [14, 2.0, 1], [20, 2.0, 0], [10, 1.5, 0]],
+        },
+        indicator_enabled={"bbands": True, "atr": True, "psar": True},
+        indicator_enabled2={"bbands": True, "atr": True, "psar": True},
+        backtest_params={
+            "pct_sl_enable": True,
+            "pct_tp_enable": True,
+            "pct_tsl_enable": True,
+            "psar_enable": True,
+        },
+        dtype_dict=dtype_dict,
+    )
+    # 一个提前终止的 config
+    params["backtest_params"][
+        3, backtest_params_name.index("max_drawdown_limit")
+    ] = 0.05
+
+    def run(tohlcv, warm_start):
+        tohlcv2, mapping_data = resample_tohlcv(tohlcv, 4, dtype_dict)
+        report = TimingReport()
+        result = entry_func(
+            "njit",
+            tohlcv,
+            params["indicator_params"],
+            params["indicator_enabled"],
+            params["signal_params"],
+            params["backtest_params"],
+            tohlcv2=tohlcv2,
+            mapping_data=mapping_data,
+            indicator_params2=params["indicator_params2"],
+            indicator_enabled2=params["indicator_enabled2"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=warm_start,
+            warm_start=warm_start,
+            max_trades=5,
+            report=report,
+        )
+        # 复用的输出数组下一次调用会被覆盖, 先拷贝
+        result = {
+            k: tuple(i.copy() for i in v) if isinstance(v, tuple) else v.copy()
+            for k, v in result.items()
+        }
+        return result, report
+
+    clear_outputs_cache()
+    rows = 800
+    run(synthetic_np_data[:rows], True)
+    for step in range(4):
+        rows += step + 1
+        tohlcv = synthetic_np_data[:rows].copy()
+        if step % 2 == 0:
+            tohlcv[-1, 4] *= 1.001
+        warm, report = run(tohlcv, True)
+        full, _ = run(tohlcv, False)
+        assert report.warm_start is not None
+
+        # 临时数组是工作缓冲区, 不比较
+        for k in [k for k in full if "temp" not in k]:
+            if isinstance(full[k], tuple):
+                for a, b in zip(warm[k], full[k]):
+                    assert np.array_equal(a, b, equal_nan=True), k
+            else:
+                assert np.array_equal(warm[k], full[k], equal_nan=True), k
+
+    assert get_outputs_cache_stats()["warm_hits"] == 4
+    clear_outputs_cache()
+
+
+def test_default_indicators_warm_start_tail(dtype_dict):
+    """
+    默认逐窗口计算的 sma/bbands 只从变化的k线往前 period - 1 根开始重新计算,
+    rolling=1 和 atr/psar 依赖全部历史, 从第 0 根k线开始。
+    """
+    params = get_params(
+        num=2,
+        indicator_update={"sma": [[14], [14, 1]]},
+        indicator_enabled={"bbands": True, "atr": True},
+        dtype_dict=dtype_dict,
+    )
+    sma, _, bbands, atr, _ = get_indicator_start(
+        params["indicator_params"], params["indicator_enabled"], 100, dtype_dict
+    )
+    np.testing.assert_array_equal(sma, [87, 0])
+    np.testing.assert_array_equal(bbands, [87, 87])
+    np.testing.assert_array_equal(atr, [0, 0])
@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+import numpy as np
+import typer
+
+from utils.json_tool import read_numba_config, write_numba_config
+
+# 使用 rma 递推的列。rma 的递推是收缩的, 每一步上一根k线的误差乘以 (period - 1) / period,
+# float32 的舍入误差不随k线数量累积, 上界约为 period 倍的单次舍入 (period=14 时约 8e-7),
+# 所以这些列除了 mismatch 之外还检查 max_rel 不超过 rma_max_rel
+rma_columns = ["indicator:atr", "indicator2:atr", "backtest:atr_price"]
+
+
+def measure(output, rows=20000, num=8, seed=0):
+    """
+    在当前进程的 numba 配置 (enable64) 下运行一组启用所有指标的参数, 结果按列保存到 output (npz)。
+    必须在没有导入过 src 模块的新进程中运行, 配置从环境变量读取。
+    """
+    from src.interface import entry_func
+    from utils.data_loading import get_synthetic_tohlcv
+    from utils.config_utils import get_params, get_dtype_dict
+    from utils.precision_utils import get_precision_columns
+
+    config = read_numba_config()
+    dtype_dict = get_dtype_dict(config["enable64"])
+
+    # 先舍入到 float32 再生成两种模式的输入, 偏差只来自计算过程, 不来自输入的舍入
+    tohlcv = get_synthetic_tohlcv(rows, get_dtype_dict(False), seed=seed)
+    tohlcv = tohlcv.astype(dtype_dict["np"]["float"])
+
+    periods = np.arange(num)
+    params = get_params(
+        num=num,
+        indicator_update={
+            "sma": [[5 + 5 * int(i), int(i) % 2] for i in periods],
+            "sma2": [[20 + 10 * int(i), 1] for i in periods],
+            "bbands": [[10 + 5 * int(i), 2.0, int(i) % 2] for i in periods],
+        },
+        indicator_enabled={"bbands": True, "atr": True, "psar": True},
+        indicator_enabled2={"bbands": True, "atr": True, "psar": True},
+        backtest_params={
+            "pct_sl_enable": True,
+            "pct_tp_enable": True,
+            "pct_tsl_enable": True,
+            "psar_enable": True,
+        },
+        dtype_dict=dtype_dict,
+    )
+    result = entry_func(
+        config["mode"],
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+        indicator_params2=params["indicator_params2"],
+        indicator_enabled2=params["indicator_enabled2"],
+        tohlcv2_multiple=4,
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+    np.savez(output, **get_precision_columns(result))
+
+
+def run_child(enable64, output, mode, rows, num, seed):
+    # 配置通过环境变量传给子进程
+    env = dict(os.environ)
+    write_numba_config(mode=mode, enable64=enable64, environ=env)
+    subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--child",
+            "--output",
+            output,
+            "--rows",
+            str(rows),
+            "--num",
+            str(num),
+            "--seed",
+            str(seed),
+        ],
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    with np.load(output) as data:
+        return {k: data[k] for k in data.files}
+
+
+def main(
+    mode: str = "njit",
+    rows: int = 20000,
+    num: int = 8,
+    seed: int = 0,
+    threshold: float = 1e-4,
+    max_mismatch_ratio: float = 1e-4,
+    rma_max_rel: float = 1e-6,
+    output: str = "",
+    child: bool = False,
+):
+    """
+    float32 模式的精度检查, 在两个子进程中分别用 float64 和 float32 运行相同的输入,
+    输出每个指标结果列, 回测结果列和统计量的最大偏差 (JSON, 每行一列), 见 compare_precision。
+    偏差超过 threshold (相对于列的最大绝对值) 的元素比例超过 max_mismatch_ratio 时以退出码 1 结束,
+    个别k线上的 PSAR 反转之类的边界情况不算失败, 但仍然在 max_rel 中报告。
+    rma_columns (atr) 的 max_rel 超过 rma_max_rel 或者 nan 的位置不同时也以退出码 1 结束。
+    """
+    from utils.precision_utils import compare_precision
+
+    if child:
+        measure(output, rows=rows, num=num, seed=seed)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reference = run_child(
+            True, os.path.join(tmp_dir, "float64.npz"), mode, rows, num, seed
+        )
+        candidate = run_child(
+            False, os.path.join(tmp_dir, "float32.npz"), mode, rows, num, seed
+        )
+
+    missing = [name for name in rma_columns if name not in reference]
+    if missing:
+        raise ValueError(f"结果中没有 {missing}, 需要启用 atr")
+
+    comparison = compare_precision(reference, candidate, threshold)
+    for r in comparison:
+        r["exceeded"] = r["mismatch"] > max_mismatch_ratio * r["size"]
+        if r["name"] in rma_columns:
+            r["exceeded"] |= r["nan_mismatch"] > 0 or r["max_rel"] > rma_max_rel
+        print(json.dumps(r, ensure_ascii=False))
+
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "config": {
+                        "mode": mode,
+                        "rows": rows,
+                        "num": num,
+                        "seed": seed,
+                        "threshold": threshold,
+                        "max_mismatch_ratio": max_mismatch_ratio,
+                        "rma_max_rel": rma_max_rel,
+                    },
+                    "results": comparison,
+                },
+                file,
+                ensure_ascii=False,
+                indent=4,
+            )
+
+    if any(r["exceeded"] for r in comparison):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    app = typer.Typer(pretty_exceptions_show_locals=False)
+    app.command()(main)
+    app()
@@ -0,0 +1,317 @@
+import sys
+import json
+import time
+import tempfile
+import platform
+import subprocess
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+import numpy as np
+import typer
+
+from utils.json_tool import load_numba_config
+
+# 基准测试用的指标组合, 对应 get_params 的 indicator_enabled
+indicator_sets = {
+    "none": {},
+    "sma": {"sma": True, "sma2": True},
+    "all": {"sma": True, "sma2": True, "bbands": True, "atr": True, "psar": True},
+}
+
+# 用于比较的耗时字段, 取多次运行的最小值
+timing_keys = ["plan", "allocation", "kernel", "transfer", "export", "total"]
+
+
+def _parse_list(value, cast=int):
+    return [cast(i.strip()) for i in value.split(",") if i.strip()]
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=root_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def get_case_key(case):
+    return (
+        case["mode"],
+        case["conf_count"],
+        case["rows"],
+        case["indicators"],
+        case["summary_only"],
+    )
+
+
+def get_export_format(conf_count, summary_only):
+    """
+    导出耗时使用的格式, 和 main.py 相同: 只有一个 config 并且有逐k线结果时导出 csv,
+    否则把所有 config 导出成列存 (summary_only 的输出没有逐k线的数组, 只能用列存)。
+    """
+    return "csv" if conf_count == 1 and not summary_only else "columnar"
+
+
+def export_result(export_format, path, result, params, rows):
+    from src.backtest.calculate_backtest import backtest_result_name
+    from src.calculate_signals import signal_result_name
+    from utils.data_loading import tohlcv_name
+    from utils.export_file import export_csv, export_columnar
+
+    if export_format == "columnar":
+        export_columnar(Path(path) / "columnar", result, rows=rows)
+    else:
+        export_csv(
+            "csv",
+            [tohlcv_name, result["tohlcv"]],
+            [tohlcv_name, result["tohlcv2"]],
+            [params["indicator_col_name"], result["indicator_result"]],
+            [params["indicator_col_name2"], result["indicator_result2"]],
+            [signal_result_name, result["signal_result"]],
+            [backtest_result_name, result["backtest_result"]],
+            params["indicator_enabled"],
+            params["indicator_enabled2"],
+            write_csv=True,
+            indicator_index=result["indicator_index"],
+            indicator_index2=result["indicator_index2"],
+            output_dir=path,
+        )
+
+
+def run_case(mode, tohlcv, conf_count, indicators, summary_only, repeat, dtype_dict):
+    """
+    运行一个 (conf_count, rows, indicators) 组合, 返回各阶段耗时, 每个阶段取 repeat 次中的最小值。
+    不同 config 的指标参数不同, 避免参数去重把计算量压缩掉。
+    export 是把结果写入临时目录的耗时, 格式见 get_export_format。
+    """
+    from src.interface import entry_func
+    from utils.config_utils import get_params
+    from utils.profile_utils import TimingReport
+
+    periods = np.arange(conf_count) % 100
+    params = get_params(
+        num=conf_count,
+        indicator_update={
+            "sma": [[5 + int(i)] for i in periods],
+            "sma2": [[20 + int(i)] for i in periods],
+            "bbands": [[10 + int(i), 2.0] for i in periods],
+        },
+        indicator_enabled=indicator_sets[indicators],
+        dtype_dict=dtype_dict,
+    )
+
+    export_format = get_export_format(conf_count, summary_only)
+    best = {"export_format": export_format}
+    for _ in range(repeat):
+        report = TimingReport()
+        start_time = time.perf_counter()
+        result = entry_func(
+            mode,
+            tohlcv,
+            params["indicator_params"],
+            params["indicator_enabled"],
+            params["signal_params"],
+            params["backtest_params"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=False,
+            summary_only=summary_only,
+            report=report,
+        )
+
+        with tempfile.TemporaryDirectory() as path:
+            export_start = time.perf_counter()
+            export_result(export_format, path, result, params, tohlcv.shape[0])
+            end_time = time.perf_counter()
+
+        timings = report.timings
+        timings["export"] = end_time - export_start
+        timings["total"] = end_time - start_time
+        for k in timing_keys:
+            best[k] = min(best.get(k, float("inf")), timings[k])
+    return best
+
+
+def run_benchmark(
+    mode="njit",
+    conf_counts=(1, 100, 10000, 100000),
+    rows_list=(1000, 100000, 1000000),
+    indicators_list=("none", "sma", "all"),
+    summary_only=True,
+    repeat=3,
+    max_cells=2 * 10**9,
+    enable64=True,
+):
+    """
+    扫描 conf_count, k线数量和指标组合, 返回可以序列化成 JSON 的结果。
+    conf_count * rows 超过 max_cells 的组合被跳过, 避免运行时间和内存失控。
+    第一次调用前先用最小的数据预热, 编译时间不计入结果。
+    """
+    import numba as nb
+    from src.interface import entry_func
+    from utils.config_utils import get_dtype_dict, get_params
+    from utils.data_loading import get_synthetic_tohlcv
+
+    dtype_dict = get_dtype_dict(enable64)
+
+    warmup = get_params(num=1, dtype_dict=dtype_dict)
+    entry_func(
+        mode,
+        get_synthetic_tohlcv(100, dtype_dict),
+        warmup["indicator_params"],
+        warmup["indicator_enabled"],
+        warmup["signal_params"],
+        warmup["backtest_params"],
+        dtype_dict=dtype_dict,
+        reuse_outputs=False,
+    )
+
+    cases = []
+    for rows in rows_list:
+        tohlcv = get_synthetic_tohlcv(rows, dtype_dict)
+        for conf_count in conf_counts:
+            for indicators in indicators_list:
+                case = {
+                    "mode": mode,
+                    "conf_count": conf_count,
+                    "rows": rows,
+                    "indicators": indicators,
+                    "summary_only": summary_only,
+                }
+                if conf_count * rows > max_cells:
+                    case["skipped"] = True
+                else:
+                    case.update(
+                        run_case(
+                            mode,
+                            tohlcv,
+                            conf_count,
+                            indicators,
+                            summary_only,
+                            repeat,
+                            dtype_dict,
+                        )
+                    )
+                cases.append(case)
+
+    return {
+        "meta": {
+            "commit": get_git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numba": nb.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "threads": nb.get_num_threads(),
+            "enable64": enable64,
+            "repeat": repeat,
+        },
+        "results": cases,
+    }
+
+
+def compare_results(baseline, current, threshold=1.2, key="total"):
+    """
+    按 (mode, conf_count, rows, indicators, summary_only) 匹配两次结果,
+    返回每个组合的耗时比值, current / baseline 超过 threshold 的标记为回归。
+    """
+    base_cases = {
+        get_case_key(c): c for c in baseline["results"] if not c.get("skipped")
+    }
+    rows = []
+    for case in current["results"]:
+        base = base_cases.get(get_case_key(case))
+        if case.get("skipped") or base is None or base[key] <= 0:
+            continue
+        ratio = case[key] / base[key]
+        rows.append(
+            {
+                **{k: case[k] for k in ["mode", "conf_count", "rows", "indicators"]},
+                "baseline": base[key],
+                "current": case[key],
+                "ratio": ratio,
+                "regression": ratio > threshold,
+            }
+        )
+    return rows
+
+
+def main(
+    mode: str = "njit",
+    conf_counts: str = "1,100,10000,100000",
+    rows: str = "1000,100000,1000000",
+    indicators: str = "none,sma,all",
+    summary_only: bool = True,
+    repeat: int = 3,
+    max_cells: int = 2 * 10**9,
+    enable64: bool = True,
+    output: str = "",
+    baseline: str = "",
+    current: str = "",
+    threshold: float = 1.2,
+    key: str = "total",
+):
+    """
+    conf_count / k线数量 / 指标组合 的扩展性基准测试, 只支持 normal 和 njit 模式。
+
+    output 保存 JSON 结果, baseline 是之前保存的结果, 用于比较不同提交之间的性能,
+    current 不为空时不运行基准测试, 直接比较 baseline 和 current 两个文件。
+    任何组合的 key 耗时超过 baseline 的 threshold 倍时以退出码 1 结束。
+    """
+    if mode not in ["normal", "njit"]:
+        raise ValueError(f"Invalid mode: {mode}")
+
+    if current:
+        with open(current, "r", encoding="utf-8") as file:
+            result = json.load(file)
+    else:
+        # 通过环境变量初始化numba配置, 必须在导入 src 模块之前
+        load_numba_config(mode=mode, enable64=enable64)
+        result = run_benchmark(
+            mode=mode,
+            conf_counts=_parse_list(conf_counts),
+            rows_list=_parse_list(rows),
+            indicators_list=_parse_list(indicators, str),
+            summary_only=summary_only,
+            repeat=repeat,
+            max_cells=max_cells,
+            enable64=enable64,
+        )
+        if output:
+            with open(output, "w", encoding="utf-8") as file:
+                json.dump(result, file, ensure_ascii=False, indent=4)
+
+        for case in result["results"]:
+            print(json.dumps(case, ensure_ascii=False))
+
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as file:
+            base = json.load(file)
+        comparison = compare_results(base, result, threshold, key)
+        for r in comparison:
+            flag = "REGRESSION" if r["regression"] else "ok"
+            print(
+                f"{flag:>10} {r['mode']} conf_count={r['conf_count']} rows={r['rows']} "
+                f"indicators={r['indicators']} {key}: "
+                f"{r['baseline']:.4f}s -> {r['current']:.4f}s ({r['ratio']:.2f}x)"
+            )
+        if any(r["regression"] for r in comparison):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    app = typer.Typer(pretty_exceptions_show_locals=False)
+    app.command()(main)
+    app()
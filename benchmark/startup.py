@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+import typer
+
+from utils.json_tool import read_numba_config, write_numba_config
+
+
+def measure(rows: int = 2000, num: int = 1):
+    """
+    在当前进程中分别测量 导入, 编译/加载缓存, 第一次调用, 第二次调用 的时间。
+    必须在没有导入过 src 模块的新进程中运行, 配置从环境变量读取。
+    """
+    result = {"config": read_numba_config()}
+
+    start_time = time.perf_counter()
+    from src.interface import entry_func
+    from utils.data_loading import get_synthetic_tohlcv
+    from utils.config_utils import get_params, get_dtype_dict
+    from utils.numba_utils import compile_lazy_kernels
+
+    result["import"] = time.perf_counter() - start_time
+
+    # eager 模式下编译/加载缓存发生在导入时, 这里接近 0
+    start_time = time.perf_counter()
+    result["lazy_kernels"] = compile_lazy_kernels()
+    result["cache_load"] = time.perf_counter() - start_time
+
+    dtype_dict = get_dtype_dict(result["config"]["enable64"])
+    tohlcv = get_synthetic_tohlcv(rows, dtype_dict)
+    params = get_params(num=num, dtype_dict=dtype_dict)
+    args = (
+        result["config"]["mode"],
+        tohlcv,
+        params["indicator_params"],
+        params["indicator_enabled"],
+        params["signal_params"],
+        params["backtest_params"],
+    )
+
+    for key in ["first_call", "second_call"]:
+        start_time = time.perf_counter()
+        entry_func(*args, dtype_dict=dtype_dict, reuse_outputs=False)
+        result[key] = time.perf_counter() - start_time
+
+    return result
+
+
+def main(
+    mode: str = "njit",
+    cache: bool = True,
+    enable64: bool = True,
+    lazy: bool = True,
+    compare: bool = False,
+    rows: int = 2000,
+    child: bool = False,
+):
+    """
+    启动时间基准测试, 在新的子进程中运行, 输出 JSON。
+    compare 为 True 时同时测量 lazy 和 eager 两种模式。
+    """
+    if child:
+        print(json.dumps(measure(rows=rows)))
+        return
+
+    results = []
+    for _lazy in [True, False] if compare else [lazy]:
+        # 配置通过环境变量传给子进程
+        env = dict(os.environ)
+        write_numba_config(
+            mode=mode, cache=cache, enable64=enable64, lazy=_lazy, environ=env
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", "--rows", str(rows)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        # entry_func 会打印其他信息, 结果在最后一行
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for r in results:
+        print(json.dumps(r, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    app = typer.Typer(pretty_exceptions_show_locals=False)
+    app.command()(main)
+    app()
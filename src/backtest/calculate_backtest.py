@@ -9,11 +9,12 @@ from utils.data_types import get_numba_data_types
 from utils.numba_utils import nb_wrapper
 
 
-from src.indicators.atr import calculate_atr
+from src.indicators.atr import calculate_atr, atr_update
 
 from .position_manager import process_trade_logic
 from .trigger_position_exit import calculate_exit_triggers
 from .calculate_balance import calc_balance
+from .calculate_summary import calc_summary
 
 dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
@@ -39,6 +40,9 @@ default_backtest_params = {
     "psar_af0": 0.02,
     "psar_af_step": 0.02,
     "psar_max_af": 0.2,
+    # 提前终止, 回撤超过 max_drawdown_limit (比例) 或净值低于 min_equity 时停止回测, <= 0 表示不启用
+    "max_drawdown_limit": 0.0,
+    "min_equity": 0.0,
 }
 
 
@@ -60,13 +64,19 @@ backtest_result_name = [
     "psar_short",
     "psar_af",
     "psar_reversal",
+    "exit_trigger",  # 触发离场的止盈止损条件, ExitReason 的二进制位组合, 0 表示没有触发
 ]
 backtest_result_count = len(backtest_result_name)
 
+# 初始资金, 目前先硬编码
+init_money = 2000.0
+
 params_child_signature = get_params_child_signature(
     nb_int_type, nb_float_type, nb_bool_type
 )
-signature = nb.void(params_child_signature)
+signature = nb.types.Tuple((nb_int_type, nb_bool_type))(
+    params_child_signature, nb_int_type
+)
 
 
 @nb_wrapper(
@@ -74,20 +84,21 @@ signature = nb.void(params_child_signature)
     signature=signature,
     cache_enabled=nb_params.get("cache", True),
 )
-def calc_backtest(params_child):
-    # 1. 解包 params_child 中的数据数组
+def backtest_loop(params_child, start):
+    """
+    从第 start 根k线开始逐k线交易, 第 start - 1 根k线的回测结果和临时数组必须已经是有效的状态。
+    返回 (end, pruned), end 是实际计算的k线数量, 提前终止时小于总数。
+    """
     (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
     (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
     (
-        indicator_params_child,
-        indicator_params2_child,
-        indicator_enabled,
-        indicator_enabled2,
-        indicator_result_child,
-        indicator_result2_child,
-    ) = indicator_args
-    (signal_params, signal_result_child) = signal_args
-    (backtest_params_child, backtest_result_child) = backtest_args
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
     (
         int_temp_array_child,
         int_temp_array2_child,
@@ -97,69 +108,21 @@ def calc_backtest(params_child):
         bool_temp_array2_child,
     ) = temp_args
 
-    # 6. 从 tohlcv 中提取时间、开盘、最高、最低、收盘、成交量数组
     time_arr = tohlcv[:, 0]
     open_arr = tohlcv[:, 1]
-    high_arr = tohlcv[:, 2]
-    low_arr = tohlcv[:, 3]
-    close_arr = tohlcv[:, 4]
-    volume_arr = tohlcv[:, 5]
-
-    # 7. 从 signal_result_child 中提取信号数组
-    enter_long_signal = signal_result_child[:, 0]
-    exit_long_signal = signal_result_child[:, 1]
-    enter_short_signal = signal_result_child[:, 2]
-    exit_short_signal = signal_result_child[:, 3]
 
-    # 提取回测结果数组
     position_status_result = backtest_result_child[:, 0]
     entry_price_result = backtest_result_child[:, 1]
     exit_price_result = backtest_result_child[:, 2]
     equity_result = backtest_result_child[:, 3]
     balance_result = backtest_result_child[:, 4]
     drawdown_result = backtest_result_child[:, 5]
-    pct_sl_result = backtest_result_child[:, 6]
-    pct_tp_result = backtest_result_child[:, 7]
-    pct_tsl_result = backtest_result_child[:, 8]
-    atr_price_result = backtest_result_child[:, 9]
-    atr_sl_price_result = backtest_result_child[:, 10]
-    atr_tp_price_result = backtest_result_child[:, 11]
-    atr_tsl_price_result = backtest_result_child[:, 12]
-    psar_long_result = backtest_result_child[:, 13]
-    psar_short_result = backtest_result_child[:, 14]
-    psar_af_result = backtest_result_child[:, 15]
-    psar_reversal_result = backtest_result_child[:, 16]
-
-    # 0无仓位,1开多,2持多,3平多,4平空开多,-1开空,-2持空,-3平空,-4平多开空
-    position_status_result[:] = 0
-    entry_price_result[:] = np.nan
-    exit_price_result[:] = np.nan
-    equity_result[:] = np.nan
-    balance_result[:] = np.nan
-    drawdown_result[:] = np.nan
-    pct_sl_result[:] = np.nan
-    pct_tp_result[:] = np.nan
-    pct_tsl_result[:] = np.nan
-    atr_price_result[:] = np.nan
-    atr_sl_price_result[:] = np.nan
-    atr_tp_price_result[:] = np.nan
-    atr_tsl_price_result[:] = np.nan
-    psar_long_result[:] = np.nan
-    psar_short_result[:] = np.nan
-    psar_af_result[:] = np.nan
-    psar_reversal_result[:] = np.nan
 
     temp_max_balance_array = float_temp_array_child[:, 0]  # temp_max_balance_array
-    temp_tr_array = float_temp_array_child[:, 1]  # temp_tr_array
     temp_psar_current = float_temp_array_child[:, 2]  # temp_psar_current
     temp_psar_ep = float_temp_array_child[:, 3]  # temp_psar_ep
-
     temp_psar_is_long = bool_temp_array_child[:, 0]  # temp_psar_is_long
 
-    temp_psar_is_long[:] = False
-    temp_psar_current[:] = np.nan
-    temp_psar_ep[:] = np.nan
-
     # 定义 IS_LONG_POSITION, IS_SHORT_POSITION, IS_NO_POSITION 集合
     IS_LONG_POSITION = (1, 2, 4)
     IS_SHORT_POSITION = (-1, -2, -4)
@@ -188,19 +151,13 @@ def calc_backtest(params_child):
     psar_af_step = backtest_params_child[15]
     psar_max_af = backtest_params_child[16]
 
-    init_money = 2000
-
-    equity_result[:] = init_money
-    balance_result[:] = init_money
-    drawdown_result[:] = init_money
-    temp_max_balance_array[:] = init_money
+    # 提前终止参数
+    max_drawdown_limit = backtest_params_child[17]
+    min_equity = backtest_params_child[18]
 
-    # 全局计算atr
-    calculate_atr(
-        high_arr, low_arr, close_arr, atr_preiod, atr_price_result, temp_tr_array
-    )
-
-    for i in range(1, len(time_arr)):  # 循环从第二根 K 线开始 (i=1)
+    end = len(time_arr)  # 实际计算的k线数量, 提前终止时小于总数
+    pruned = False
+    for i in range(start, len(time_arr)):  # 完整计算时从第二根 K 线开始 (start=1)
         # 尽量不要用中间变量, 直接使用array[i]或array[i-1]来访问, 中间变量会让代码变的难以维护
         # 用last_i 来获取是一个信号,是为了确保在进场离场信号生成后的下一根k线的开盘价进行交易
         last_i = i - 1
@@ -266,3 +223,409 @@ def calc_backtest(params_child):
             IS_SHORT_POSITION,
             IS_NO_POSITION,
         )
+
+        # 大规模参数优化中, 大部分参数组合很差, 触发阈值后不再计算剩余的k线
+        if (max_drawdown_limit > 0 and drawdown_result[i] > max_drawdown_limit) or (
+            min_equity > 0 and equity_result[i] < min_equity
+        ):
+            end = i + 1
+            pruned = True
+            # 没有计算的k线标记为 nan, 和正常结束的结果区分开
+            equity_result[end:] = np.nan
+            balance_result[end:] = np.nan
+            drawdown_result[end:] = np.nan
+            break
+
+    return end, pruned
+
+
+signature = nb.void(params_child_signature)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calc_backtest(params_child):
+    # 1. 解包 params_child 中的数据数组
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+    (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+    (
+        indicator_params_child,
+        indicator_params2_child,
+        indicator_enabled,
+        indicator_enabled2,
+        indicator_result_child,
+        indicator_result2_child,
+    ) = indicator_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+    (
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
+    (
+        int_temp_array_child,
+        int_temp_array2_child,
+        float_temp_array_child,
+        float_temp_array2_child,
+        bool_temp_array_child,
+        bool_temp_array2_child,
+    ) = temp_args
+
+    # 6. 从 tohlcv 中提取时间、开盘、最高、最低、收盘、成交量数组
+    time_arr = tohlcv[:, 0]
+    open_arr = tohlcv[:, 1]
+    high_arr = tohlcv[:, 2]
+    low_arr = tohlcv[:, 3]
+    close_arr = tohlcv[:, 4]
+    volume_arr = tohlcv[:, 5]
+
+    # 7. 从 signal_result_child 中提取信号数组
+    enter_long_signal = signal_result_child[:, 0]
+    exit_long_signal = signal_result_child[:, 1]
+    enter_short_signal = signal_result_child[:, 2]
+    exit_short_signal = signal_result_child[:, 3]
+
+    # 提取回测结果数组
+    position_status_result = backtest_result_child[:, 0]
+    entry_price_result = backtest_result_child[:, 1]
+    exit_price_result = backtest_result_child[:, 2]
+    equity_result = backtest_result_child[:, 3]
+    balance_result = backtest_result_child[:, 4]
+    drawdown_result = backtest_result_child[:, 5]
+    pct_sl_result = backtest_result_child[:, 6]
+    pct_tp_result = backtest_result_child[:, 7]
+    pct_tsl_result = backtest_result_child[:, 8]
+    atr_price_result = backtest_result_child[:, 9]
+    atr_sl_price_result = backtest_result_child[:, 10]
+    atr_tp_price_result = backtest_result_child[:, 11]
+    atr_tsl_price_result = backtest_result_child[:, 12]
+    psar_long_result = backtest_result_child[:, 13]
+    psar_short_result = backtest_result_child[:, 14]
+    psar_af_result = backtest_result_child[:, 15]
+    psar_reversal_result = backtest_result_child[:, 16]
+    exit_trigger_result = backtest_result_child[:, 17]
+
+    # 0无仓位,1开多,2持多,3平多,4平空开多,-1开空,-2持空,-3平空,-4平多开空
+    position_status_result[:] = 0
+    entry_price_result[:] = np.nan
+    exit_price_result[:] = np.nan
+    equity_result[:] = np.nan
+    balance_result[:] = np.nan
+    drawdown_result[:] = np.nan
+    pct_sl_result[:] = np.nan
+    pct_tp_result[:] = np.nan
+    pct_tsl_result[:] = np.nan
+    atr_price_result[:] = np.nan
+    atr_sl_price_result[:] = np.nan
+    atr_tp_price_result[:] = np.nan
+    atr_tsl_price_result[:] = np.nan
+    psar_long_result[:] = np.nan
+    psar_short_result[:] = np.nan
+    psar_af_result[:] = np.nan
+    psar_reversal_result[:] = np.nan
+    exit_trigger_result[:] = 0
+
+    temp_max_balance_array = float_temp_array_child[:, 0]  # temp_max_balance_array
+    temp_tr_array = float_temp_array_child[:, 1]  # temp_tr_array
+    temp_psar_current = float_temp_array_child[:, 2]  # temp_psar_current
+    temp_psar_ep = float_temp_array_child[:, 3]  # temp_psar_ep
+
+    temp_psar_is_long = bool_temp_array_child[:, 0]  # temp_psar_is_long
+
+    temp_psar_is_long[:] = False
+    temp_psar_current[:] = np.nan
+    temp_psar_ep[:] = np.nan
+
+    atr_preiod = backtest_params_child[9]
+
+    equity_result[:] = init_money
+    balance_result[:] = init_money
+    drawdown_result[:] = 0.0
+    temp_max_balance_array[:] = init_money
+
+    # 全局计算atr
+    calculate_atr(
+        high_arr, low_arr, close_arr, atr_preiod, atr_price_result, temp_tr_array
+    )
+
+    end, pruned = backtest_loop(params_child, 1)
+
+    # 在释放工作缓冲区之前, 把逐k线结果归约成标量统计
+    calc_summary(tohlcv, backtest_result_child, backtest_summary_child, end, pruned)
+
+
+# 增量计算只支持 cpu 模式, 需要分配 atr 的状态数组
+if nb_params["mode"] in ["normal", "njit"]:
+
+    signature = nb.void(params_child_signature, nb_int_type)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+    )
+    def calc_backtest_resume(params_child, start):
+        """
+        增量计算: tohlcv 和信号从第 start 根k线开始变化, 之前的回测结果是上一次完整计算的结果。
+        psar, 跟踪止损等状态在开仓时初始化, 所以从第 start - 1 根k线所在仓位的开仓k线 resume 开始重新交易,
+        resume 之前的最大余额从余额列中取最大值, atr 用第 start - 1 根k线的结果作为 rma 的状态继续递推,
+        结果和完整计算相同。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+        (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+        (
+            backtest_params_child,
+            backtest_result_child,
+            backtest_summary_child,
+            trade_result_child,
+            trade_count_child,
+        ) = backtest_args
+        (
+            int_temp_array_child,
+            int_temp_array2_child,
+            float_temp_array_child,
+            float_temp_array2_child,
+            bool_temp_array_child,
+            bool_temp_array2_child,
+        ) = temp_args
+
+        position_status_result = backtest_result_child[:, 0]
+        equity_result = backtest_result_child[:, 3]
+        balance_result = backtest_result_child[:, 4]
+        drawdown_result = backtest_result_child[:, 5]
+        atr_price_result = backtest_result_child[:, 9]
+
+        # 回到第 start - 1 根k线所在仓位的开仓k线
+        resume = start
+        while resume > 1 and position_status_result[resume - 1] in (2, -2):
+            resume -= 1
+        if resume > 1 and position_status_result[resume - 1] in (1, 4, -1, -4):
+            resume -= 1
+
+        atr_preiod = int(backtest_params_child[9])
+        if resume <= 1 or start <= atr_preiod + 1:
+            calc_backtest(params_child)
+            return
+
+        rows = tohlcv.shape[0]
+        max_drawdown_limit = backtest_params_child[17]
+        min_equity = backtest_params_child[18]
+
+        # 上一次计算已经在 resume 之前提前终止
+        end = rows
+        pruned = False
+        if equity_result[resume - 1] != equity_result[resume - 1]:
+            pruned = True
+            end = resume - 1
+            while end > 0 and equity_result[end - 1] != equity_result[end - 1]:
+                end -= 1
+        elif (
+            max_drawdown_limit > 0 and drawdown_result[resume - 1] > max_drawdown_limit
+        ) or (min_equity > 0 and equity_result[resume - 1] < min_equity):
+            pruned = True
+            end = resume
+
+        # 和 calc_backtest 的初始化相同, atr 只有 start 之后的k线需要重新计算
+        for i in range(resume, rows):
+            row = backtest_result_child[i]
+            atr = row[9]
+            row[:] = np.nan
+            row[0] = 0
+            row[3] = init_money
+            row[4] = init_money
+            row[5] = 0.0
+            row[9] = atr
+            row[17] = 0
+
+        # atr 的状态: [上一根k线的 close, k线数, 累加和 (已经不需要), 上一根k线的 rma]
+        atr_state = np.zeros(4)
+        atr_state[0] = tohlcv[start - 1, 4]
+        atr_state[1] = start
+        atr_state[3] = atr_price_result[start - 1]
+        for i in range(start, rows):
+            atr_price_result[i] = atr_update(
+                tohlcv[i, 2], tohlcv[i, 3], tohlcv[i, 4], atr_preiod, atr_state
+            )
+
+        if pruned:
+            equity_result[end:] = np.nan
+            balance_result[end:] = np.nan
+            drawdown_result[end:] = np.nan
+        else:
+            temp_max_balance_array = float_temp_array_child[:, 0]
+            max_balance = init_money
+            for i in range(1, resume):
+                max_balance = max(max_balance, balance_result[i])
+            temp_max_balance_array[resume - 1] = max_balance
+            float_temp_array_child[resume - 1 :, 2] = np.nan
+            float_temp_array_child[resume - 1 :, 3] = np.nan
+            bool_temp_array_child[resume - 1 :, 0] = False
+
+            end, pruned = backtest_loop(params_child, resume)
+
+        calc_summary(tohlcv, backtest_result_child, backtest_summary_child, end, pruned)
+
+
+signature = nb.void(
+    params_child_signature,
+    nb_float_type[:, :],  # backtest_state_child
+    nb_bool_type[:],  # psar_is_long_child
+    nb.float64[:],  # atr_state_child
+    nb_bool_type[:],  # pruned_child
+    nb_int_type,  # bar_index
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calc_backtest_stream(
+    params_child,
+    backtest_state_child,
+    psar_is_long_child,
+    atr_state_child,
+    pruned_child,
+    bar_index,
+):
+    """
+    流式版本的 calc_backtest, 只计算最新的一根k线, 复杂度 O(1)。
+    backtest_result_child 是最近 W 根k线的窗口, 最后一行是新的k线,
+    和 calc_backtest 一样依次调用 process_trade_logic, calculate_exit_triggers, calc_balance,
+    i 和 last_i 是窗口中的行号。
+    calc_backtest 的临时数组换成按 config 保存的窗口:
+    backtest_state_child (W, 3): max_balance, psar_current, psar_ep
+    psar_is_long_child (W,), atr_state_child 是 atr_update 的状态, pruned_child[0] 是否已经提前终止。
+    不计算 backtest_summary。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+    (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+    (
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
+
+    window = backtest_result_child.shape[0]
+    i = window - 1
+    last_i = i - 1
+
+    # 窗口整体前移一行
+    for r in range(window - 1):
+        backtest_result_child[r, :] = backtest_result_child[r + 1, :]
+        backtest_state_child[r, :] = backtest_state_child[r + 1, :]
+        psar_is_long_child[r] = psar_is_long_child[r + 1]
+
+    # 和 calc_backtest 循环前的初始化相同
+    row = backtest_result_child[i]
+    row[:] = np.nan
+    row[0] = 0
+    row[3] = init_money
+    row[4] = init_money
+    row[5] = 0.0
+    row[17] = 0
+    backtest_state_child[i, 0] = init_money
+    backtest_state_child[i, 1] = np.nan
+    backtest_state_child[i, 2] = np.nan
+    psar_is_long_child[i] = False
+
+    high_arr = tohlcv[:, 2]
+    low_arr = tohlcv[:, 3]
+    close_arr = tohlcv[:, 4]
+    atr_preiod = int(backtest_params_child[9])
+    row[9] = atr_update(
+        high_arr[i], low_arr[i], close_arr[i], atr_preiod, atr_state_child
+    )
+
+    if pruned_child[0]:
+        row[3] = np.nan
+        row[4] = np.nan
+        row[5] = np.nan
+        return
+
+    # 第一根k线只初始化, 和 calc_backtest 一样从第二根k线开始交易
+    if bar_index == 0:
+        return
+
+    IS_LONG_POSITION = (1, 2, 4)
+    IS_SHORT_POSITION = (-1, -2, -4)
+    IS_NO_POSITION = (0, 3, -3)
+
+    target_price = tohlcv[i, 1]  # 在开盘价进场
+    close_for_reversal = False
+
+    process_trade_logic(
+        i,
+        last_i,
+        target_price,
+        signal_result_child,
+        backtest_result_child,
+        IS_LONG_POSITION,
+        IS_SHORT_POSITION,
+        IS_NO_POSITION,
+    )
+
+    calculate_exit_triggers(
+        i,
+        last_i,
+        target_price,
+        tohlcv,
+        signal_result_child,
+        backtest_result_child,
+        psar_is_long_child,
+        backtest_state_child[:, 1],
+        backtest_state_child[:, 2],
+        IS_LONG_POSITION,
+        IS_SHORT_POSITION,
+        IS_NO_POSITION,
+        backtest_params_child[0],
+        backtest_params_child[1],
+        backtest_params_child[2],
+        backtest_params_child[3],
+        backtest_params_child[4],
+        backtest_params_child[5],
+        backtest_params_child[6],
+        backtest_params_child[7],
+        backtest_params_child[8],
+        backtest_params_child[10],
+        backtest_params_child[11],
+        backtest_params_child[12],
+        backtest_params_child[13],
+        backtest_params_child[14],
+        backtest_params_child[15],
+        backtest_params_child[16],
+        close_for_reversal,
+    )
+
+    calc_balance(
+        i,
+        last_i,
+        target_price,
+        tohlcv,
+        backtest_result_child[:, 0],
+        backtest_result_child[:, 1],
+        backtest_result_child[:, 2],
+        backtest_result_child[:, 3],
+        backtest_result_child[:, 4],
+        backtest_result_child[:, 5],
+        backtest_state_child[:, 0],
+        IS_LONG_POSITION,
+        IS_SHORT_POSITION,
+        IS_NO_POSITION,
+    )
+
+    max_drawdown_limit = backtest_params_child[17]
+    min_equity = backtest_params_child[18]
+    if (max_drawdown_limit > 0 and row[5] > max_drawdown_limit) or (
+        min_equity > 0 and row[3] < min_equity
+    ):
+        pruned_child[0] = True
@@ -0,0 +1,148 @@
+import numba as nb
+import numpy as np
+import math
+
+
+from utils.numba_params import nb_params
+from utils.data_types import get_numba_data_types
+from utils.numba_utils import nb_wrapper
+
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+
+backtest_summary_name = [
+    "final_balance",
+    "final_equity",
+    "max_drawdown",
+    "trade_count",
+    "win_count",
+    "win_rate",
+    "pruned",  # 1 表示触发了 max_drawdown_limit 或 min_equity, 回测提前终止
+    # 风险收益指标, 用逐k线的 equity 收益率计算, 按k线周期年化, 无风险利率为 0
+    "total_return",
+    "annual_return",
+    "sharpe",
+    "sortino",
+    "calmar",  # annual_return / max_drawdown
+    "profit_factor",  # 盈利交易的总盈利 / 亏损交易的总亏损
+]
+backtest_summary_count = len(backtest_summary_name)
+
+year_ms = 365 * 24 * 60 * 60 * 1000  # 加密货币全年交易, 时间戳单位是毫秒
+
+
+signature = nb.void(
+    nb_float_type[:, :],  # tohlcv
+    nb_float_type[:, :],  # backtest_result_child
+    nb_float_type[:],  # backtest_summary_child
+    nb_int_type,  # end
+    nb_bool_type,  # pruned
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calc_summary(tohlcv, backtest_result_child, backtest_summary_child, end, pruned):
+    """
+    把单个 config 的逐k线回测结果归约成标量统计和风险收益指标, 写入 backtest_summary_child。
+    只统计前 end 行, pruned 为 True 表示回测因为阈值提前终止了。
+    所有统计在同一次循环中完成, 收益率的均值和方差用 Welford 算法累加。
+    在 summary_only 模式下, backtest_result_child 只是工作线程的临时缓冲区,
+    下一个 config 会覆盖它, 所以必须在 calc_backtest 结束前完成归约。
+    """
+    position_status_result = backtest_result_child[:, 0]
+    equity_result = backtest_result_child[:, 3]
+    balance_result = backtest_result_child[:, 4]
+    drawdown_result = backtest_result_child[:, 5]
+
+    backtest_summary_child[:] = np.nan
+
+    n = min(end, backtest_result_child.shape[0])
+    if n == 0:
+        backtest_summary_child[6] = 1.0 if pruned else 0.0
+        return
+
+    time_arr = tohlcv[:, 0]
+
+    max_drawdown = 0.0
+    trade_count = 0
+    win_count = 0
+    gross_profit = 0.0
+    gross_loss = 0.0
+    return_count = 0
+    return_mean = 0.0
+    return_m2 = 0.0
+    downside_sum = 0.0
+    for i in range(n):
+        if drawdown_result[i] > max_drawdown:
+            max_drawdown = drawdown_result[i]
+
+        if i == 0:
+            continue
+
+        # 3平多,-3平空,4平空开多,-4平多开空, 都算完成了一笔交易
+        if position_status_result[i] in (3, -3, 4, -4):
+            trade_count += 1
+            pnl = balance_result[i] - balance_result[i - 1]
+            if pnl > 0:
+                win_count += 1
+                gross_profit += pnl
+            else:
+                gross_loss -= pnl
+
+        if equity_result[i - 1] > 0:
+            r = equity_result[i] / equity_result[i - 1] - 1
+            return_count += 1
+            delta = r - return_mean
+            return_mean += delta / return_count
+            return_m2 += delta * (r - return_mean)
+            if r < 0:
+                downside_sum += r * r
+
+    backtest_summary_child[0] = balance_result[n - 1]
+    backtest_summary_child[1] = equity_result[n - 1]
+    backtest_summary_child[2] = max_drawdown
+    backtest_summary_child[3] = trade_count
+    backtest_summary_child[4] = win_count
+    if trade_count > 0:
+        backtest_summary_child[5] = win_count / trade_count
+    backtest_summary_child[6] = 1.0 if pruned else 0.0
+
+    init_equity = equity_result[0]
+    total_return = equity_result[n - 1] / init_equity - 1
+    backtest_summary_child[7] = total_return
+
+    if n < 2 or time_arr[n - 1] <= time_arr[0]:
+        return
+    # 平均k线周期, 用于年化
+    bars_per_year = year_ms * (n - 1) / (time_arr[n - 1] - time_arr[0])
+    years = (n - 1) / bars_per_year
+
+    annual_return = np.nan
+    if total_return > -1:
+        annual_return = (1 + total_return) ** (1 / years) - 1
+    backtest_summary_child[8] = annual_return
+
+    if return_count > 1:
+        std = math.sqrt(return_m2 / (return_count - 1))
+        if std > 0:
+            backtest_summary_child[9] = return_mean / std * math.sqrt(bars_per_year)
+        downside_std = math.sqrt(downside_sum / return_count)
+        if downside_std > 0:
+            backtest_summary_child[10] = (
+                return_mean / downside_std * math.sqrt(bars_per_year)
+            )
+
+    if max_drawdown > 0:
+        backtest_summary_child[11] = annual_return / max_drawdown
+    if gross_loss > 0:
+        backtest_summary_child[12] = gross_profit / gross_loss
+    elif gross_profit > 0:
+        backtest_summary_child[12] = np.inf
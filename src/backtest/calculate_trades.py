@@ -0,0 +1,167 @@
+import numba as nb
+import numpy as np
+
+
+from utils.numba_params import nb_params
+from utils.data_types import get_numba_data_types, get_params_child_signature
+from utils.numba_utils import nb_wrapper
+
+from .trigger_position_exit import ExitReason
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+
+trade_result_name = [
+    "entry_bar",
+    "exit_bar",
+    "side",  # 1 多头, -1 空头
+    "entry_price",
+    "exit_price",
+    "pnl",  # 这笔交易带来的余额变化
+    "exit_reason",  # ExitReason 的二进制位组合
+]
+trade_result_count = len(trade_result_name)
+
+
+params_child_signature = get_params_child_signature(
+    nb_int_type, nb_float_type, nb_bool_type
+)
+signature = nb.void(params_child_signature)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calc_trades(params_child):
+    """
+    从单个 config 的逐k线回测结果中提取交易记录, 写入 trade_result_child (max_trades, trade_result_count)。
+    trade_result_child 是环形缓冲区, 交易数超过 max_trades 时只保留最近的 max_trades 笔,
+    第 n 笔交易写在 n % max_trades 行, trade_count_child[0] 是交易总数, 没有交易的行是 nan。
+    回测结束时仍然持仓的交易也会记录, exit_reason 包含 ExitReason.open。
+    和 calc_summary 一样, 必须在 calc_backtest 之后, 工作缓冲区被下一个 config 覆盖之前调用。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+    (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+    (
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
+
+    open_arr = tohlcv[:, 1]
+
+    position_status_result = backtest_result_child[:, 0]
+    entry_price_result = backtest_result_child[:, 1]
+    exit_price_result = backtest_result_child[:, 2]
+    equity_result = backtest_result_child[:, 3]
+    balance_result = backtest_result_child[:, 4]
+    exit_trigger_result = backtest_result_child[:, 17]
+
+    trade_count_child[0] = 0
+    max_trades = trade_result_child.shape[0]
+    if max_trades == 0:
+        return
+    # 交易数少于 max_trades 时没有写入的行是 nan, 不保留上一次计算或者未初始化的内容
+    trade_result_child[:] = np.nan
+
+    # 提前终止时, 没有计算的k线的 equity 是 nan
+    end = backtest_result_child.shape[0]
+    while end > 0 and np.isnan(equity_result[end - 1]):
+        end -= 1
+
+    count = 0
+    entry_bar = -1
+    side = 0
+    for i in range(1, end):
+        status = position_status_result[i]
+
+        # 3平多,-3平空,4平空开多,-4平多开空, 都会结束上一笔交易
+        if entry_bar >= 0 and status in (3, -3, 4, -4):
+            # 离场信号在上一根k线生成, 在这一根k线的开盘价成交
+            exit_reason = int(exit_trigger_result[i - 1])
+            if exit_reason == 0:
+                exit_reason |= ExitReason.signal
+            if status in (4, -4):
+                exit_reason |= ExitReason.reversal
+
+            row = trade_result_child[count % max_trades]
+            row[0] = entry_bar
+            row[1] = i
+            row[2] = side
+            row[3] = entry_price_result[i - 1]
+            row[4] = exit_price_result[i]
+            row[5] = balance_result[i] - balance_result[i - 1]
+            row[6] = exit_reason
+            count += 1
+            entry_bar = -1
+
+        # 1开多,-1开空,4平空开多,-4平多开空, 都会开始新的交易
+        if status in (1, 4):
+            entry_bar = i
+            side = 1
+        elif status in (-1, -4):
+            entry_bar = i
+            side = -1
+
+    if entry_bar >= 0:
+        last = end - 1
+        row = trade_result_child[count % max_trades]
+        row[0] = entry_bar
+        row[1] = last
+        row[2] = side
+        row[3] = entry_price_result[last]
+        row[4] = open_arr[last]
+        row[5] = equity_result[last] - balance_result[last]
+        row[6] = ExitReason.open.value
+        count += 1
+
+    trade_count_child[0] = count
+
+
+def get_trade_records(trade_result, trade_count):
+    """
+    把 (conf_count, max_trades, trade_result_count) 的环形缓冲区展开成紧凑的结构化数组,
+    每个 config 的交易按时间顺序排列, 只包含缓冲区中保留的交易。
+
+    返回的结构化数组字段: config_idx 和 trade_result_name。
+    """
+    fields = [("config_idx", np.int64)]
+    for name in trade_result_name:
+        if name in ("entry_bar", "exit_bar", "side", "exit_reason"):
+            fields.append((name, np.int64))
+        else:
+            fields.append((name, trade_result.dtype))
+
+    max_trades = trade_result.shape[1]
+    kept = np.minimum(trade_count, max_trades)
+    records = np.empty(int(kept.sum()), dtype=fields)
+
+    pos = 0
+    for idx in range(trade_result.shape[0]):
+        n = int(kept[idx])
+        if n == 0:
+            continue
+        # 环形缓冲区写满后, 最早的一笔在 trade_count % max_trades 行
+        start = int(trade_count[idx]) % max_trades if trade_count[idx] > max_trades else 0
+        order = (start + np.arange(n)) % max_trades
+        rows = trade_result[idx, order]
+
+        records["config_idx"][pos : pos + n] = idx
+        for col, name in enumerate(trade_result_name):
+            records[name][pos : pos + n] = rows[:, col]
+        pos += n
+    return records
+
+
+def decode_exit_reason(exit_reason):
+    """
+    把 exit_reason 的二进制位组合转换成 ExitReason 名称列表。
+    """
+    return [i.name for i in ExitReason if int(exit_reason) & i.value]
@@ -41,3 +41,30 @@ def clean_signal(signal_result_child):
         if enter_long_signal[i] and enter_short_signal[i]:
             enter_long_signal[i] = False
             enter_short_signal[i] = False
+
+
+signature = nb.void(
+    nb.uint64[:, :],  # signal_bits_child
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def clean_signal_bits(signal_bits_child):
+    """
+    按位保存的信号 (signal_result_count, words) 的 clean_signal, 每次处理 64 根k线, 结果相同。
+    """
+    for w in range(signal_bits_child.shape[1]):
+        enter_long_signal = signal_bits_child[0, w]
+        exit_long_signal = signal_bits_child[1, w]
+        enter_short_signal = signal_bits_child[2, w]
+        exit_short_signal = signal_bits_child[3, w]
+
+        enter_long_signal &= ~exit_long_signal
+        enter_short_signal &= ~exit_short_signal
+        both = enter_long_signal & enter_short_signal
+        signal_bits_child[0, w] = enter_long_signal & ~both
+        signal_bits_child[2, w] = enter_short_signal & ~both
@@ -5,6 +5,7 @@ import numpy as np
 from src.indicators.psar import psar_init, psar_update
 
 import math
+from enum import IntEnum
 from utils.data_types import get_params_child_signature
 
 
@@ -18,6 +19,25 @@ nb_int_type = dtype_dict["nb"]["int"]
 nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
 
+
+class ExitReason(IntEnum):
+    """
+    离场原因, 每个原因一个二进制位, 同一根k线可以同时满足多个条件。
+    止盈止损条件记录在 backtest_result 的 exit_trigger 列, 其他原因由 calculate_trades 补充。
+    """
+
+    signal = 1  # 策略的离场信号
+    pct_sl = 2
+    pct_tp = 4
+    pct_tsl = 8
+    atr_sl = 16
+    atr_tp = 32
+    atr_tsl = 64
+    psar = 128
+    reversal = 256  # 反手
+    open = 512  # 回测结束时仍然持仓, 按最后一根k线的开盘价估值
+
+
 # 定义 Numba 签名
 signature = nb.void(
     nb_int_type,  # i
@@ -124,6 +144,7 @@ def calculate_exit_triggers(
     psar_short_result = backtest_result_child[:, 14]
     psar_af_result = backtest_result_child[:, 15]
     psar_reversal_result = backtest_result_child[:, 16]
+    exit_trigger_result = backtest_result_child[:, 17]
 
     atr = atr_price_result[i]
     atr_sl = atr * atr_sl_multiplier
@@ -316,32 +337,33 @@ def calculate_exit_triggers(
     if position_status_result[i] in IS_LONG_POSITION:
         exit_price = close_arr[i] if close_for_reversal else low_arr[i]
 
-        # 假设 i 是循环变量
-        is_exit_signal = False
+        # 记录满足的离场条件, 每个条件一个二进制位, 见 ExitReason
+        exit_trigger = 0
 
         # 检查 pct_enable 相关的条件
         if pct_sl_enable and exit_price < pct_sl_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.pct_sl
         if pct_tp_enable and exit_price > pct_tp_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.pct_tp
         if pct_tsl_enable and exit_price < pct_tsl_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.pct_tsl
 
         # 检查 atr_enable 相关的条件
         if atr_sl_enable and exit_price < atr_sl_price_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.atr_sl
         if atr_tp_enable and exit_price > atr_tp_price_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.atr_tp
         if atr_tsl_enable and exit_price < atr_tsl_price_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.atr_tsl
 
         # 检查 psar_enable 相关的条件
         if psar_enable:
             if psar_reversal_result[i] == 1:
-                is_exit_signal = True
+                exit_trigger |= ExitReason.psar
 
         # 如果任何一个条件为真，则执行信号操作
-        if is_exit_signal:
+        if exit_trigger != 0:
+            exit_trigger_result[i] = exit_trigger
             exit_long_signal[i] = True
             enter_long_signal[i] = False
             exit_short_signal[i] = False
@@ -349,32 +371,33 @@ def calculate_exit_triggers(
     elif position_status_result[i] in IS_SHORT_POSITION:
         exit_price = close_arr[i] if close_for_reversal else high_arr[i]
 
-        # 假设 i 是循环变量
-        is_exit_short_signal = False
+        # 记录满足的离场条件, 每个条件一个二进制位, 见 ExitReason
+        exit_trigger = 0
 
         # 检查 pct_enable 相关的条件
         if pct_sl_enable and exit_price > pct_sl_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.pct_sl
         if pct_tp_enable and exit_price < pct_tp_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.pct_tp
         if pct_tsl_enable and exit_price > pct_tsl_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.pct_tsl
 
         # 检查 atr_enable 相关的条件
         if atr_sl_enable and exit_price > atr_sl_price_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.atr_sl
         if atr_tp_enable and exit_price < atr_tp_price_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.atr_tp
         if atr_tsl_enable and exit_price > atr_tsl_price_result[i]:
-            is_exit_signal = True
+            exit_trigger |= ExitReason.atr_tsl
 
         # 检查 psar 相关的做空平仓条件
         if psar_enable:
             if psar_reversal_result[i] == 1:
-                is_exit_short_signal = True
+                exit_trigger |= ExitReason.psar
 
         # 如果任何一个条件为真，则执行信号操作
-        if is_exit_short_signal:
+        if exit_trigger != 0:
+            exit_trigger_result[i] = exit_trigger
             exit_short_signal[i] = True
             enter_short_signal[i] = False
             exit_long_signal[i] = False
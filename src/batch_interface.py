@@ -0,0 +1,410 @@
+import time
+
+import numpy as np
+
+from src.calculate_batch import parallel_calc_indicators_batch, parallel_calc_batch
+from utils.config_utils import get_mapping_data, default_dtype_dict
+from utils.resample_data import resample_tohlcv
+from utils.profile_utils import TimingReport, create_profile_counters
+from utils.numba_unpack import (
+    ArraySpec,
+    unpack_params,
+    create_outputs,
+    get_outputs_spec,
+    get_unique_indicator_params,
+    get_slot_count,
+)
+from utils.numba_utils import compile_lazy_kernels
+
+
+def concat_tohlcv(tohlcv_list, dtype_dict=default_dtype_dict):
+    """
+    把多个品种的 tohlcv 按行拼接, 返回 (tohlcv, offsets),
+    offsets[s]:offsets[s + 1] 是第 s 个品种的行, 用于 entry_func_batch。
+    """
+    np_int_type = dtype_dict["np"]["int"]
+    np_float_type = dtype_dict["np"]["float"]
+    offsets = np.zeros(len(tohlcv_list) + 1, dtype=np_int_type)
+    offsets[1:] = np.cumsum([len(i) for i in tohlcv_list])
+    if len(tohlcv_list) == 0:
+        return np.empty((0, 6), dtype=np_float_type), offsets
+    tohlcv = np.concatenate(tohlcv_list).astype(np_float_type, copy=False)
+    return np.ascontiguousarray(tohlcv), offsets
+
+
+def check_offsets(offsets, rows, name="offsets"):
+    offsets = np.asarray(offsets)
+    if (
+        offsets.ndim != 1
+        or offsets.shape[0] < 2
+        or offsets[0] != 0
+        or offsets[-1] != rows
+        or np.any(np.diff(offsets) <= 0)
+    ):
+        raise ValueError(
+            f"{name} 必须从 0 开始严格递增到拼接后的k线数量 {rows}, 每个品种至少一根k线"
+        )
+
+
+def get_batch_inputs(
+    tohlcv,
+    offsets,
+    tohlcv2,
+    offsets2,
+    mapping_data,
+    tohlcv2_multiple,
+    dtype_dict,
+    use_tohlcv2=True,
+):
+    """
+    逐个品种补齐 tohlcv2 和 mapping_data, 规则和 entry_func 相同, mapping_data 的下标相对于每个品种自己的 tohlcv2。
+    use_tohlcv2 为 False (没有启用 tohlcv2 的指标) 或者没有传入 tohlcv2 时 mapping_data 全是 0, 不推断k线周期。
+    """
+    np_int_type = dtype_dict["np"]["int"]
+    symbol_count = offsets.shape[0] - 1
+    if tohlcv2 is None:
+        tohlcv2_list = []
+        mapping_list = []
+        for s in range(symbol_count):
+            _tohlcv = tohlcv[offsets[s] : offsets[s + 1]]
+            if tohlcv2_multiple is not None:
+                _tohlcv2, _mapping_data = resample_tohlcv(
+                    _tohlcv, tohlcv2_multiple, dtype_dict
+                )
+            else:
+                _tohlcv2 = _tohlcv.copy()
+                _mapping_data = np.zeros(_tohlcv.shape[0], dtype=np_int_type)
+            tohlcv2_list.append(_tohlcv2)
+            mapping_list.append(_mapping_data)
+        tohlcv2, offsets2 = concat_tohlcv(tohlcv2_list, dtype_dict)
+        if mapping_data is None:
+            mapping_data = np.concatenate(mapping_list)
+    elif offsets2 is None:
+        raise ValueError("传入 tohlcv2 时必须同时传入 offsets2")
+
+    if mapping_data is None and not use_tohlcv2:
+        mapping_data = np.zeros(tohlcv.shape[0], dtype=np_int_type)
+    if mapping_data is None:
+        mapping_data = np.concatenate(
+            [
+                get_mapping_data(
+                    tohlcv[offsets[s] : offsets[s + 1]],
+                    tohlcv2[offsets2[s] : offsets2[s + 1]],
+                    dtype_dict,
+                )
+                for s in range(symbol_count)
+            ]
+        )
+    offsets2 = np.ascontiguousarray(offsets2, dtype=np_int_type)
+    mapping_data = np.ascontiguousarray(mapping_data, dtype=np_int_type)
+    return tohlcv2, offsets2, mapping_data
+
+
+def get_batch_outputs_spec(
+    mode,
+    tohlcv,
+    tohlcv2,
+    offsets,
+    offsets2,
+    indicator_params,
+    indicator_params2,
+    indicator_enabled,
+    indicator_enabled2,
+    conf_count,
+    dtype_dict,
+    temp_int_num,
+    temp_float_num,
+    temp_bool_num,
+    summary_only,
+    slot_count,
+    max_trades,
+):
+    """
+    和 get_outputs_spec 的结构相同:
+    - 指标, 信号和回测结果的k线维度是拼接后的k线数量, 每个品种是其中 offsets 的一段
+    - 临时数组 (以及 summary_only 时的信号和回测结果) 是工作缓冲区, 按最长的品种分配
+    - backtest_summary, trade_result, trade_count, signal_bits 的第一维是品种数量
+    """
+    np_float_type = dtype_dict["np"]["float"]
+    symbol_count = offsets.shape[0] - 1
+    max_rows = int(np.max(np.diff(offsets)))
+    max_rows2 = int(np.max(np.diff(offsets2)))
+
+    kwargs = dict(
+        temp_int_num=temp_int_num,
+        temp_float_num=temp_float_num,
+        temp_bool_num=temp_bool_num,
+        summary_only=summary_only,
+        slot_count=slot_count,
+        max_trades=max_trades,
+    )
+    args = (
+        indicator_params,
+        indicator_params2,
+        indicator_enabled,
+        indicator_enabled2,
+        conf_count,
+        dtype_dict,
+    )
+    spec = get_outputs_spec(mode, tohlcv, tohlcv2, *args, **kwargs)
+    slot_spec = get_outputs_spec(
+        mode,
+        ArraySpec((max_rows, tohlcv.shape[1]), np_float_type),
+        ArraySpec((max_rows2, tohlcv2.shape[1]), np_float_type),
+        *args,
+        **kwargs,
+    )
+    (
+        tohlcv_smooth,
+        tohlcv_smooth2,
+        indicator_result,
+        indicator_result2,
+        signal_result,
+        signal_bits,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
+        temp_args,
+    ) = spec
+    if summary_only:
+        signal_result = slot_spec[4]
+        backtest_result = slot_spec[6]
+
+    def add_symbol_dim(item):
+        return ArraySpec((symbol_count,) + tuple(item.shape), item.dtype)
+
+    return (
+        tohlcv_smooth,
+        tohlcv_smooth2,
+        indicator_result,
+        indicator_result2,
+        signal_result,
+        add_symbol_dim(signal_bits),
+        backtest_result,
+        add_symbol_dim(backtest_summary),
+        add_symbol_dim(trade_result),
+        add_symbol_dim(trade_count),
+        slot_spec[10],
+    )
+
+
+def entry_func_batch(
+    mode,
+    tohlcv,
+    offsets,
+    indicator_params,
+    indicator_enabled,
+    signal_params,
+    backtest_params,
+    tohlcv2=None,
+    offsets2=None,
+    mapping_data=None,
+    indicator_params2=None,
+    indicator_enabled2=None,
+    tohlcv2_multiple=None,
+    dtype_dict=default_dtype_dict,
+    temp_int_num=1,
+    temp_float_num=4,
+    temp_bool_num=4,
+    core_time=False,
+    summary_only=False,
+    slot_count=None,
+    max_trades=0,
+    report=None,
+):
+    """
+    多品种批量计算, 所有品种使用同一组参数, 一次调用完成, 结果和对每个品种分别调用 entry_func 相同。
+
+    tohlcv 是所有品种的k线按行拼接的数组, offsets[s]:offsets[s + 1] 是第 s 个品种的行 (见 concat_tohlcv),
+    tohlcv2 和 offsets2 同理, mapping_data 按 tohlcv 拼接, 下标相对于每个品种自己的 tohlcv2。
+    不传 tohlcv2 时和 entry_func 一样逐个品种生成 (tohlcv2_multiple 重采样, 或者拷贝 tohlcv)。
+
+    指标阶段在一个 prange 中并发计算 (品种, 去重后的参数行) 对, 回测阶段并发计算 (品种, config) 对,
+    每个品种的 config 很少时也能用满所有线程, 数组只分配一次。
+    slot_count 默认由 get_slot_count 按 (品种, config) 对的数量计算。
+
+    返回和 entry_func 相同的键, 用 get_symbol_output 取出单个品种的结果:
+    - 指标, 信号和回测结果的k线维度是拼接后的k线数量
+    - backtest_summary (symbol_count, conf_count, n), trade_result 和 trade_count 的第一维也是品种
+    - offsets, offsets2
+    只支持 normal 和 njit 模式, 不使用 outputs_global 的缓存, 不支持 warm_start 和 pack_signals。
+    """
+    if mode not in ["normal", "njit"]:
+        raise ValueError(f"entry_func_batch 不支持 {mode} 模式")
+    if report is None:
+        report = TimingReport()
+
+    # lazy 模式下第一次调用时才编译或加载缓存
+    compile_lazy_kernels()
+
+    start_time = time.perf_counter()
+
+    np_int_type = dtype_dict["np"]["int"]
+    np_float_type = dtype_dict["np"]["float"]
+    tohlcv = np.ascontiguousarray(tohlcv, dtype=np_float_type)
+    offsets = np.ascontiguousarray(offsets, dtype=np_int_type)
+    check_offsets(offsets, tohlcv.shape[0])
+    if indicator_enabled2 is None:
+        indicator_enabled2 = np.zeros_like(indicator_enabled)
+    tohlcv2, offsets2, mapping_data = get_batch_inputs(
+        tohlcv,
+        offsets,
+        tohlcv2,
+        offsets2,
+        mapping_data,
+        tohlcv2_multiple,
+        dtype_dict,
+        use_tohlcv2=indicator_enabled2.any(),
+    )
+    tohlcv2 = np.ascontiguousarray(tohlcv2, dtype=np_float_type)
+    check_offsets(offsets2, tohlcv2.shape[0], "offsets2")
+    if offsets2.shape != offsets.shape:
+        raise ValueError("offsets 和 offsets2 的品种数量不同")
+
+    if indicator_params2 is None:
+        indicator_params2 = tuple(i.copy() for i in indicator_params)
+
+    indicator_params, indicator_index = get_unique_indicator_params(
+        indicator_params, indicator_enabled, dtype_dict
+    )
+    indicator_params2, indicator_index2 = get_unique_indicator_params(
+        indicator_params2, indicator_enabled2, dtype_dict
+    )
+
+    conf_count = backtest_params.shape[0]
+    symbol_count = offsets.shape[0] - 1
+    slot_count = get_slot_count(mode, symbol_count * conf_count, slot_count)
+
+    plan_time = time.perf_counter()
+
+    outputs_spec = get_batch_outputs_spec(
+        mode,
+        tohlcv,
+        tohlcv2,
+        offsets,
+        offsets2,
+        indicator_params,
+        indicator_params2,
+        indicator_enabled,
+        indicator_enabled2,
+        conf_count,
+        dtype_dict,
+        temp_int_num,
+        temp_float_num,
+        temp_bool_num,
+        summary_only,
+        slot_count,
+        max_trades,
+    )
+    outputs = create_outputs(mode, outputs_spec)
+    (
+        tohlcv_smooth,
+        tohlcv_smooth2,
+        indicator_result,
+        indicator_result2,
+        signal_result,
+        signal_bits,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
+        temp_args,
+    ) = outputs
+    batch_args = (
+        offsets,
+        offsets2,
+        backtest_summary,
+        trade_result,
+        trade_count,
+        signal_bits,
+    )
+    # params 中按品种分开的数组只是为了凑齐类型, 内核中用 batch_args 中第 symbol 个品种的切片
+    params_outputs = (
+        tohlcv_smooth,
+        tohlcv_smooth2,
+        indicator_result,
+        indicator_result2,
+        signal_result,
+        signal_bits[0],
+        backtest_result,
+        backtest_summary[0],
+        trade_result[0],
+        trade_count[0],
+        temp_args,
+    )
+    inputs = (
+        tohlcv,
+        tohlcv2,
+        mapping_data,
+        indicator_params,
+        indicator_params2,
+        indicator_enabled,
+        indicator_enabled2,
+        signal_params,
+        backtest_params,
+        indicator_index,
+        indicator_index2,
+    )
+    params = unpack_params(params_outputs, inputs)
+    profile_counters = create_profile_counters(slot_count)
+
+    kernel_start = time.perf_counter()
+    report.timings["plan"] = plan_time - start_time
+    report.timings["allocation"] = kernel_start - plan_time
+
+    parallel_calc_indicators_batch(params, batch_args, profile_counters)
+    parallel_calc_batch(params, batch_args, profile_counters)
+
+    report.timings["kernel"] = time.perf_counter() - kernel_start
+    report.timings["transfer"] = 0.0
+    report.counters = profile_counters
+    if core_time:
+        print(report)
+
+    result = {
+        "tohlcv": tohlcv,
+        "tohlcv2": tohlcv2,
+        "mapping_data": mapping_data,
+        "offsets": offsets,
+        "offsets2": offsets2,
+        "indicator_index": indicator_index,
+        "indicator_index2": indicator_index2,
+        "backtest_summary": backtest_summary,
+        "trade_result": trade_result,
+        "trade_count": trade_count,
+    }
+    if not summary_only:
+        result["indicator_result"] = indicator_result
+        result["indicator_result2"] = indicator_result2
+        result["signal_result"] = signal_result
+        result["backtest_result"] = backtest_result
+    return result
+
+
+def get_symbol_output(result, symbol):
+    """
+    取出 entry_func_batch 结果中第 symbol 个品种的视图, 键和形状和单独对这个品种调用 entry_func 相同。
+    """
+    start, stop = result["offsets"][symbol], result["offsets"][symbol + 1]
+    start2, stop2 = result["offsets2"][symbol], result["offsets2"][symbol + 1]
+    output = {
+        "tohlcv": result["tohlcv"][start:stop],
+        "tohlcv2": result["tohlcv2"][start2:stop2],
+        "mapping_data": result["mapping_data"][start:stop],
+        "indicator_index": result["indicator_index"],
+        "indicator_index2": result["indicator_index2"],
+        "backtest_summary": result["backtest_summary"][symbol],
+        "trade_result": result["trade_result"][symbol],
+        "trade_count": result["trade_count"][symbol],
+    }
+    if "backtest_result" in result:
+        output["indicator_result"] = tuple(
+            i[:, start:stop] for i in result["indicator_result"]
+        )
+        output["indicator_result2"] = tuple(
+            i[:, start2:stop2] for i in result["indicator_result2"]
+        )
+        output["signal_result"] = result["signal_result"][:, start:stop]
+        output["backtest_result"] = result["backtest_result"][:, start:stop]
+    return output
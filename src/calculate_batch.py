@@ -0,0 +1,339 @@
+import numba as nb
+
+from src.core_logic import core_calc
+from src.calculate_indicators import calc_indicators_unique
+from src.indicators.indicators_wrapper import indicators_id_array
+from utils.data_types import get_params_signature
+from utils.numba_unpack import (
+    unpack_params_child,
+    get_conf_count,
+    get_slot_count_from_params,
+)
+from utils.profile_utils import (
+    ProfileStage,
+    profile_counters_type,
+    profile_start,
+    profile_stop,
+)
+
+from utils.numba_params import nb_params
+from utils.data_types import get_numba_data_types
+from utils.numba_utils import nb_wrapper
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+indicator_count = len(indicators_id_array)
+
+
+def get_batch_args_signature(nb_int_type, nb_float_type, nb_bool_type):
+    # 多个品种的k线按行拼接, offsets[s]:offsets[s + 1] 是品种 s 的行, 每个 config 的统计量和交易记录按品种分开
+    return nb.types.Tuple(
+        (
+            nb_int_type[:],  # offsets (symbol_count + 1,)
+            nb_int_type[:],  # offsets2 (symbol_count + 1,)
+            nb_float_type[:, :, :],  # backtest_summary (symbol_count, conf_count, n)
+            nb_float_type[:, :, :, :],  # trade_result (symbol_count, conf_count, max_trades, n)
+            nb_int_type[:, :],  # trade_count (symbol_count, conf_count)
+            nb.uint64[:, :, :, :],  # signal_bits (symbol_count, conf_count, n, 0)
+        )
+    )
+
+
+# 多品种批量计算只支持 cpu 模式
+if nb_params["mode"] in ["normal", "njit"]:
+    params_signature = get_params_signature(nb_int_type, nb_float_type, nb_bool_type)
+    batch_args_signature = get_batch_args_signature(
+        nb_int_type, nb_float_type, nb_bool_type
+    )
+    signature = params_signature(params_signature, batch_args_signature, nb_int_type)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+    )
+    def slice_params_symbol(params, batch_args, symbol):
+        """
+        从拼接的批量数组中取出品种 symbol 的 params 视图, 不拷贝数据, 结构和 entry_func 的 params 相同:
+        - tohlcv, mapping_data, 指标结果, 信号和回测结果按 offsets 切片, tohlcv2 和它的指标按 offsets2 切片
+        - 信号和回测结果的第二维不是拼接后的k线数量时 (summary_only), 是工作线程的临时缓冲区, 取前 rows 行
+        - 临时数组按最长的品种分配, 取前 rows 行
+        - backtest_summary, trade_result, trade_count, signal_bits 取第 symbol 个品种
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+        (signal_params, signal_result, _signal_bits) = signal_args
+        (
+            backtest_params,
+            backtest_result,
+            _backtest_summary,
+            _trade_result,
+            _trade_count,
+        ) = backtest_args
+        (
+            int_temp_array,
+            int_temp_array2,
+            float_temp_array,
+            float_temp_array2,
+            bool_temp_array,
+            bool_temp_array2,
+        ) = temp_args
+        (
+            offsets,
+            offsets2,
+            backtest_summary,
+            trade_result,
+            trade_count,
+            signal_bits,
+        ) = batch_args
+
+        start = offsets[symbol]
+        stop = offsets[symbol + 1]
+        start2 = offsets2[symbol]
+        stop2 = offsets2[symbol + 1]
+        rows = stop - start
+        rows2 = stop2 - start2
+        total_rows = tohlcv.shape[0]
+
+        (sma_result, sma2_result, bbands_result, atr_result, psar_result) = (
+            indicator_result
+        )
+        (sma_result2, sma2_result2, bbands_result2, atr_result2, psar_result2) = (
+            indicator_result2
+        )
+
+        data_args_symbol = (
+            tohlcv[start:stop],
+            tohlcv2[start2:stop2],
+            tohlcv_smooth[start:stop],
+            tohlcv_smooth2[start2:stop2],
+            mapping_data[start:stop],
+        )
+        # 未启用的指标结果没有k线维度, 切片后仍然是空数组
+        indicator_args_symbol = (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            (
+                sma_result[:, start:stop],
+                sma2_result[:, start:stop],
+                bbands_result[:, start:stop],
+                atr_result[:, start:stop],
+                psar_result[:, start:stop],
+            ),
+            (
+                sma_result2[:, start2:stop2],
+                sma2_result2[:, start2:stop2],
+                bbands_result2[:, start2:stop2],
+                atr_result2[:, start2:stop2],
+                psar_result2[:, start2:stop2],
+            ),
+            indicator_index,
+            indicator_index2,
+        )
+        if signal_result.shape[1] == total_rows:
+            signal_result_symbol = signal_result[:, start:stop]
+        else:
+            signal_result_symbol = signal_result[:, :rows]
+        if backtest_result.shape[1] == total_rows:
+            backtest_result_symbol = backtest_result[:, start:stop]
+        else:
+            backtest_result_symbol = backtest_result[:, :rows]
+
+        signal_args_symbol = (signal_params, signal_result_symbol, signal_bits[symbol])
+        backtest_args_symbol = (
+            backtest_params,
+            backtest_result_symbol,
+            backtest_summary[symbol],
+            trade_result[symbol],
+            trade_count[symbol],
+        )
+        temp_args_symbol = (
+            int_temp_array[:, :rows],
+            int_temp_array2[:, :rows2],
+            float_temp_array[:, :rows],
+            float_temp_array2[:, :rows2],
+            bool_temp_array[:, :rows],
+            bool_temp_array2[:, :rows2],
+        )
+        return (
+            data_args_symbol,
+            indicator_args_symbol,
+            signal_args_symbol,
+            backtest_args_symbol,
+            temp_args_symbol,
+        )
+
+    signature = nb.void(params_signature, batch_args_signature, profile_counters_type)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_calc_indicators_batch(params, batch_args, profile_counters):
+        """
+        多品种的指标阶段: 每个指标在一个 prange 中并发计算 (品种, 去重后的参数行) 对,
+        品种少参数多或者品种多参数少时都能用满所有线程。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+        offsets = batch_args[0]
+
+        symbol_count = offsets.shape[0] - 1
+        slot_count = get_slot_count_from_params(params)
+
+        for i in range(len(indicators_id_array)):
+            _id = indicators_id_array[i]
+
+            if indicator_enabled[_id]:
+                row_count = indicator_params[_id].shape[0]
+                pair_count = symbol_count * row_count
+                for slot in nb.prange(min(slot_count, pair_count)):
+                    for pair in range(slot, pair_count, slot_count):
+                        symbol = pair // row_count
+                        row = pair - symbol * row_count
+                        _indicator_args = (
+                            indicator_params,
+                            indicator_params2,
+                            indicator_enabled,
+                            indicator_enabled2,
+                            indicator_result,
+                            indicator_result2,
+                            indicator_index,
+                            indicator_index2,
+                        )
+                        _params = (
+                            data_args,
+                            _indicator_args,
+                            signal_args,
+                            backtest_args,
+                            temp_args,
+                        )
+                        _params_symbol = slice_params_symbol(
+                            _params, batch_args, symbol
+                        )
+                        start = profile_start(profile_counters)
+                        calc_indicators_unique(_params_symbol, 0, _id, row, slot)
+                        profile_stop(
+                            profile_counters,
+                            slot,
+                            ProfileStage.indicator + _id,
+                            start,
+                        )
+
+            if indicator_enabled2[_id]:
+                row_count = indicator_params2[_id].shape[0]
+                pair_count = symbol_count * row_count
+                for slot in nb.prange(min(slot_count, pair_count)):
+                    for pair in range(slot, pair_count, slot_count):
+                        symbol = pair // row_count
+                        row = pair - symbol * row_count
+                        _indicator_args = (
+                            indicator_params,
+                            indicator_params2,
+                            indicator_enabled,
+                            indicator_enabled2,
+                            indicator_result,
+                            indicator_result2,
+                            indicator_index,
+                            indicator_index2,
+                        )
+                        _params = (
+                            data_args,
+                            _indicator_args,
+                            signal_args,
+                            backtest_args,
+                            temp_args,
+                        )
+                        _params_symbol = slice_params_symbol(
+                            _params, batch_args, symbol
+                        )
+                        start = profile_start(profile_counters)
+                        calc_indicators_unique(_params_symbol, 1, _id, row, slot)
+                        profile_stop(
+                            profile_counters,
+                            slot,
+                            ProfileStage.indicator + indicator_count + _id,
+                            start,
+                        )
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_calc_batch(params, batch_args, profile_counters):
+        """
+        多品种的信号和回测阶段: 在一个 prange 中并发计算所有 (品种, config) 对,
+        必须在 parallel_calc_indicators_batch 之后运行。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+        offsets = batch_args[0]
+
+        symbol_count = offsets.shape[0] - 1
+        conf_count = get_conf_count(params)
+        slot_count = get_slot_count_from_params(params)
+        pair_count = symbol_count * conf_count
+
+        # 每个 slot 独占一份工作缓冲区, 依次处理 pair = slot, slot + slot_count, ... 的 (品种, config) 对
+        for slot in nb.prange(min(slot_count, pair_count)):
+            for pair in range(slot, pair_count, slot_count):
+                symbol = pair // conf_count
+                idx = pair - symbol * conf_count
+                _indicator_args = (
+                    indicator_params,
+                    indicator_params2,
+                    indicator_enabled,
+                    indicator_enabled2,
+                    indicator_result,
+                    indicator_result2,
+                    indicator_index,
+                    indicator_index2,
+                )
+                _params = (
+                    data_args,
+                    _indicator_args,
+                    signal_args,
+                    backtest_args,
+                    temp_args,
+                )
+                _params_symbol = slice_params_symbol(_params, batch_args, symbol)
+                _params_child = unpack_params_child(_params_symbol, idx, slot)
+
+                core_calc(_params_child, profile_counters, slot)
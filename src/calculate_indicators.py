@@ -1,6 +1,6 @@
 import numba as nb
 import numpy as np
-from utils.data_types import get_params_child_signature
+from utils.data_types import get_params_signature
 
 
 from src.indicators.indicators_wrapper import (
@@ -11,6 +11,8 @@ from src.indicators.indicators_wrapper import (
 from utils.numba_params import nb_params
 from utils.data_types import get_numba_data_types
 from utils.numba_utils import nb_wrapper
+from utils.numba_unpack import unpack_indicator_child
+from utils.numba_slice import slice_indicator_result_child
 
 
 dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
@@ -19,10 +21,10 @@ nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
 
 
-params_child_signature = get_params_child_signature(
-    nb_int_type, nb_float_type, nb_bool_type
+params_signature = get_params_signature(nb_int_type, nb_float_type, nb_bool_type)
+signature = nb.void(
+    params_signature, nb_int_type, nb_int_type, nb_int_type, nb_int_type
 )
-signature = nb.void(params_child_signature)
 
 
 @nb_wrapper(
@@ -30,43 +32,128 @@ signature = nb.void(params_child_signature)
     signature=signature,
     cache_enabled=nb_params.get("cache", True),
 )
-def calc_indicators(params_child):
-    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+def calc_indicators_unique(params, timeframe, indicator_id, row, slot):
+    """
+    计算去重后第 row 行参数的单个指标, 结果被所有引用这一行的 config 共享。
+    timeframe 为 0 时计算 tohlcv 的指标, 为 1 时计算 tohlcv2 的指标。
+    临时数组使用当前工作线程第 slot 份 temp 数组。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
     (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
     (
-        indicator_params_child,
-        indicator_params2_child,
+        indicator_params,
+        indicator_params2,
         indicator_enabled,
         indicator_enabled2,
-        indicator_result_child,
-        indicator_result2_child,
+        indicator_result,
+        indicator_result2,
+        indicator_index,
+        indicator_index2,
     ) = indicator_args
-    (signal_params, signal_result_child) = signal_args
-    (backtest_params_child, backtest_result_child) = backtest_args
     (
-        int_temp_array_child,
-        int_temp_array2_child,
-        float_temp_array_child,
-        float_temp_array2_child,
-        bool_temp_array_child,
-        bool_temp_array2_child,
+        int_temp_array,
+        int_temp_array2,
+        float_temp_array,
+        float_temp_array2,
+        bool_temp_array,
+        bool_temp_array2,
     ) = temp_args
 
-    for i in range(len(indicators_id_array)):
-        if indicator_enabled[indicators_id_array[i]]:
-            loop_indicators(
-                indicators_id_array[i],
-                tohlcv,
-                indicator_params_child,
-                indicator_result_child,
-                float_temp_array_child,
-            )
+    if timeframe == 0:
+        indicator_params_child, indicator_result_child = unpack_indicator_child(
+            indicator_params, indicator_result, indicator_id, row
+        )
+        indicator_result_child[indicator_id][:] = np.nan
+        loop_indicators(
+            indicator_id,
+            tohlcv,
+            indicator_params_child,
+            indicator_result_child,
+            float_temp_array[slot],
+        )
+    else:
+        indicator_params2_child, indicator_result2_child = unpack_indicator_child(
+            indicator_params2, indicator_result2, indicator_id, row
+        )
+        indicator_result2_child[indicator_id][:] = np.nan
+        loop_indicators(
+            indicator_id,
+            tohlcv2,
+            indicator_params2_child,
+            indicator_result2_child,
+            float_temp_array2[slot],
+        )
+
+
+# 增量计算只支持 cpu 模式, 需要分配数组保存预热k线的结果
+if nb_params["mode"] in ["normal", "njit"]:
+
+    signature = nb.void(
+        params_signature,
+        nb_int_type,
+        nb_int_type,
+        nb_int_type,
+        nb_int_type,
+        nb_int_type,
+        nb_int_type,
+    )
 
-        if indicator_enabled2[indicators_id_array[i]]:
-            loop_indicators(
-                indicators_id_array[i],
-                tohlcv2,
-                indicator_params2_child,
-                indicator_result2_child,
-                float_temp_array2_child,
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+    )
+    def calc_indicators_tail(params, timeframe, indicator_id, row, slot, start, end):
+        """
+        增量计算: 只在第 start 根k线之后的数据上重新计算指标, 第 end 根k线之前的结果保持不变。
+        start 到 end 之间是预热的k线, 切片计算时这段结果不完整 (开头是 NaN), 计算完之后恢复原来的值。
+        start 为 0 时等于完整计算, 用于没有有限预热长度的指标 (rma, psar, 滑动窗口累加和)。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+        (
+            int_temp_array,
+            int_temp_array2,
+            float_temp_array,
+            float_temp_array2,
+            bool_temp_array,
+            bool_temp_array2,
+        ) = temp_args
+
+        if timeframe == 0:
+            data = tohlcv
+            indicator_params_child, indicator_result_child = unpack_indicator_child(
+                indicator_params, indicator_result, indicator_id, row
+            )
+            float_temp_array_child = float_temp_array[slot]
+        else:
+            data = tohlcv2
+            indicator_params_child, indicator_result_child = unpack_indicator_child(
+                indicator_params2, indicator_result2, indicator_id, row
             )
+            float_temp_array_child = float_temp_array2[slot]
+
+        result = indicator_result_child[indicator_id]
+        if end >= result.shape[0]:
+            return
+
+        saved = result[start:end].copy()
+        result[start:] = np.nan
+        loop_indicators(
+            indicator_id,
+            data[start:],
+            indicator_params_child,
+            slice_indicator_result_child(indicator_result_child, start),
+            float_temp_array_child[start:],
+        )
+        result[start:end] = saved
@@ -3,6 +3,8 @@ import numpy as np
 from utils.data_types import get_params_child_signature
 
 from src.backtest.clean_signal import clean_signal
+from src.signal.signal_tool import pack_bits, word_bits
+from utils.numba_slice import slice_params_child
 from src.signal.simple_template import simple_signal, simple_id
 
 
@@ -27,6 +29,24 @@ signal_result_name = [
 signal_result_count = len(signal_result_name)
 
 
+def get_signal_words(rows):
+    """
+    按位保存 rows 根k线的一个信号需要的 uint64 字数。
+    """
+    return (rows + word_bits - 1) // word_bits
+
+
+def unpack_signal_bits(signal_bits, rows):
+    """
+    把 (conf_count, signal_result_count, words) 的 signal_bits 展开成
+    和 signal_result 相同布局的 (conf_count, rows, signal_result_count) 布尔数组。
+    """
+    # 第 i 根k线是第 i // 64 个字的第 i % 64 位, 小端序下按字节展开就是k线的顺序
+    words = np.ascontiguousarray(signal_bits, dtype="<u8")
+    bits = np.unpackbits(words.view(np.uint8), axis=-1, bitorder="little")
+    return np.ascontiguousarray(bits[:, :, :rows].transpose(0, 2, 1).astype(np.bool_))
+
+
 signature = nb.void(*loop_signals_signature(nb_int_type, nb_float_type, nb_bool_type))
 
 
@@ -39,6 +59,7 @@ def loop_signals(
     signal_id,
     tohlcv,
     tohlcv2,
+    mapping_data,
     indicator_result_child,
     indicator_result2_child,
     signal_params,
@@ -49,6 +70,7 @@ def loop_signals(
         simple_signal(
             tohlcv,
             tohlcv2,
+            mapping_data,
             indicator_result_child,
             indicator_result2_child,
             signal_params,
@@ -79,8 +101,14 @@ def calc_signal(params_child):
         indicator_result_child,
         indicator_result2_child,
     ) = indicator_args
-    (signal_params, signal_result_child) = signal_args
-    (backtest_params_child, backtest_result_child) = backtest_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+    (
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
     (
         int_temp_array_child,
         int_temp_array2_child,
@@ -95,6 +123,7 @@ def calc_signal(params_child):
         signal_id,
         tohlcv,
         tohlcv2,
+        mapping_data,
         indicator_result_child,
         indicator_result2_child,
         signal_params,
@@ -103,3 +132,97 @@ def calc_signal(params_child):
     )
 
     clean_signal(signal_result_child)
+
+
+signature = nb.void(params_child_signature, nb_bool_type[:, :])
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calc_signal_stream(params_child, signal_scratch):
+    """
+    流式版本的 calc_signal, 数据和指标结果都是最近 W 根k线的窗口, W 不小于信号模版的 lookback。
+    信号模版在窗口上写入 signal_scratch, 只把最后一行追加到 signal_result_child 窗口,
+    前面几行已经被回测阶段修改过 (止盈止损触发的离场信号), 不能覆盖。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+    (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+    (
+        indicator_params_child,
+        indicator_params2_child,
+        indicator_enabled,
+        indicator_enabled2,
+        indicator_result_child,
+        indicator_result2_child,
+    ) = indicator_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+
+    signal_id = signal_params[0]
+    loop_signals(
+        signal_id,
+        tohlcv,
+        tohlcv2,
+        mapping_data,
+        indicator_result_child,
+        indicator_result2_child,
+        signal_params,
+        signal_scratch,
+        temp_args,
+    )
+    clean_signal(signal_scratch)
+
+    window = signal_result_child.shape[0]
+    for r in range(window - 1):
+        signal_result_child[r, :] = signal_result_child[r + 1, :]
+    signal_result_child[window - 1, :] = signal_scratch[window - 1, :]
+
+
+signature = nb.void(params_child_signature)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def pack_signal(params_child):
+    """
+    pack_signals 模式下, 把 signal_result_child (包括回测阶段写入的离场信号) 按位写入 signal_bits_child,
+    必须在 calc_backtest 之后, 工作缓冲区被下一个 config 覆盖之前调用。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+
+    if signal_bits_child.shape[1] == 0:
+        return
+    for k in range(signal_bits_child.shape[0]):
+        pack_bits(signal_result_child[:, k], signal_bits_child[k])
+
+
+# 增量计算只支持 cpu 模式, 需要分配数组保存预热k线的结果
+if nb_params["mode"] in ["normal", "njit"]:
+
+    signature = nb.void(params_child_signature, nb_int_type, nb_int_type)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+    )
+    def calc_signal_tail(params_child, start, lookback):
+        """
+        增量计算: 只重新计算第 start 根k线之后的信号, 之前的信号 (包括回测阶段写入的离场信号) 保持不变。
+        信号模版计算一根k线需要最近 lookback 根k线, 从 start - lookback + 1 开始切片计算,
+        切片开头的几根k线缺少上一根k线, 计算完之后恢复原来的值。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+        (signal_params, signal_result_child, signal_bits_child) = signal_args
+
+        begin = max(start - lookback + 1, 0)
+        saved = signal_result_child[begin:start].copy()
+        signal_result_child[start:] = False
+        calc_signal(slice_params_child(params_child, begin))
+        signal_result_child[begin:start] = saved
@@ -0,0 +1,207 @@
+import numba as nb
+import numpy as np
+
+from src.calculate_signals import calc_signal_stream
+from src.backtest.calculate_backtest import calc_backtest_stream
+from src.indicators.indicators_wrapper import indicators_id_array, stream_indicators
+from utils.data_types import get_params_signature
+from utils.numba_unpack import (
+    unpack_params_child,
+    get_conf_count,
+    get_slot_count_from_params,
+)
+
+from utils.numba_params import nb_params
+from utils.data_types import get_numba_data_types
+from utils.numba_utils import nb_wrapper
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+indicator_count = len(indicators_id_array)
+
+
+def get_stream_args_signature(nb_int_type, nb_float_type, nb_bool_type):
+    # 每个指标一个 (unique_count, state_count) 的状态数组, 和 indicator_params 一样按去重后的参数行保存
+    indicator_state = nb.types.UniTuple(nb.float64[:, :], indicator_count)
+    return nb.types.Tuple(
+        (
+            indicator_state,  # indicator_state
+            indicator_state,  # indicator_state2
+            nb_float_type[:, :, :],  # backtest_state (conf_count, W, 3)
+            nb_bool_type[:, :],  # psar_is_long (conf_count, W)
+            nb.float64[:, :],  # atr_state (conf_count, atr_state_count)
+            nb_bool_type[:],  # pruned (conf_count,)
+            nb_bool_type[:, :, :],  # signal_scratch (slot_count, W, signal_result_count)
+            nb_int_type[:],  # bar_count: [tohlcv 的k线数, tohlcv2 的k线数]
+        )
+    )
+
+
+# 流式计算用于实盘中逐根k线更新, 只支持 cpu 模式
+if nb_params["mode"] in ["normal", "njit"]:
+
+    signature = nb.void(
+        nb.types.UniTuple(nb_float_type[:, :, :], indicator_count),  # indicator_result
+        nb.types.UniTuple(nb_float_type[:, :], indicator_count),  # indicator_params
+        nb.types.UniTuple(nb.float64[:, :], indicator_count),  # indicator_state
+        nb_bool_type[:],  # indicator_enabled
+        nb_float_type[:],  # bar
+    )
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_stream_indicators(
+        indicator_result, indicator_params, indicator_state, indicator_enabled, bar
+    ):
+        """
+        每个启用的指标, 每行去重后的参数把结果窗口前移一行, 用状态计算新k线 bar 的结果写入最后一行。
+        """
+        for i in range(len(indicators_id_array)):
+            _id = indicators_id_array[i]
+            if not indicator_enabled[_id]:
+                continue
+
+            result = indicator_result[_id]
+            params = indicator_params[_id]
+            state = indicator_state[_id]
+            window = result.shape[1]
+            for row in nb.prange(result.shape[0]):
+                for r in range(window - 1):
+                    result[row, r, :] = result[row, r + 1, :]
+                stream_indicators(
+                    _id, bar, params[row], state[row], result[row, window - 1]
+                )
+
+    params_signature = get_params_signature(nb_int_type, nb_float_type, nb_bool_type)
+    signature = nb.void(
+        params_signature,
+        get_stream_args_signature(nb_int_type, nb_float_type, nb_bool_type),
+        nb_float_type[:, :],  # bars
+        nb_float_type[:, :],  # bars2
+        nb_int_type[:],  # mapping_data
+    )
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_stream(params, stream_args, bars, bars2, mapping_data):
+        """
+        流式计算: 依次加入 bars 中的每根k线, 每根k线每个 config 的计算量是 O(1),
+        逐窗口计算 (rolling=0) 的 sma/bbands 每行参数是 O(period)。
+        params 中的 tohlcv, tohlcv2, mapping_data, 指标结果, 信号和回测结果都是最近 W 根k线的窗口,
+        最后一行是最新的k线。
+        mapping_data 和 entry_func 的含义相同, 是 bars 的每根k线对应的 bars2 中最后一根已收盘的k线,
+        加入 bars[b] 之前先加入 bars2 中下标不超过 mapping_data[b] 的k线。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (
+            tohlcv_window,
+            tohlcv2_window,
+            tohlcv_smooth,
+            tohlcv_smooth2,
+            mapping_window,
+        ) = data_args
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+        (
+            indicator_state,
+            indicator_state2,
+            backtest_state,
+            psar_is_long,
+            atr_state,
+            pruned,
+            signal_scratch,
+            bar_count,
+        ) = stream_args
+
+        window = tohlcv_window.shape[0]
+        window2 = tohlcv2_window.shape[0]
+        conf_count = get_conf_count(params)
+        slot_count = get_slot_count_from_params(params)
+
+        next2 = 0
+        for b in range(bars.shape[0]):
+            while next2 < bars2.shape[0] and next2 <= mapping_data[b]:
+                for r in range(window2 - 1):
+                    tohlcv2_window[r, :] = tohlcv2_window[r + 1, :]
+                tohlcv2_window[window2 - 1, :] = bars2[next2, :]
+                # 窗口中的k线对应的大周期k线下标前移, 移出窗口的记为 -1
+                for r in range(window):
+                    if mapping_window[r] >= 0:
+                        mapping_window[r] -= 1
+
+                parallel_stream_indicators(
+                    indicator_result2,
+                    indicator_params2,
+                    indicator_state2,
+                    indicator_enabled2,
+                    bars2[next2],
+                )
+                next2 += 1
+                bar_count[1] += 1
+
+            for r in range(window - 1):
+                tohlcv_window[r, :] = tohlcv_window[r + 1, :]
+                mapping_window[r] = mapping_window[r + 1]
+            tohlcv_window[window - 1, :] = bars[b, :]
+            mapping_window[window - 1] = window2 - 1 if bar_count[1] > 0 else -1
+
+            parallel_stream_indicators(
+                indicator_result,
+                indicator_params,
+                indicator_state,
+                indicator_enabled,
+                bars[b],
+            )
+
+            bar_index = bar_count[0]
+            for slot in nb.prange(slot_count):
+                for idx in range(slot, conf_count, slot_count):
+                    # 和 parallel_calc 一样, 在 prange 内部重新组装元组
+                    _indicator_args = (
+                        indicator_params,
+                        indicator_params2,
+                        indicator_enabled,
+                        indicator_enabled2,
+                        indicator_result,
+                        indicator_result2,
+                        indicator_index,
+                        indicator_index2,
+                    )
+                    _params = (
+                        data_args,
+                        _indicator_args,
+                        signal_args,
+                        backtest_args,
+                        temp_args,
+                    )
+                    _params_child = unpack_params_child(_params, idx, slot)
+
+                    calc_signal_stream(_params_child, signal_scratch[slot])
+                    calc_backtest_stream(
+                        _params_child,
+                        backtest_state[idx],
+                        psar_is_long[idx],
+                        atr_state[idx],
+                        pruned[idx : idx + 1],
+                        bar_index,
+                    )
+            bar_count[0] += 1
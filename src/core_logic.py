@@ -1,13 +1,19 @@
 import numba as nb
 from utils.data_types import get_params_child_signature
-from .calculate_indicators import calc_indicators
-from .calculate_signals import calc_signal
+from .calculate_signals import calc_signal, pack_signal
 from .backtest.calculate_backtest import calc_backtest
+from .backtest.calculate_trades import calc_trades
 
 from utils.numba_params import nb_params
 from utils.data_types import get_numba_data_types
 from utils.numba_utils import nb_wrapper
 from utils.numba_init_data import init_data_child
+from utils.profile_utils import (
+    ProfileStage,
+    profile_counters_type,
+    profile_start,
+    profile_stop,
+)
 
 
 dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
@@ -19,7 +25,7 @@ nb_bool_type = dtype_dict["nb"]["bool"]
 params_child_signature = get_params_child_signature(
     nb_int_type, nb_float_type, nb_bool_type
 )
-signature = nb.void(params_child_signature)
+signature = nb.void(params_child_signature, profile_counters_type, nb_int_type)
 
 
 @nb_wrapper(
@@ -27,8 +33,43 @@ signature = nb.void(params_child_signature)
     signature=signature,
     cache_enabled=nb_params.get("cache", True),
 )
-def core_calc(params_child):
+def core_calc(params_child, profile_counters, slot):
+    """
+    profile_counters 为 None 时不计时, 否则把每个阶段的时钟周期累加到第 slot 行。
+    """
+    # 指标已经在 parallel_calc_indicators 中按去重后的参数计算好了
+    start = profile_start(profile_counters)
     init_data_child(params_child)
-    calc_indicators(params_child)
+    start = profile_stop(profile_counters, slot, ProfileStage.init_data, start)
     calc_signal(params_child)
+    start = profile_stop(profile_counters, slot, ProfileStage.signal, start)
     calc_backtest(params_child)
+    start = profile_stop(profile_counters, slot, ProfileStage.backtest, start)
+    # 交易记录只依赖回测结果, summary_only 模式下可以只返回交易记录而不保留逐k线数组
+    calc_trades(params_child)
+    start = profile_stop(profile_counters, slot, ProfileStage.trades, start)
+    # pack_signals 模式下 signal_result 是工作缓冲区, 按位保存到每个 config 的 signal_bits
+    pack_signal(params_child)
+    profile_stop(profile_counters, slot, ProfileStage.pack_signal, start)
+
+
+# 增量计算只支持 cpu 模式, 见 calc_signal_tail 和 calc_backtest_resume
+if nb_params["mode"] in ["normal", "njit"]:
+    from .calculate_signals import calc_signal_tail
+    from .backtest.calculate_backtest import calc_backtest_resume
+
+    signature = nb.void(params_child_signature, nb_int_type, nb_int_type)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+    )
+    def core_calc_tail(params_child, start, lookback):
+        """
+        增量计算: 信号和回测只从第 start 根k线开始重新计算, 之前的结果是上一次计算的结果,
+        lookback 是信号模版需要的k线数量。交易记录和 summary 依赖完整的回测结果, 仍然重新提取。
+        """
+        calc_signal_tail(params_child, start, lookback)
+        calc_backtest_resume(params_child, start)
+        calc_trades(params_child)
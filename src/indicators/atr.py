@@ -1,9 +1,9 @@
 import numba as nb
 import numpy as np
 from utils.numba_utils import nb_wrapper
-from utils.data_types import loop_indicators_signature
-from .tr import calculate_tr
-from .rma import calculate_rma
+from utils.data_types import loop_indicators_signature, stream_indicators_signature
+from .tr import calculate_tr, tr_update
+from .rma import calculate_rma, rma_update
 
 
 from utils.numba_params import nb_params
@@ -14,6 +14,7 @@ dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
 nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
+np_float_type = dtype_dict["np"]["float"]
 
 
 from .indicators_tool import check_bounds
@@ -99,3 +100,46 @@ def calculate_atr_wrapper(
 
     # atr_period 不用显示转换类型, numba会隐式把小数截断成整数(小数部分丢弃)
     calculate_atr(high, low, close, atr_period, atr_result, temp_arr_0)
+
+
+# 流式计算的状态: [上一根k线的 close, rma 的状态 (3个)]
+atr_state_count = 4
+
+
+signature = nb_float_type(
+    nb_float_type, nb_float_type, nb_float_type, nb_int_type, nb.float64[:]
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def atr_update(high, low, close, period, state):
+    """
+    流式版本的 atr, 加入一根新的k线, 返回这根k线的 atr, 和 calculate_atr 的结果相同。
+    state 长度为 atr_state_count, 初始化为 0, 第一根k线的 tr 不参与 rma 的计算。
+    """
+    tr = tr_update(high, low, np_float_type(state[0]))
+    state[0] = close
+    return rma_update(tr, period, state[1:])
+
+
+signature = nb.void(
+    *stream_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calculate_atr_stream(bar, indicator_params_row, state, indicator_result_row):
+    high = bar[2]
+    low = bar[3]
+    close = bar[4]
+    atr_period = int(indicator_params_row[0])
+
+    indicator_result_row[0] = atr_update(high, low, close, atr_period, state)
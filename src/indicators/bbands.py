@@ -1,9 +1,15 @@
 import numba as nb
 import numpy as np
 from utils.numba_utils import nb_wrapper
-from utils.data_types import loop_indicators_signature
-from .indicators_tool import check_bounds
-from .sma import calculate_sma
+from utils.data_types import loop_indicators_signature, stream_indicators_signature
+from .indicators_tool import check_bounds, compensated_add
+from .sma import (
+    calculate_sma,
+    calculate_sma_rolling,
+    sma_update,
+    get_sma_state_count,
+    sma_ring_offset,
+)
 import math
 
 
@@ -15,14 +21,16 @@ dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
 nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
+np_float_type = dtype_dict["np"]["float"]
 
 
 bbands_spec = {
     "name": "bbands",  # 指标名
     "ori_name": "bbands",
     "result_name": ["bbands_middle", "bbands_upper", "bbands_lower"],  # 结果数组列名
-    "default_params": [14, 2.0],
-    "param_count": 2,  # 需要多少参数。
+    # [period, std_mult, rolling], rolling=0 (默认) 使用逐窗口精确计算, rolling=1 使用 O(n) 滑动窗口方差
+    "default_params": [14, 2.0, 0],
+    "param_count": 3,  # 需要多少参数。
     "result_count": 3,  # 需要多少结果数组。
     "temp_count": 0,  # 该指标需要多少临时数组。
 }
@@ -70,6 +78,78 @@ def calculate_bbands(
         lower_result[i + period - 1] = middle_result[i + period - 1] - std_mult * std
 
 
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calculate_bbands_rolling(
+    close, period, std_mult, middle_result, upper_result, lower_result
+):
+    """
+    O(n) 滑动窗口版本的 bbands, 用 Welford 滑动更新窗口的二阶中心矩 m2:
+    m2 += (x_new - x_old) * (x_new - mean_new + x_old - mean_old)
+    窗口刚变为有效时(起始, 或 NaN 滑出窗口后)按定义重新计算一次 m2。
+    m2 的递推用 float64 的均值 (和 calculate_sma_rolling 相同的补偿求和), 不用写入结果时舍入过的 middle,
+    否则 float32 模式下每根k线的舍入误差会一直累积在 m2 中。
+    """
+    # 越界检查
+    if check_bounds(close, period, middle_result) == 0:
+        return
+
+    # 计算sma
+    calculate_sma_rolling(close, period, middle_result)
+
+    # 对于前 period - 1 个元素，填充 np.nan
+    for i in range(period - 1):
+        upper_result[i] = np.nan
+        lower_result[i] = np.nan
+
+    sum_val = 0.0
+    sum_comp = 0.0
+    for j in range(period - 1):
+        if close[j] == close[j]:
+            sum_val, sum_comp = compensated_add(sum_val, sum_comp, close[j])
+
+    m2 = 0.0
+    prev_mean = 0.0
+    window_valid = False
+    for i in range(period - 1, len(close)):
+        # 和 calculate_sma_rolling 相同的累加顺序, NaN 不进入累加和
+        if close[i] == close[i]:
+            sum_val, sum_comp = compensated_add(sum_val, sum_comp, close[i])
+        if i >= period and close[i - period] == close[i - period]:
+            sum_val, sum_comp = compensated_add(sum_val, sum_comp, -close[i - period])
+
+        mean = middle_result[i]
+        if mean != mean:
+            # 窗口内存在 NaN
+            upper_result[i] = np.nan
+            lower_result[i] = np.nan
+            window_valid = False
+            continue
+
+        mean64 = (sum_val + sum_comp) / period
+        if not window_valid:
+            m2 = 0.0
+            for j in range(i - period + 1, i + 1):
+                diff = np.float64(close[j]) - mean64
+                m2 += diff * diff
+            window_valid = True
+        else:
+            x_new = np.float64(close[i])
+            x_old = np.float64(close[i - period])
+            m2 += (x_new - x_old) * (x_new - mean64 + x_old - prev_mean)
+            # 抵消舍入误差导致的负数
+            if m2 < 0.0:
+                m2 = 0.0
+        prev_mean = mean64
+
+        std = math.sqrt(m2 / period)
+        upper_result[i] = mean + std_mult * std
+        lower_result[i] = mean - std_mult * std
+
+
 signature = nb.void(
     *loop_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
 )
@@ -93,9 +173,10 @@ def calculate_bbands_wrapper(
     bbands_indicator_params_child = indicator_params_child[_id]
     bbands_indicator_result_child = indicator_result_child[_id]
 
-    if bbands_indicator_params_child.shape[0] >= 2:
+    if bbands_indicator_params_child.shape[0] >= 3:
         bbands_period = bbands_indicator_params_child[0]
         bbands_std_mult = bbands_indicator_params_child[1]
+        bbands_rolling = bbands_indicator_params_child[2]
 
     if bbands_indicator_result_child.shape[1] >= 3:
         middle_result = bbands_indicator_result_child[:, 0]
@@ -103,11 +184,109 @@ def calculate_bbands_wrapper(
         lower_result = bbands_indicator_result_child[:, 2]
 
     # bbands_period 不用显示转换类型, numba会隐式把小数截断成整数(小数部分丢弃)
-    calculate_bbands(
-        close,
-        bbands_period,
-        bbands_std_mult,
-        middle_result,
-        upper_result,
-        lower_result,
-    )
+    if bbands_rolling:
+        calculate_bbands_rolling(
+            close,
+            bbands_period,
+            bbands_std_mult,
+            middle_result,
+            upper_result,
+            lower_result,
+        )
+    else:
+        calculate_bbands(
+            close,
+            bbands_period,
+            bbands_std_mult,
+            middle_result,
+            upper_result,
+            lower_result,
+        )
+
+
+def get_bbands_state_count(params):
+    """
+    流式计算的状态长度: [m2, 窗口是否有效, 上一根k线的 middle] 加上 sma 的状态。
+    """
+    return 3 + get_sma_state_count(params)
+
+
+def get_bbands_warmup(params):
+    """
+    增量计算时每行参数需要往前重新计算的k线数量, 和 get_sma_warmup 相同, rolling 在第 2 列。
+    """
+    return np.where(params[:, 2] != 0, -1, params[:, 0].astype(np.int64) - 1)
+
+
+def get_bbands_cost(params):
+    """
+    每行参数的相对计算量, 见 get_sma_cost。滑动窗口同时更新均值和 m2 约是 sma 的 3 倍,
+    逐窗口计算时均值和方差各遍历一次窗口。
+    """
+    return np.where(params[:, 2] != 0, 3.0, 3.0 + params[:, 0] / 8.0)
+
+
+signature = nb.void(
+    *stream_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calculate_bbands_stream(bar, indicator_params_row, state, indicator_result_row):
+    """
+    流式版本的 bbands, 窗口中的 close 复用 sma 状态中的环形缓冲区,
+    rolling=1 时和 calculate_bbands_rolling 一样滑动更新 m2, 否则按窗口重新计算方差。
+    """
+    close = bar[4]
+    period = int(indicator_params_row[0])
+    std_mult = indicator_params_row[1]
+    rolling = indicator_params_row[2] != 0
+
+    sma_state = state[3:]
+    i = int(sma_state[0])
+    # 加入新值之前取出滑出窗口的旧值
+    x_old = sma_state[sma_ring_offset + i % period] if period > 0 else np.nan
+
+    mean = sma_update(close, period, rolling, sma_state)
+    indicator_result_row[0] = mean
+
+    if period <= 0 or i < period - 1 or mean != mean:
+        # 窗口还没填满或者窗口内存在 NaN
+        indicator_result_row[1] = np.nan
+        indicator_result_row[2] = np.nan
+        state[1] = 0
+        return
+
+    ring = sma_state[sma_ring_offset : sma_ring_offset + period]
+    if rolling:
+        # 和 calculate_bbands_rolling 一样用 float64 的均值递推 m2
+        mean64 = (sma_state[1] + sma_state[3]) / period
+        if state[1] != 0:
+            x_new = np.float64(close)
+            m2 = state[0] + (x_new - x_old) * (x_new - mean64 + x_old - state[2])
+            # 抵消舍入误差导致的负数
+            if m2 < 0.0:
+                m2 = 0.0
+        else:
+            m2 = 0.0
+            for j in range(period):
+                diff = ring[(i + 1 + j) % period] - mean64
+                m2 += diff * diff
+        state[2] = mean64
+    else:
+        m2 = 0.0
+        for j in range(period):
+            diff = np_float_type(ring[(i + 1 + j) % period]) - mean
+            m2 += diff * diff
+        state[2] = mean
+
+    state[0] = m2
+    state[1] = 1
+
+    std = math.sqrt(m2 / period)
+    indicator_result_row[1] = mean + std_mult * std
+    indicator_result_row[2] = mean - std_mult * std
@@ -36,3 +36,25 @@ def check_bounds(close, period, result):
         return 0
 
     return 1
+
+
+signature = nb.types.UniTuple(nb.float64, 2)(nb.float64, nb.float64, nb.float64)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def compensated_add(total, compensation, value):
+    """
+    Neumaier 补偿求和, 把 value 加到 total 上, 返回 (total, compensation),
+    累加和的值是 total + compensation。
+    滑动窗口反复加入和移除数值时, 普通累加和的舍入误差会一直累积, 补偿求和的误差和窗口长度无关。
+    """
+    new_total = total + value
+    if abs(total) >= abs(value):
+        compensation += (total - new_total) + value
+    else:
+        compensation += (value - new_total) + total
+    return new_total, compensation
@@ -7,7 +7,7 @@ from utils.data_types import get_numba_data_types
 from utils.numba_utils import nb_wrapper
 
 
-from utils.data_types import loop_indicators_signature
+from utils.data_types import loop_indicators_signature, stream_indicators_signature
 
 
 from enum import IntEnum, auto
@@ -16,12 +16,36 @@ from enum import IntEnum, auto
 from .sma import (
     calculate_sma,
     calculate_sma_wrapper,
+    calculate_sma_stream,
+    get_sma_state_count,
+    get_sma_warmup,
+    get_sma_cost,
     sma_spec,
     sma2_spec,
 )
-from .bbands import calculate_bbands, calculate_bbands_wrapper, bbands_spec
-from .atr import calculate_atr, calculate_atr_wrapper, atr_spec
-from .psar import calculate_psar, calculate_psar_wrapper, psar_spec
+from .bbands import (
+    calculate_bbands,
+    calculate_bbands_wrapper,
+    calculate_bbands_stream,
+    get_bbands_state_count,
+    get_bbands_warmup,
+    get_bbands_cost,
+    bbands_spec,
+)
+from .atr import (
+    calculate_atr,
+    calculate_atr_wrapper,
+    calculate_atr_stream,
+    atr_state_count,
+    atr_spec,
+)
+from .psar import (
+    calculate_psar,
+    calculate_psar_wrapper,
+    calculate_psar_stream,
+    psar_state_count,
+    psar_spec,
+)
 
 
 dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
@@ -41,36 +65,59 @@ class IndicatorsId(IntEnum):
 indicators_id_array = tuple(member.value for member in IndicatorsId)
 
 
+# stream_func 是流式计算的版本, 每次加入一根k线, state_count(params) 返回每行参数需要的状态长度
+# warmup(params) 返回增量计算时每行参数需要往前重新计算的k线数量, -1 表示从第 0 根k线重新计算
+# cost(params) 返回每行参数的相对计算量 (滑动窗口 sma 为 1), 用于给工作线程均衡分配任务
 indicators_spec = {
     "sma": {
         "id": IndicatorsId.sma,
         **sma_spec,
         "func": calculate_sma,
         "func_wrapper": calculate_sma_wrapper,
+        "stream_func": calculate_sma_stream,
+        "state_count": get_sma_state_count,
+        "warmup": get_sma_warmup,
+        "cost": get_sma_cost,
     },
     "sma2": {
         "id": IndicatorsId.sma2,
         **sma2_spec,
         "func": calculate_sma,
         "func_wrapper": calculate_sma_wrapper,
+        "stream_func": calculate_sma_stream,
+        "state_count": get_sma_state_count,
+        "warmup": get_sma_warmup,
+        "cost": get_sma_cost,
     },
     "bbands": {
         "id": IndicatorsId.bbands,  # 指标id，不能跟其他指标重复。
         **bbands_spec,
         "func": calculate_bbands,
         "func_wrapper": calculate_bbands_wrapper,
+        "stream_func": calculate_bbands_stream,
+        "state_count": get_bbands_state_count,
+        "warmup": get_bbands_warmup,
+        "cost": get_bbands_cost,
     },
     "atr": {
         "id": IndicatorsId.atr,
         **atr_spec,
         "func": calculate_atr,
         "func_wrapper": calculate_atr_wrapper,
+        "stream_func": calculate_atr_stream,
+        "state_count": lambda params: atr_state_count,
+        "warmup": lambda params: np.full(params.shape[0], -1),
+        "cost": lambda params: np.full(params.shape[0], 2.5),
     },
     "psar": {
         "id": IndicatorsId.psar,
         **psar_spec,
         "func": calculate_psar,
         "func_wrapper": calculate_psar_wrapper,
+        "stream_func": calculate_psar_stream,
+        "state_count": lambda params: psar_state_count,
+        "warmup": lambda params: np.full(params.shape[0], -1),
+        "cost": lambda params: np.full(params.shape[0], 3.0),
     },
 }
 
@@ -111,3 +158,41 @@ def loop_indicators(
         calculate_psar_wrapper(
             indicator_id, tohlcv, indicator_params, indicator_result, float_temp_array
         )
+
+
+signature = nb.void(
+    nb_int_type, *stream_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def stream_indicators(
+    indicator_id, bar, indicator_params_row, indicator_state_row, indicator_result_row
+):
+    """
+    流式计算: 用一行参数的状态加入新的k线 bar, 结果写入 indicator_result_row。
+    """
+    if indicator_id == IndicatorsId.sma:
+        calculate_sma_stream(
+            bar, indicator_params_row, indicator_state_row, indicator_result_row
+        )
+    elif indicator_id == IndicatorsId.sma2:
+        calculate_sma_stream(
+            bar, indicator_params_row, indicator_state_row, indicator_result_row
+        )
+    elif indicator_id == IndicatorsId.bbands:
+        calculate_bbands_stream(
+            bar, indicator_params_row, indicator_state_row, indicator_result_row
+        )
+    elif indicator_id == IndicatorsId.atr:
+        calculate_atr_stream(
+            bar, indicator_params_row, indicator_state_row, indicator_result_row
+        )
+    elif indicator_id == IndicatorsId.psar:
+        calculate_psar_stream(
+            bar, indicator_params_row, indicator_state_row, indicator_result_row
+        )
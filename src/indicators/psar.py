@@ -1,7 +1,7 @@
 import numba as nb
 import numpy as np
 from utils.numba_utils import nb_wrapper
-from utils.data_types import loop_indicators_signature
+from utils.data_types import loop_indicators_signature, stream_indicators_signature
 from .indicators_tool import check_bounds
 import math
 
@@ -14,6 +14,7 @@ dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
 nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
+np_float_type = dtype_dict["np"]["float"]
 
 
 psar_spec = {
@@ -84,7 +85,7 @@ def psar_init(
     return (is_long, current_psar, current_ep, current_af)
 
 
-signature_first_iteration = nb.types.Tuple(
+signature_first_step = nb.types.Tuple(
     (
         PsarState,
         nb_float_type,
@@ -92,9 +93,11 @@ signature_first_iteration = nb.types.Tuple(
         nb_float_type,
     )
 )(
-    nb_float_type[:],
-    nb_float_type[:],
-    nb_float_type[:],
+    nb_float_type,  # high_prev
+    nb_float_type,  # high_curr
+    nb_float_type,  # low_prev
+    nb_float_type,  # low_curr
+    nb_float_type,  # close_prev
     nb_float_type,
     nb_float_type,
     nb_float_type,
@@ -103,21 +106,23 @@ signature_first_iteration = nb.types.Tuple(
 
 @nb_wrapper(
     mode=nb_params["mode"],
-    signature=signature_first_iteration,
+    signature=signature_first_step,
     cache_enabled=nb_params.get("cache", True),
 )
-def psar_first_iteration(high, low, close, af0, af_step, max_af):
+def psar_first_step(
+    high_prev, high_curr, low_prev, low_curr, close_prev, af0, af_step, max_af
+):
     """
-    处理 PSAR 算法的第一次迭代（计算索引1的结果）。
+    处理 PSAR 算法的第一次迭代（计算索引1的结果）, 直接接收前两根k线的标量数据。
     返回一个元组：(new_state_tuple, psar_long_val, psar_short_val, reversal_val)
     """
     # 使用 psar_init 获取初始状态
     initial_state = psar_init(
-        high[0],  # high_prev
-        high[1],  # high_curr
-        low[0],  # low_prev
-        low[1],  # low_curr
-        close[0],  # close_prev
+        high_prev,
+        high_curr,
+        low_prev,
+        low_curr,
+        close_prev,
         af0,
         0,  # 传入 0 表示自动判断方向
     )
@@ -133,26 +138,26 @@ def psar_first_iteration(high, low, close, af0, af_step, max_af):
         else current_psar - current_af * (current_psar - current_ep)
     )
     current_psar = (
-        min(next_psar_raw_candidate, low[0])
+        min(next_psar_raw_candidate, low_prev)
         if is_long
-        else max(next_psar_raw_candidate, high[0])
+        else max(next_psar_raw_candidate, high_prev)
     )
 
     # 检查反转
     reversal = (
-        low[1] < next_psar_raw_candidate
+        low_curr < next_psar_raw_candidate
         if is_long
-        else high[1] > next_psar_raw_candidate
+        else high_curr > next_psar_raw_candidate
     )
 
     # 更新 EP 和 AF
     if is_long:
-        if high[1] > current_ep:
-            current_ep = high[1]
+        if high_curr > current_ep:
+            current_ep = high_curr
             current_af = min(max_af, current_af + af_step)
     else:
-        if low[1] < current_ep:
-            current_ep = low[1]
+        if low_curr < current_ep:
+            current_ep = low_curr
             current_af = min(max_af, current_af + af_step)
 
     # 处理反转
@@ -161,13 +166,13 @@ def psar_first_iteration(high, low, close, af0, af_step, max_af):
         current_af = af0
         current_psar = current_ep
         if is_long:
-            if current_psar > low[1]:
-                current_psar = low[1]
-            current_ep = high[1]
+            if current_psar > low_curr:
+                current_psar = low_curr
+            current_ep = high_curr
         else:
-            if current_psar < high[1]:
-                current_psar = high[1]
-            current_ep = low[1]
+            if current_psar < high_curr:
+                current_psar = high_curr
+            current_ep = low_curr
 
     # 确定返回的 PSAR 值
     psar_long_val = current_psar if is_long else np.nan
@@ -183,6 +188,38 @@ def psar_first_iteration(high, low, close, af0, af_step, max_af):
     )
 
 
+signature_first_iteration = nb.types.Tuple(
+    (
+        PsarState,
+        nb_float_type,
+        nb_float_type,
+        nb_float_type,
+    )
+)(
+    nb_float_type[:],
+    nb_float_type[:],
+    nb_float_type[:],
+    nb_float_type,
+    nb_float_type,
+    nb_float_type,
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature_first_iteration,
+    cache_enabled=nb_params.get("cache", True),
+)
+def psar_first_iteration(high, low, close, af0, af_step, max_af):
+    """
+    处理 PSAR 算法的第一次迭代（计算索引1的结果）。
+    返回一个元组：(new_state_tuple, psar_long_val, psar_short_val, reversal_val)
+    """
+    return psar_first_step(
+        high[0], high[1], low[0], low[1], close[0], af0, af_step, max_af
+    )
+
+
 # --- PSAR 实时更新函数 ---
 signature_update = nb.types.Tuple(
     (
@@ -436,3 +473,93 @@ def calculate_psar_wrapper(
         psar_af_result,
         psar_reversal_result,
     )
+
+
+# 流式计算的状态: [k线数, 是否停止计算, is_long, psar, ep, af, 上一根k线的 high, low, close]
+psar_state_count = 9
+
+
+signature = nb.void(
+    *stream_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calculate_psar_stream(bar, indicator_params_row, state, indicator_result_row):
+    """
+    流式版本的 psar, 第 1 根k线调用 psar_first_step, 之后每根k线调用 psar_update,
+    和 calculate_psar 的结果相同。第 1 根k线的 psar 是 NaN 时, 和 calculate_psar 一样之后都是 NaN。
+    """
+    high = bar[2]
+    low = bar[3]
+    close = bar[4]
+    af0 = indicator_params_row[0]
+    af_step = indicator_params_row[1]
+    max_af = indicator_params_row[2]
+
+    i = int(state[0])
+    prev_high = np_float_type(state[6])
+    prev_low = np_float_type(state[7])
+    prev_close = np_float_type(state[8])
+    state[0] = i + 1
+    state[6] = high
+    state[7] = low
+    state[8] = close
+
+    indicator_result_row[:] = np.nan
+
+    if i == 0:
+        # 和 pandas_ta 一致
+        indicator_result_row[2] = af0
+        indicator_result_row[3] = 0.0
+        return
+
+    if state[1] != 0:
+        return
+
+    if i == 1:
+        (
+            new_state,
+            indicator_result_row[0],
+            indicator_result_row[1],
+            indicator_result_row[3],
+        ) = psar_first_step(
+            prev_high, high, prev_low, low, prev_close, af0, af_step, max_af
+        )
+    else:
+        prev_state = (
+            state[2] != 0,
+            np_float_type(state[3]),
+            np_float_type(state[4]),
+            np_float_type(state[5]),
+        )
+        (
+            new_state,
+            indicator_result_row[0],
+            indicator_result_row[1],
+            indicator_result_row[3],
+        ) = psar_update(
+            prev_state,
+            high,
+            low,
+            prev_high,
+            prev_low,
+            af_step,
+            max_af,
+            close,
+            False,
+        )
+
+    is_long, current_psar, current_ep, current_af = new_state
+    indicator_result_row[2] = current_af
+    state[2] = is_long
+    state[3] = current_psar
+    state[4] = current_ep
+    state[5] = current_af
+
+    if i == 1 and math.isnan(current_psar):
+        state[1] = 1
@@ -12,6 +12,7 @@ dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
 nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
+np_float_type = dtype_dict["np"]["float"]
 
 
 signature = nb.void(nb_float_type[:], nb_int_type, nb_float_type[:])
@@ -59,6 +60,7 @@ def calculate_rma(close, period, rma_result):
             rma_result[period] = np.nan  # 如果 initial_sum 变成 NaN，则结果为 NaN
 
         # 从 period + 1 索引开始计算后续 RMA 值
+        # 递推是收缩的 (上一个值的误差乘以 (period - 1) / period), float32 的舍入误差不随k线数量累积
         for i in range(period + 1, n):
             # 检查前一个 RMA 值是否为 NaN
             if rma_result[i - 1] == rma_result[i - 1]:
@@ -77,3 +79,41 @@ def calculate_rma(close, period, rma_result):
         # 如果数据不足以计算第一个有效 RMA (n < period + 1)，则全部为 NaN
         for i in range(n):
             rma_result[i] = np.nan
+
+
+signature = nb_float_type(nb_float_type, nb_int_type, nb.float64[:])
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def rma_update(close, period, state):
+    """
+    流式版本的 rma, 状态: [k线数, 前 period 个值的累加和, 上一根k线的 rma]。
+    和 calculate_rma 一样, 第 0 根k线不参与计算, 第一个有效值在第 period 根k线,
+    是第 1 到 period 根的平均值, 之后每根k线递推, 遇到 NaN 之后一直是 NaN。
+    """
+    i = int(state[0])
+    state[0] = i + 1
+    if period <= 0 or i == 0:
+        state[1] = 0.0
+        state[2] = np.nan
+        return np.nan
+
+    if i <= period:
+        # NaN 会一直传播到累加和中, 和 calculate_rma 遇到 NaN 就中断的结果相同
+        state[1] += close
+        if i < period:
+            return np.nan
+        result = np_float_type(state[1] / period)
+    else:
+        prev = np_float_type(state[2])
+        if prev == prev and close == close:
+            result = np_float_type((prev * (period - 1) + close) / period)
+        else:
+            result = np.nan
+
+    state[2] = result
+    return result
@@ -1,7 +1,7 @@
 import numba as nb
 import numpy as np
-from utils.data_types import loop_indicators_signature
-from .indicators_tool import check_bounds
+from utils.data_types import loop_indicators_signature, stream_indicators_signature
+from .indicators_tool import check_bounds, compensated_add
 from utils.numba_utils import nb_wrapper
 
 
@@ -13,14 +13,16 @@ dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
 nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
+np_float_type = dtype_dict["np"]["float"]
 
 
 sma_spec = {
     "name": "sma",
     "ori_name": "sma",
     "result_name": ["sma"],
-    "default_params": [14],
-    "param_count": 1,
+    # [period, rolling], rolling=0 (默认) 使用逐窗口精确求和, rolling=1 使用 O(n) 滑动窗口累加和
+    "default_params": [14, 0],
+    "param_count": 2,
     "result_count": 1,
     "temp_count": 0,
 }
@@ -60,6 +62,54 @@ def calculate_sma(close, period, sma_result):
         sma_result[i + period - 1] = sum_val / period
 
 
+signature = nb.void(nb_float_type[:], nb_int_type, nb_float_type[:])
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calculate_sma_rolling(close, period, sma_result):
+    """
+    O(n) 滑动窗口版本的 sma, 每根k线只加入新值,移除旧值,复杂度与 period 无关。
+    NaN 不进入累加和,只计数,窗口内存在 NaN 时结果为 NaN,与 calculate_sma 保持一致。
+    累加和用 float64 的补偿求和, 误差不随k线数量累积, float32 模式下只在写入结果时舍入一次。
+    """
+    # 越界检查
+    if check_bounds(close, period, sma_result) == 0:
+        return
+
+    data_length = len(close)
+
+    for i in range(period - 1):
+        sma_result[i] = np.nan
+
+    sum_val = 0.0
+    sum_comp = 0.0
+    nan_count = 0
+    for i in range(data_length):
+        if close[i] == close[i]:
+            sum_val, sum_comp = compensated_add(sum_val, sum_comp, close[i])
+        else:
+            nan_count += 1
+
+        # 移除滑出窗口的旧值
+        if i >= period:
+            if close[i - period] == close[i - period]:
+                sum_val, sum_comp = compensated_add(
+                    sum_val, sum_comp, -close[i - period]
+                )
+            else:
+                nan_count -= 1
+
+        if i >= period - 1:
+            if nan_count > 0:
+                sma_result[i] = np.nan
+            else:
+                sma_result[i] = (sum_val + sum_comp) / period
+
+
 signature = nb.void(
     *loop_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
 )
@@ -78,11 +128,114 @@ def calculate_sma_wrapper(
     sma_indicator_params_child = indicator_params_child[_id]
     sma_indicator_result_child = indicator_result_child[_id]
 
-    if sma_indicator_params_child.shape[0] >= 1:
+    if sma_indicator_params_child.shape[0] >= 2:
         sma_period = sma_indicator_params_child[0]
+        sma_rolling = sma_indicator_params_child[1]
 
     if sma_indicator_result_child.shape[0] >= 1:
         sma_result = sma_indicator_result_child[:, 0]
 
     # sma_period 不用显示转换类型, numba会隐式把小数截断成整数(小数部分丢弃)
-    calculate_sma(close, sma_period, sma_result)
+    if sma_rolling:
+        calculate_sma_rolling(close, sma_period, sma_result)
+    else:
+        calculate_sma(close, sma_period, sma_result)
+
+
+# 流式计算状态中环形缓冲区的起始位置, 见 get_sma_state_count
+sma_ring_offset = 4
+
+
+def get_sma_state_count(params):
+    """
+    流式计算的状态长度: [k线数, 累加和, 窗口内 NaN 数量, 补偿求和的误差, 最近 period 个 close 的环形缓冲区]。
+    """
+    return sma_ring_offset + max(int(params[:, 0].max()), 1)
+
+
+def get_sma_warmup(params):
+    """
+    增量计算时每行参数需要往前重新计算的k线数量, -1 表示需要从第 0 根k线重新计算。
+    逐窗口求和的结果只依赖最近 period 根k线, 滑动窗口的累加和依赖之前所有的k线 (舍入误差)。
+    """
+    return np.where(params[:, 1] != 0, -1, params[:, 0].astype(np.int64) - 1)
+
+
+def get_sma_cost(params):
+    """
+    每行参数的相对计算量, 用于给工作线程分配任务, 以一次 O(n) 遍历为 1。
+    逐窗口求和每根k线累加 period 个 close, 实测 period=200 时约是滑动窗口的 11 倍。
+    """
+    return np.where(params[:, 1] != 0, 1.0, 1.0 + params[:, 0] / 20.0)
+
+
+signature = nb_float_type(nb_float_type, nb_int_type, nb_bool_type, nb.float64[:])
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def sma_update(close, period, rolling, state):
+    """
+    流式版本的 sma, 加入一个新的 close, 返回这根k线的 sma。
+    rolling=True 时和 calculate_sma_rolling 的运算顺序相同, 复杂度 O(1);
+    rolling=False 时和 calculate_sma 一样按窗口重新求和, 复杂度 O(period)。
+    状态数组是 float64, 和批量计算中的 float64 局部变量一致, 读回窗口中的值时转换回 nb_float_type。
+    """
+    if period <= 0:
+        return np.nan
+
+    i = int(state[0])
+    ring = state[sma_ring_offset : sma_ring_offset + period]
+    pos = i % period
+    old = ring[pos]
+
+    if rolling:
+        if close == close:
+            state[1], state[3] = compensated_add(state[1], state[3], close)
+        else:
+            state[2] += 1
+        # 移除滑出窗口的旧值
+        if i >= period:
+            if old == old:
+                state[1], state[3] = compensated_add(
+                    state[1], state[3], -np_float_type(old)
+                )
+            else:
+                state[2] -= 1
+
+    ring[pos] = close
+    state[0] = i + 1
+
+    if i < period - 1:
+        return np.nan
+
+    if rolling:
+        if state[2] > 0:
+            return np.nan
+        return (state[1] + state[3]) / period
+
+    sum_val = 0.0
+    for j in range(period):
+        sum_val += np_float_type(ring[(i + 1 + j) % period])
+    return sum_val / period
+
+
+signature = nb.void(
+    *stream_indicators_signature(nb_int_type, nb_float_type, nb_bool_type)
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def calculate_sma_stream(bar, indicator_params_row, state, indicator_result_row):
+    close = bar[4]
+    sma_period = int(indicator_params_row[0])
+    sma_rolling = indicator_params_row[1] != 0
+
+    indicator_result_row[0] = sma_update(close, sma_period, sma_rolling, state)
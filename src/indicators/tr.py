@@ -41,3 +41,24 @@ def calculate_tr(high, low, close, tr_result):
         range2 = abs(high[i] - close[i - 1])
         range3 = abs(low[i] - close[i - 1])
         tr_result[i] = max(range1, range2, range3)
+
+
+signature = nb_float_type(nb_float_type, nb_float_type, nb_float_type)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def tr_update(high, low, prev_close):
+    """
+    流式版本的 tr, prev_close 是上一根k线的 close, 第一根k线传入 NaN。
+    """
+    if high != high or low != low or prev_close != prev_close:
+        return np.nan
+
+    range1 = high - low
+    range2 = abs(high - prev_close)
+    range3 = abs(low - prev_close)
+    return max(range1, range2, range3)
@@ -4,23 +4,112 @@ from numba.cuda.cudadrv.devicearray import DeviceNDArray
 
 from src.parallel_executors import (
     parallel_calc,
+    parallel_calc_indicators,
+    parallel_calc_indicators_tail,
+    parallel_calc_tail,
     # parallel_calc_normal,
     # parallel_calc_njit,
     # parallel_calc_cuda,
 )
 from utils.numba_gpu_utils import auto_tune_cuda_parameters  # 导入新的工具函数
 from utils.time_utils import time_wrapper
+from utils.profile_utils import TimingReport, create_profile_counters
 from utils.data_types import get_numba_data_types
-from utils.numba_unpack import unpack_params, get_output, initialize_outputs
+from utils.numba_unpack import (
+    unpack_params,
+    get_output,
+    get_summary_output,
+    get_outputs_spec,
+    create_outputs,
+    get_unique_indicator_params,
+    get_slot_count,
+)
 from utils.data_loading import transform_data_recursive
+from utils.config_utils import get_mapping_data, get_signal_lookback
+from utils.resample_data import resample_tohlcv
 
 from utils.numba_params import nb_params
-from utils.outputs_global import get_outputs_from_global, set_outputs_from_global
+from utils.numba_utils import compile_lazy_kernels
+from utils.outputs_global import (
+    default_max_bytes,
+    get_spec_key,
+    acquire_outputs,
+    acquire_warm_outputs,
+    release_outputs,
+    slice_outputs,
+    copy_outputs_overlap,
+    get_warm_start_key,
+    WarmStartState,
+)
+from utils.numba_unpack import ArraySpec
+from utils.outputs_file import (
+    create_outputs_file,
+    write_outputs_manifest,
+    get_outputs_chunk_size,
+    get_config_nbytes,
+    get_indicator_row_nbytes,
+    slice_config_chunk,
+    slice_indicator_chunk,
+)
+from utils.schedule_utils import (
+    get_kernel_schedule,
+    get_indicator_schedule,
+    get_config_schedule,
+)
+from src.indicators.indicators_wrapper import indicators_spec
 
 import time
 
 default_dtype_dict = get_numba_data_types(enable64=True)
 
+# 增量计算分配结果数组时多留的k线数量比例, k线增加时在这个范围内不需要重新分配和拷贝
+warm_start_headroom = 0.25
+
+
+def get_first_changed_row(old, new):
+    """
+    new 和 old 第一行不同的行号, NaN 视为相同, 前面都相同时返回较短的长度。
+    """
+    n = min(old.shape[0], new.shape[0])
+    same = old[:n] == new[:n]
+    if np.issubdtype(new.dtype, np.floating):
+        same |= np.isnan(old[:n]) & np.isnan(new[:n])
+    changed = np.flatnonzero(~same.reshape(n, -1).all(axis=1))
+    return int(changed[0]) if changed.size > 0 else n
+
+
+def get_warm_start_rows(warm_state, tohlcv, tohlcv2, mapping_data):
+    """
+    和上一次计算相比, tohlcv 和 tohlcv2 第一根需要重新计算的k线 (start, start2)。
+    tohlcv2 从 start2 开始变化时, 对应到 tohlcv2 第 start2 根k线之后的 tohlcv 也需要重新计算。
+    """
+    start2 = get_first_changed_row(warm_state.tohlcv2, tohlcv2)
+    start = min(
+        get_first_changed_row(warm_state.tohlcv, tohlcv),
+        get_first_changed_row(warm_state.mapping_data, mapping_data),
+    )
+    affected = np.flatnonzero(mapping_data >= start2)
+    if affected.size > 0:
+        start = min(start, int(affected[0]))
+    return start, start2
+
+
+def get_indicator_start(indicator_params, indicator_enabled, start, dtype_dict):
+    """
+    增量计算时每个指标每行去重后的参数开始重新计算的k线, 见 indicators_spec 的 warmup。
+    """
+    np_int_type = dtype_dict["np"]["int"]
+    indicator_start = []
+    for spec in indicators_spec.values():
+        params = indicator_params[spec["id"]]
+        if indicator_enabled[spec["id"]]:
+            warmup = spec["warmup"](params)
+            _start = np.where(warmup < 0, 0, np.maximum(start - warmup, 0))
+        else:
+            _start = np.zeros(params.shape[0])
+        indicator_start.append(np.ascontiguousarray(_start, dtype=np_int_type))
+    return tuple(indicator_start)
+
 
 def entry_func(
     mode,
@@ -41,7 +130,17 @@ def entry_func(
     core_time=False,
     auto_tune_cuda_config=True,
     reuse_outputs=True,
-    max_size=1,
+    max_bytes=default_max_bytes,
+    summary_only=False,
+    slot_count=None,
+    tohlcv2_multiple=None,
+    max_trades=0,
+    report=None,
+    warm_start=False,
+    pack_signals=False,
+    output_dir=None,
+    working_set_bytes=default_max_bytes,
+    cost_schedule=True,
 ):
     """
     目前的设计来说,同一波并发,可以变的参数如下
@@ -55,11 +154,80 @@ def entry_func(
     3. 如果想启用指标探索的话,探索用循环就行了,优化用并发,既然探索用了循环,indicator_enabled就没必要在并发中可变了,循环中可变已经够用了
     4. 我更倾向于盘感驱动式量化交易(符合人的交易直觉),而不是像机械学习那样大规模探索指标和策略(看起来太黑箱了),所以indicator_enabled就没必要在并发中可变了,循环中可变已经够用了
     5. 为什么只有一个signal_params,如果用两个signal_params,是为了指标信号探索过程中的不同周期组合,这个就太复杂了(像机械学习),我只需要简单的信号模版选择功能就行了(盘感驱动的量化交易)
+
+    临时数组只按 slot_count 个工作线程分配, 每个线程在处理的多个 config 之间复用。
+    summary_only=True 时, 逐k线的信号和回测数组也只按 slot_count 分配,
+    内存不随 conf_count 增长, 只返回 backtest_summary (conf_count, backtest_summary_count),
+    适合大规模参数优化。slot_count 默认由 get_slot_count 根据线程数或gpu规格计算。
+
+    tohlcv2_multiple 不为 None 且没有传入 tohlcv2 时, 用 resample_tohlcv 从 tohlcv 重采样出
+    tohlcv2_multiple 倍周期的 tohlcv2, 同时得到 mapping_data。
+
+    reuse_outputs=True 时从 outputs_global 的 LRU 缓存中复用结果数组, 形状不同时复用更大数组的切片视图,
+    缓存的总字节数不超过 max_bytes。
+
+    max_trades > 0 时, 每个 config 在 trade_result 中保留最近的 max_trades 笔交易记录,
+    trade_count 是交易总数, 用 calculate_trades.get_trade_records 展开成结构化数组。
+    summary_only 模式下同样返回交易记录, 参数优化可以只取交易记录而不保留逐k线数组。
+
+    report 是 utils.profile_utils.TimingReport, 不传时内部创建, 记录各阶段的耗时 (秒):
+    plan (重采样, 指标参数去重), allocation (结果数组分配或复用, 输入数组拷贝到gpu),
+    kernel (指标阶段和回测阶段的内核), transfer (cuda 模式下结果拷贝回cpu),
+    开启 NUMBA_QUANT_PROFILE 时还有内核中每个工作线程每个阶段的时钟周期。
+    core_time=True 时打印这个报告。
+
+    warm_start=True 时增量计算, 用于定时运行时 tohlcv 只在尾部增加或修改了几根k线的情况:
+    缓存中保留上一次相同参数计算的结果和输入的k线, 指标从第一根变化的k线往前 warmup 根k线开始重新计算,
+    信号和回测从第一根变化的k线所在仓位的开仓k线开始重新计算, 结果和完整计算相同。
+    结果数组按k线数量多分配 warm_start_headroom 的比例, k线增加时不需要重新分配。
+    只支持 normal 和 njit 模式, 需要 reuse_outputs=True, 不支持 summary_only。
+
+    pack_signals=True 时每个 config 的信号按位保存在 signal_bits (conf_count, signal_result_count, words) 中,
+    每个 uint64 保存 64 根k线, 内存是 signal_result 的 1/8, 用 calculate_signals.unpack_signal_bits 展开。
+    这时 signal_result 只按 slot_count 分配, 是工作线程的临时缓冲区。不支持 warm_start。
+
+    output_dir 不为 None 时, 指标结果和第一维是 conf_count 的结果数组 (signal_result, signal_bits,
+    backtest_result, backtest_summary, trade_result, trade_count) 分配成 output_dir 中的内存映射文件 (.npy),
+    结果可以比内存大。指标阶段按去重后的参数行, 回测阶段按 config 分块运行内核,
+    每块写入的结果不超过 working_set_bytes, 每块结束后 flush 到文件。
+    计算完成后保存输入数组并写入 manifest.json, 之后用 utils.outputs_file.load_outputs_file 读取, 不需要重新计算。
+    只支持 normal 和 njit 模式, 不使用 outputs_global 的缓存, 不支持 warm_start。
+
+    cost_schedule=True 时 normal/njit 模式按估计的计算量给工作线程分配任务 (utils.schedule_utils):
+    指标阶段按 indicators_spec 的 cost (逐窗口计算的 sma, bbands 和 period 成正比),
+    回测阶段按 backtest_params 的离场开关, 计算量大的任务先分给当前总计算量最小的线程,
+    避免静态轮流分配时一个线程最后才结束。为 False 时按 idx = slot, slot + slot_count, ... 轮流分配。
+    分配方式只影响哪个线程计算哪个任务, 不影响结果。
     """
+    if report is None:
+        report = TimingReport()
+
+    if warm_start:
+        if mode not in ["normal", "njit"]:
+            raise ValueError(f"warm_start 不支持 {mode} 模式")
+        if summary_only or not reuse_outputs or max_bytes <= 0:
+            raise ValueError("warm_start 需要 reuse_outputs=True, 并且不支持 summary_only")
+        if pack_signals:
+            raise ValueError("warm_start 不支持 pack_signals")
+        if output_dir is not None:
+            raise ValueError("warm_start 不支持 output_dir")
+
+    if output_dir is not None and mode not in ["normal", "njit"]:
+        raise ValueError(f"output_dir 不支持 {mode} 模式")
+
+    # lazy 模式下第一次调用时才编译或加载缓存
+    compile_lazy_kernels()
+
     start_time = time.perf_counter()
 
     _conf_count = backtest_params.shape[0]
 
+    if tohlcv2 is None and tohlcv2_multiple is not None:
+        tohlcv2, _mapping_data = resample_tohlcv(tohlcv, tohlcv2_multiple, dtype_dict)
+        if mapping_data is None:
+            mapping_data = _mapping_data
+
+    tohlcv2_given = tohlcv2 is not None
     if tohlcv2 is None:
         tohlcv2 = tohlcv[-min_rows:].copy()
 
@@ -70,29 +238,100 @@ def entry_func(
         indicator_enabled2 = np.zeros_like(indicator_enabled)
 
     if mapping_data is None:
-        mapping_data = np.zeros(tohlcv.shape[0], dtype=dtype_dict["np"]["int"])
-
-    lookup_dict = {
-        "_conf_count": _conf_count,
-        "tohlcv_shape": tohlcv.shape,
-        "tohlcv2_shape": tohlcv2.shape,
-        "temp_int_num": temp_int_num,
-        "temp_float_num": temp_float_num,
-        "temp_bool_num": temp_bool_num,
-        "min_rows": min_rows,
-    }
+        if tohlcv2_given and indicator_enabled2.any():
+            mapping_data = get_mapping_data(tohlcv, tohlcv2, dtype_dict)
+        else:
+            # 没有传入 tohlcv2 或者没有启用 tohlcv2 的指标时不会用到 mapping_data,
+            # 不需要推断k线周期 (少于 2 根k线时无法推断)
+            mapping_data = np.zeros(tohlcv.shape[0], dtype=dtype_dict["np"]["int"])
+
+    # 计划阶段: 相同参数的指标只计算一次, config 通过 indicator_index 引用共享的结果
+    indicator_params, indicator_index = get_unique_indicator_params(
+        indicator_params, indicator_enabled, dtype_dict
+    )
+    indicator_params2, indicator_index2 = get_unique_indicator_params(
+        indicator_params2, indicator_enabled2, dtype_dict
+    )
+
+    slot_count = get_slot_count(mode, _conf_count, slot_count)
+
+    # output_dir 时在 launch_kernels_chunked 中按块分配
+    schedule = None
+    if mode in ["normal", "njit"] and output_dir is None:
+        schedule = get_kernel_schedule(
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            backtest_params,
+            slot_count,
+            cost_schedule,
+            dtype_dict["np"]["int"],
+        )
+
+    plan_time = time.perf_counter()
+
+    # 先计算所有数组的形状和类型, 再从缓存中查找可复用的数组
+    outputs_spec = get_outputs_spec(
+        mode,
+        tohlcv,
+        tohlcv2,
+        indicator_params,
+        indicator_params2,
+        indicator_enabled,
+        indicator_enabled2,
+        _conf_count,
+        dtype_dict,
+        temp_int_num=temp_int_num,
+        temp_float_num=temp_float_num,
+        temp_bool_num=temp_bool_num,
+        min_rows=min_rows,
+        summary_only=summary_only,
+        slot_count=slot_count,
+        max_trades=max_trades,
+        pack_signals=pack_signals,
+    )
     outputs = None
-    if reuse_outputs and max_size > 0:
-        outputs = get_outputs_from_global(lookup_dict)
+    outputs_handle = None
+    outputs_files = None
+    warm_state = None
+    if output_dir is not None:
+        outputs, outputs_files = create_outputs_file(
+            outputs_spec, output_dir, _conf_count
+        )
+        reuse_outputs = False
+    elif warm_start:
+        # 除了k线数据之外的输入都相同时, 才能复用上一次的结果
+        warm_key = get_warm_start_key(
+            mode,
+            dtype_dict["np"]["float"],
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_index,
+            indicator_index2,
+            signal_params,
+            backtest_params,
+            (temp_int_num, temp_float_num, temp_bool_num, min_rows, max_trades),
+            slot_count,
+        )
+        outputs, outputs_handle, warm_state = acquire_warm_outputs(
+            mode, outputs_spec, warm_key
+        )
+    elif reuse_outputs and max_bytes > 0:
+        outputs, outputs_handle = acquire_outputs(mode, outputs_spec)
 
-    if outputs:
-        print("已复用上一次的结果数组,避免重复初始化开销")
-    else:
-        # 在gpu模式下,outputs会直接生成为gpu数组,数组太大了,省略转换,直接生成空数组
-        outputs = initialize_outputs(
+    report.outputs_reused = outputs is not None
+    if outputs is None and warm_start:
+        # 按k线数量多分配一些, 之后k线增加时直接复用视图, 之前的结果还在原来的位置
+        np_float_type = dtype_dict["np"]["float"]
+        capacity = int(tohlcv.shape[0] * (1 + warm_start_headroom)) + 1
+        capacity2 = int(tohlcv2.shape[0] * (1 + warm_start_headroom)) + 1
+        capacity_spec = get_outputs_spec(
             mode,
-            tohlcv,
-            tohlcv2,
+            ArraySpec((capacity, tohlcv.shape[1]), np_float_type),
+            ArraySpec((capacity2, tohlcv2.shape[1]), np_float_type),
             indicator_params,
             indicator_params2,
             indicator_enabled,
@@ -103,10 +342,35 @@ def entry_func(
             temp_float_num=temp_float_num,
             temp_bool_num=temp_bool_num,
             min_rows=min_rows,
+            slot_count=slot_count,
+            max_trades=max_trades,
         )
+        capacity_outputs = create_outputs(mode, capacity_spec)
+        if outputs_handle is not None:
+            copy_outputs_overlap(outputs_handle[1], capacity_outputs)
+        outputs = slice_outputs(capacity_outputs, outputs_spec)
+        outputs_handle = (get_spec_key(capacity_spec), capacity_outputs)
+    elif outputs is None:
+        # 在gpu模式下,outputs会直接生成为gpu数组,数组太大了,省略转换,直接生成空数组
+        outputs = create_outputs(mode, outputs_spec)
+        outputs_handle = (get_spec_key(outputs_spec), outputs)
 
-    if reuse_outputs and max_size > 0 and outputs:
-        set_outputs_from_global(lookup_dict, outputs, max_size=max_size)
+    tail_args = None
+    if warm_state is not None:
+        start, start2 = get_warm_start_rows(warm_state, tohlcv, tohlcv2, mapping_data)
+        lookback = get_signal_lookback(signal_params)
+        # 变化的k线太靠前时直接完整计算
+        if start >= lookback:
+            tail_args = (
+                get_indicator_start(indicator_params, indicator_enabled, start, dtype_dict),
+                get_indicator_start(
+                    indicator_params2, indicator_enabled2, start2, dtype_dict
+                ),
+                start,
+                start2,
+                lookback,
+            )
+            report.warm_start = (start, start2)
 
     inputs = (
         tohlcv,
@@ -118,27 +382,106 @@ def entry_func(
         indicator_enabled2,
         signal_params,
         backtest_params,
+        indicator_index,
+        indicator_index2,
     )
 
     if mode == "cuda":
         # inputs数组,在cuda模式下,会被转换成gpu,数组小,转换快
         inputs = transform_data_recursive(inputs, mode="to_device")
     params = unpack_params(outputs, inputs)
+    # 关闭阶段计时时为 None, 内核中的计时代码在编译时被剪掉
+    profile_counters = create_profile_counters(slot_count)
 
     end_time = time.perf_counter()
-    print("数据生成时间:", end_time - start_time)
+    report.timings["plan"] = plan_time - start_time
+    report.timings["allocation"] = end_time - plan_time
 
-    if mode in ["normal", "njit"]:
+    if outputs_files is not None:
+        result = launch_kernels_chunked(
+            outputs,
+            inputs,
+            _conf_count,
+            summary_only,
+            working_set_bytes,
+            profile_counters,
+            report,
+            cost_schedule,
+        )
+        write_outputs_manifest(output_dir, inputs, outputs_files, _conf_count)
+        report.counters = profile_counters
+        if core_time:
+            print(report)
+        return result
 
-        def _launch(_p):
-            parallel_calc(_p)
+    next_warm_state = None
+    try:
+        result = launch_kernels(
+            mode,
+            params,
+            _conf_count,
+            summary_only,
+            auto_tune_cuda_config,
+            profile_counters,
+            report,
+            tail_args,
+            schedule,
+        )
+        if warm_start:
+            next_warm_state = WarmStartState(
+                warm_key, tohlcv.copy(), tohlcv2.copy(), mapping_data.copy()
+            )
+    finally:
+        # 计算完成后放回缓存, 返回的结果数组是缓存的视图, 下一次复用时会被覆盖
+        if reuse_outputs and max_bytes > 0:
+            release_outputs(mode, outputs_handle, max_bytes, next_warm_state)
 
-        if core_time:
-            timed_launch_func = time_wrapper(_launch)
-            timed_launch_func(params)
-        else:
-            _launch(params)
+    report.counters = profile_counters
+    if core_time:
+        print(report)
+    return result
 
+
+def launch_kernels(
+    mode,
+    params,
+    _conf_count,
+    summary_only,
+    auto_tune_cuda_config,
+    profile_counters,
+    report,
+    tail_args=None,
+    schedule=None,
+):
+    """
+    启动指标阶段和回测阶段的内核, 返回输出字典, kernel 和 transfer 的耗时写入 report。
+    profile_counters 和 schedule 只在 normal/njit 模式下传给内核,
+    schedule 是 utils.schedule_utils.get_kernel_schedule 的返回值。
+    tail_args 不为 None 时增量计算 (indicator_start, indicator_start2, start, start2, lookback),
+    只支持 normal/njit 模式, 不计时。
+    """
+    timings = report.timings
+    kernel_start = time.perf_counter()
+    if mode in ["normal", "njit"] and tail_args is not None:
+        (indicator_start, indicator_start2, start, start2, lookback) = tail_args
+        parallel_calc_indicators_tail(
+            params, indicator_start, indicator_start2, start, start2
+        )
+        parallel_calc_tail(params, start, lookback)
+        timings["kernel"] = time.perf_counter() - kernel_start
+        timings["transfer"] = 0.0
+        return get_output(params)
+    elif mode in ["normal", "njit"]:
+        (indicator_tasks, indicator_offsets, config_order, config_offsets) = schedule
+        parallel_calc_indicators(
+            params, indicator_tasks, indicator_offsets, profile_counters
+        )
+        parallel_calc(params, config_order, config_offsets, profile_counters)
+        timings["kernel"] = time.perf_counter() - kernel_start
+        timings["transfer"] = 0.0
+
+        if summary_only:
+            return get_summary_output(params)
         return get_output(params)
     elif mode == "cuda":
         if auto_tune_cuda_config:
@@ -153,28 +496,111 @@ def entry_func(
                 blockspergrid = 1
             max_registers = None  # 保持默认值或根据您的需求设置
 
-        def _launch(_p):
-            parallel_calc[blockspergrid, threadsperblock](_p)
-            nb.cuda.synchronize()
-
-        if core_time:
-            timed_launch_func = time_wrapper(_launch)
-            timed_launch_func(params)
-        else:
-            _launch(params)
+        # 指标阶段和回测阶段分两次启动, 内核之间天然同步, 保证共享的指标结果已经算完
+        parallel_calc_indicators[blockspergrid, threadsperblock](params)
+        parallel_calc[blockspergrid, threadsperblock](params)
+        nb.cuda.synchronize()
+        timings["kernel"] = time.perf_counter() - kernel_start
 
         start_time = time.perf_counter()
-        print("开始把数据从gpu提取到cpu")
 
-        cpu_params = transform_data_recursive(get_output(params), mode="to_host")
+        # summary_only 模式下只拷贝标量统计, 工作缓冲区留在gpu上
+        output_func = get_summary_output if summary_only else get_output
+        cpu_params = transform_data_recursive(output_func(params), mode="to_host")
 
         end_time = time.perf_counter()
-        print("数据 gpu -> cpu:", end_time - start_time)
+        timings["transfer"] = end_time - start_time
         return cpu_params
     else:
         raise ValueError(f"Invalid mode: {mode}")
 
 
+def launch_kernels_chunked(
+    outputs,
+    inputs,
+    _conf_count,
+    summary_only,
+    working_set_bytes,
+    profile_counters,
+    report,
+    cost_schedule=True,
+):
+    """
+    分块启动 normal/njit 模式的内核, 用于结果数组是内存映射文件的情况 (entry_func 的 output_dir):
+    指标阶段每块处理去重后的一段参数行, 回测阶段每块处理一段 config, 指标结果在所有块之间共享。
+    每块写入的结果不超过 working_set_bytes, 结束后 flush, 脏页写回文件之后可以被操作系统回收。
+    临时数组按 slot 分配, 在所有块之间复用。每块的任务按 cost_schedule 分别分配, 见 entry_func。
+    """
+    timings = report.timings
+    kernel_start = time.perf_counter()
+    slot_count = outputs[-1][0].shape[0]
+    # 任务分配数组和 indicator_index 的整数类型相同
+    int_type = inputs[9].dtype
+
+    (_, _, indicator_result, indicator_result2, *_) = outputs
+    row_count = max(i.shape[0] for i in indicator_result + indicator_result2)
+    chunk_size = get_outputs_chunk_size(
+        get_indicator_row_nbytes(outputs, inputs), working_set_bytes, slot_count
+    )
+    for start in range(0, row_count, chunk_size or row_count):
+        chunk_outputs, chunk_inputs = slice_indicator_chunk(
+            outputs, inputs, start, start + (chunk_size or row_count)
+        )
+        (_, _, _, params, params2, enabled, enabled2, *_) = chunk_inputs
+        indicator_tasks, indicator_offsets = get_indicator_schedule(
+            params, params2, enabled, enabled2, slot_count, cost_schedule, int_type
+        )
+        parallel_calc_indicators(
+            unpack_params(chunk_outputs, chunk_inputs),
+            indicator_tasks,
+            indicator_offsets,
+            profile_counters,
+        )
+        _flush_outputs(chunk_outputs[2:4])
+
+    chunk_size = get_outputs_chunk_size(
+        get_config_nbytes(outputs, _conf_count), working_set_bytes, slot_count
+    )
+    chunk_size = chunk_size or _conf_count
+    report.chunk_count = 0
+    for start in range(0, _conf_count, chunk_size):
+        chunk_outputs, chunk_inputs = slice_config_chunk(
+            outputs, inputs, _conf_count, start, start + chunk_size
+        )
+        config_order, config_offsets = get_config_schedule(
+            chunk_inputs[8], slot_count, cost_schedule, int_type
+        )
+        parallel_calc(
+            unpack_params(chunk_outputs, chunk_inputs),
+            config_order,
+            config_offsets,
+            profile_counters,
+        )
+        _flush_outputs(chunk_outputs[4:10])
+        report.chunk_count += 1
+
+    timings["kernel"] = time.perf_counter() - kernel_start
+    timings["transfer"] = 0.0
+
+    params = unpack_params(outputs, inputs)
+    if summary_only:
+        return get_summary_output(params)
+    return get_output(params)
+
+
+def _flush_outputs(outputs):
+    # 内存映射文件的视图通过 base 找到 mmap, 内存中分配的数组没有 mmap
+    for item in outputs:
+        if isinstance(item, tuple):
+            _flush_outputs(item)
+            continue
+        base = item
+        while base is not None and not isinstance(base, np.memmap):
+            base = getattr(base, "base", None)
+        if base is not None:
+            base.flush()
+
+
 @time_wrapper
 def entry_func_wrapper(*args, **kwargs):
     return entry_func(*args, **kwargs)
@@ -8,7 +8,7 @@ root_path = next(
 if root_path:
     sys.path.insert(0, str(root_path))
 
-from utils.export_file import export_csv
+from utils.export_file import export_csv, export_columnar
 from utils.json_tool import load_numba_config
 import time
 import typer
@@ -23,24 +23,48 @@ def main(
     task_time: bool = True,
     total_time: bool = False,
     max_registers: int = 24,
-    max_size: int = 1,
+    max_bytes: int = 1024 * 1024 * 1024,
+    lazy: bool = True,
+    bundle: str = "",
+    profile: bool = False,
+    export_format: str = "csv",
 ):
     """
     pre_run 控制是否执行第一次迭代 (预运行)
     total_time 包含jit,njit,cuda的完整运行时间,不包括csv文件导入时间
     task_time 包含数据预生成和内核运行的时间
-    core_time 内核运行的时间
+    core_time 打印 entry_func 的耗时报告 (TimingReport)
+    lazy 导入时不编译, 第一次调用时才编译或加载缓存, 启动时间分解见 benchmark/startup.py
+    bundle 预编译包目录, 见 utils/precompile.py
+    profile 内核按阶段累计时钟周期, 只支持 normal 和 njit 模式, 结果在耗时报告中
+    export_format 结果的导出格式, 默认 csv 只导出第一个 config 的 csv,
+        columnar 导出所有 config 的二进制列存 (见 export_columnar), 为空时不导出
     """
-    # 加载numba_config临时配置文件
+    # 通过环境变量初始化numba配置
     nb_params = load_numba_config(
-        mode=mode, cache=cache, enable64=enable64, max_registers=max_registers
+        mode=mode,
+        cache=cache,
+        enable64=enable64,
+        max_registers=max_registers,
+        lazy=lazy,
+        profile=profile,
     )
 
+    if bundle:
+        from utils.precompile import load_bundle
+
+        load_bundle(bundle)
+
     # 确保加载完numba_config后再import numba
     start_time = time.time()
     import numba as nb
     from src.interface import entry_func, entry_func_wrapper
-    from utils.config_utils import get_dtype_dict, perpare_data, get_params
+    from utils.config_utils import (
+        get_dtype_dict,
+        perpare_data,
+        get_params,
+    )
+    from utils.resample_data import resample_tohlcv
     from src.signal.simple_template import simple_id, simple_name
     from src.backtest.calculate_backtest import backtest_result_name
     from src.calculate_signals import signal_result_name
@@ -61,19 +85,17 @@ def main(
             continue
 
         path = "database/live/BTC_USDT/15m/BTC_USDT_15m_20230228 160000.csv"
-        path2 = "database/live/BTC_USDT/4h/BTC_USDT_4h_20230228 160000.csv"
 
         data_size = 40 * 1000
         data_size = 10 if i == 0 else data_size
 
-        dtype_dict = get_dtype_dict(enable64=True)
+        dtype_dict = get_dtype_dict(enable64=enable64)
 
         df_data, np_data = perpare_data(
             path, data_size=data_size, dtype_dict=dtype_dict
         )
-        df_data2, np_data2 = perpare_data(
-            path2, data_size=data_size, dtype_dict=dtype_dict
-        )
+        # 4h 数据从 15m 重采样得到, 两个周期的边界总是一致
+        np_data2, mapping_data = resample_tohlcv(np_data, 16, dtype_dict)
         num = 1
         params = get_params(
             num=num,
@@ -152,10 +174,10 @@ def main(
             tohlcv2=np_data2,
             indicator_params2=params["indicator_params2"],
             indicator_enabled2=params["indicator_enabled2"],
-            mapping_data=params["mapping_data"],
+            mapping_data=mapping_data,
             dtype_dict=dtype_dict,
             core_time=core_time,
-            max_size=max_size,
+            max_bytes=max_bytes,
         )
 
         if i != 0:
@@ -164,18 +186,29 @@ def main(
             # print(f"{mode} indicator_result2:", indicator_result2)
             # print(f"{mode} signal_result:", signal_result)
 
-            export_csv(
-                simple_name,
-                [["time", "open", "high", "low", "close", "volume"], result["tohlcv"]],
-                [["time", "open", "high", "low", "close", "volume"], result["tohlcv2"]],
-                [params["indicator_col_name"], result["indicator_result"]],
-                [params["indicator_col_name2"], result["indicator_result2"]],
-                [signal_result_name, result["signal_result"]],
-                [backtest_result_name, result["backtest_result"]],
-                params["indicator_enabled"],
-                params["indicator_enabled2"],
-                write_csv=True,
-            )
+            if export_format == "columnar":
+                export_columnar(f"output/{simple_name}/columnar", result)
+            elif export_format == "csv":
+                export_csv(
+                    simple_name,
+                    [
+                        ["time", "open", "high", "low", "close", "volume"],
+                        result["tohlcv"],
+                    ],
+                    [
+                        ["time", "open", "high", "low", "close", "volume"],
+                        result["tohlcv2"],
+                    ],
+                    [params["indicator_col_name"], result["indicator_result"]],
+                    [params["indicator_col_name2"], result["indicator_result2"]],
+                    [signal_result_name, result["signal_result"]],
+                    [backtest_result_name, result["backtest_result"]],
+                    params["indicator_enabled"],
+                    params["indicator_enabled2"],
+                    write_csv=True,
+                    indicator_index=result["indicator_index"],
+                    indicator_index2=result["indicator_index2"],
+                )
 
         if total_time:
             print(f"Task {i} total_time: {time.time() - start_time:.4f} seconds")
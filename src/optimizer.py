@@ -0,0 +1,295 @@
+import itertools
+
+import numpy as np
+
+from src.interface import entry_func
+from src.indicators.indicators_wrapper import indicators_spec
+from src.backtest.calculate_backtest import default_backtest_params
+from src.backtest.calculate_summary import backtest_summary_name
+from src.backtest.calculate_trades import (
+    trade_result_name,
+    trade_result_count,
+    get_trade_records,
+)
+from utils.config_utils import get_params, default_signal_name
+from utils.data_types import get_numba_data_types
+
+default_dtype_dict = get_numba_data_types(enable64=True)
+
+backtest_params_name = list(default_backtest_params.keys())
+
+default_memory_budget = 512 * 1024 * 1024  # 每一批的结果数组内存预算, 字节
+
+
+def get_sweep_dims(indicator_ranges={}, backtest_ranges={}):
+    """
+    把参数范围展开成维度列表, 每个维度是 (kind, name, pos, values)。
+
+    参数:
+    - indicator_ranges: {指标名: [第0个参数的候选值, 第1个参数的候选值, ...]},
+      可以省略尾部的参数, 省略部分使用默认值, 例如 {"bbands": [[14, 20], [2.0, 2.5]]}
+    - backtest_ranges: {default_backtest_params 的键: 候选值列表}
+    """
+    dims = []
+    for name, ranges in indicator_ranges.items():
+        assert name in indicators_spec, f"key '{name}' 无法识别"
+        assert len(ranges) <= indicators_spec[name]["param_count"], (
+            f"指标 '{name}' 的参数数量不匹配: 最多 {indicators_spec[name]['param_count']}, 实际 {len(ranges)}"
+        )
+        for pos, values in enumerate(ranges):
+            assert len(values) > 0, f"指标 '{name}' 的第 {pos} 个参数没有候选值"
+            dims.append(("indicator", name, pos, list(values)))
+
+    for name, values in backtest_ranges.items():
+        assert name in default_backtest_params, f"key '{name}' 无法识别"
+        assert len(values) > 0, f"回测参数 '{name}' 没有候选值"
+        dims.append(("backtest", name, None, list(values)))
+    return dims
+
+
+def iter_grid_configs(dims):
+    """
+    惰性展开网格搜索的所有组合, 每个组合是各维度的候选值元组。
+    """
+    return itertools.product(*(values for _, _, _, values in dims))
+
+
+def iter_random_configs(dims, n_samples, seed=None):
+    """
+    惰性生成随机搜索的组合, 每个维度独立均匀地从候选值中抽取。
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(n_samples):
+        yield tuple(values[rng.integers(len(values))] for _, _, _, values in dims)
+
+
+def get_sweep_batch_size(
+    tohlcv_rows,
+    tohlcv2_rows,
+    indicator_enabled,
+    indicator_enabled2,
+    memory_budget=default_memory_budget,
+    dtype_dict=default_dtype_dict,
+    max_trades=0,
+):
+    """
+    按内存预算计算每一批的 config 数量。
+    summary_only 模式下逐k线的数组按工作线程分配, 只有指标结果和交易记录随 config 数量增长,
+    按最坏情况 (每个 config 的指标参数都不相同) 估算单个 config 的内存。
+    """
+    itemsize = np.dtype(dtype_dict["np"]["float"]).itemsize
+    per_config = (len(backtest_params_name) + len(backtest_summary_name)) * itemsize
+    if max_trades > 0:
+        # trade_result (max_trades, trade_result_count) 和 trade_count
+        per_config += max_trades * trade_result_count * itemsize
+        per_config += np.dtype(dtype_dict["np"]["int"]).itemsize
+    for spec in indicators_spec.values():
+        per_config += spec["param_count"] * itemsize * 2
+        if indicator_enabled[spec["id"]]:
+            per_config += tohlcv_rows * spec["result_count"] * itemsize
+        if indicator_enabled2[spec["id"]]:
+            per_config += tohlcv2_rows * spec["result_count"] * itemsize
+    return max(1, int(memory_budget // per_config))
+
+
+def _get_batch_params(
+    dims,
+    batch,
+    indicator_enabled,
+    indicator_enabled2,
+    signal_name,
+    backtest_params,
+    dtype_dict,
+):
+    """
+    把一批组合转换成 entry_func 需要的参数数组。
+    """
+    num = len(batch)
+    indicator_update = {}
+    for col, (kind, name, pos, _) in enumerate(dims):
+        if kind != "indicator":
+            continue
+        param_count = max(p for k, n, p, _ in dims if k == kind and n == name) + 1
+        rows = indicator_update.setdefault(name, [[None] * param_count for _ in batch])
+        for i, config in enumerate(batch):
+            rows[i][pos] = config[col]
+
+    params = get_params(
+        num=num,
+        indicator_update=indicator_update,
+        indicator_enabled=indicator_enabled,
+        indicator_enabled2=indicator_enabled2,
+        signal_name=signal_name,
+        backtest_params=backtest_params,
+        dtype_dict=dtype_dict,
+    )
+
+    for col, (kind, name, _, _) in enumerate(dims):
+        if kind == "backtest":
+            params["backtest_params"][:, backtest_params_name.index(name)] = [
+                config[col] for config in batch
+            ]
+    return params
+
+
+def get_sweep_config(dims, config):
+    """
+    把一个组合还原成 {"indicator": {指标名: 参数列表}, "backtest": {键: 值}}。
+    """
+    result = {"indicator": {}, "backtest": {}}
+    for (kind, name, pos, _), value in zip(dims, config):
+        if kind == "indicator":
+            default = indicators_spec[name]["default_params"]
+            params = result["indicator"].setdefault(name, list(default))
+            params[pos] = value
+        else:
+            result["backtest"][name] = value
+    return result
+
+
+def run_sweep(
+    mode,
+    tohlcv,
+    indicator_ranges={},
+    backtest_ranges={},
+    method="grid",
+    n_samples=None,
+    seed=None,
+    metric="final_balance",
+    ascending=False,
+    top_k=10,
+    indicator_enabled={},
+    indicator_enabled2={},
+    signal_name=default_signal_name,
+    backtest_params={},
+    memory_budget=default_memory_budget,
+    batch_size=None,
+    dtype_dict=default_dtype_dict,
+    max_trades=0,
+    executor=None,
+    **entry_kwargs,
+):
+    """
+    网格/随机参数搜索, 分批调用 entry_func, 只保留 metric 最好的 top_k 个 config。
+
+    参数:
+    - method: "grid" 展开所有组合, "random" 随机抽取 n_samples 个组合。
+    - metric: backtest_summary_name 中的列名, ascending 为 True 时越小越好。
+    - memory_budget: 每一批结果数组的内存预算, 见 get_sweep_batch_size, batch_size 不为 None 时直接使用。
+    - max_trades: 大于 0 时同时保留 top_k 个 config 最近的 max_trades 笔交易记录。
+    - executor: utils.distributed.DistributedExecutor, 不为 None 时每一批拆分到多个 worker 进程计算。
+    - entry_kwargs: 透传给 entry_func, 例如 tohlcv2, tohlcv2_multiple, min_rows。
+
+    组合是惰性展开的, 每一批都用 summary_only 模式运行, 并开启 reuse_outputs 复用结果数组,
+    无论组合有多少, 内存只和 batch_size 与 top_k 有关。
+
+    返回:
+    - {"metric", "backtest_summary", "configs", "evaluated"},
+      按 metric 从好到坏排序, configs 是 get_sweep_config 的结果。
+      max_trades > 0 时还有 "trades", 是 get_trade_records 的结构化数组, config_idx 是排名。
+    """
+    assert metric in backtest_summary_name, f"metric '{metric}' 无法识别"
+    metric_col = backtest_summary_name.index(metric)
+
+    dims = get_sweep_dims(indicator_ranges, backtest_ranges)
+    if method == "grid":
+        configs = iter_grid_configs(dims)
+    elif method == "random":
+        assert n_samples is not None, "随机搜索需要 n_samples"
+        configs = iter_random_configs(dims, n_samples, seed)
+    else:
+        raise ValueError(f"Invalid method: {method}")
+
+    if batch_size is None:
+        probe = get_params(
+            num=1,
+            indicator_enabled=indicator_enabled,
+            indicator_enabled2=indicator_enabled2,
+            signal_name=signal_name,
+            dtype_dict=dtype_dict,
+        )
+        tohlcv2 = entry_kwargs.get("tohlcv2")
+        batch_size = get_sweep_batch_size(
+            tohlcv.shape[0],
+            tohlcv.shape[0] if tohlcv2 is None else tohlcv2.shape[0],
+            probe["indicator_enabled"],
+            probe["indicator_enabled2"],
+            memory_budget,
+            dtype_dict,
+            max_trades,
+        )
+
+    # 越大越好时取负数, 统一按从小到大排序
+    sign = 1 if ascending else -1
+    top_score = np.empty(0, dtype=np.float64)
+    top_summary = np.empty((0, len(backtest_summary_name)), dtype=np.float64)
+    top_configs = []
+    top_trade_result = np.empty((0, max_trades, len(trade_result_name)), dtype=np.float64)
+    top_trade_count = np.empty(0, dtype=np.int64)
+    evaluated = 0
+
+    while True:
+        batch = list(itertools.islice(configs, batch_size))
+        if not batch:
+            break
+
+        params = _get_batch_params(
+            dims,
+            batch,
+            indicator_enabled,
+            indicator_enabled2,
+            signal_name,
+            backtest_params,
+            dtype_dict,
+        )
+        args = (
+            mode,
+            tohlcv,
+            params["indicator_params"],
+            params["indicator_enabled"],
+            params["signal_params"],
+            params["backtest_params"],
+        )
+        kwargs = dict(
+            indicator_params2=params["indicator_params2"],
+            indicator_enabled2=params["indicator_enabled2"],
+            dtype_dict=dtype_dict,
+            reuse_outputs=True,
+            max_trades=max_trades,
+            **entry_kwargs,
+        )
+        if executor is not None:
+            # worker 中总是 summary_only 模式
+            result = executor.run(*args, **kwargs)
+        else:
+            result = entry_func(*args, summary_only=True, **kwargs)
+        summary = result["backtest_summary"]
+        evaluated += len(batch)
+
+        # nan 排在最后
+        score = np.nan_to_num(sign * summary[:, metric_col], nan=np.inf)
+        score = np.concatenate([top_score, score])
+        summary = np.concatenate([top_summary, summary])
+        candidates = top_configs + batch
+
+        keep = np.argsort(score, kind="stable")[:top_k]
+        top_score = score[keep]
+        top_summary = summary[keep]
+        top_configs = [candidates[i] for i in keep]
+
+        if max_trades > 0:
+            # 结果数组会被下一批复用, concatenate 会拷贝一份
+            trade_result = np.concatenate([top_trade_result, result["trade_result"]])
+            trade_count = np.concatenate([top_trade_count, result["trade_count"]])
+            top_trade_result = trade_result[keep]
+            top_trade_count = trade_count[keep]
+
+    output = {
+        "metric": top_summary[:, metric_col],
+        "backtest_summary": top_summary,
+        "configs": [get_sweep_config(dims, config) for config in top_configs],
+        "evaluated": evaluated,
+    }
+    if max_trades > 0:
+        output["trades"] = get_trade_records(top_trade_result, top_trade_count)
+    return output
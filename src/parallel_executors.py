@@ -2,13 +2,25 @@ import numpy as np
 import numba as nb
 
 from src.core_logic import core_calc
+from src.calculate_indicators import calc_indicators_unique
+from src.indicators.indicators_wrapper import indicators_id_array
 from utils.data_types import get_params_signature
-from utils.numba_unpack import unpack_params_child, get_conf_count
+from utils.numba_unpack import (
+    unpack_params_child,
+    get_conf_count,
+    get_slot_count_from_params,
+)
 
 
 from utils.numba_params import nb_params
 from utils.data_types import get_numba_data_types
 from utils.numba_utils import nb_wrapper
+from utils.profile_utils import (
+    ProfileStage,
+    profile_counters_type,
+    profile_start,
+    profile_stop,
+)
 
 dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
@@ -16,18 +28,248 @@ nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
 
 params_signature = get_params_signature(nb_int_type, nb_float_type, nb_bool_type)
-signature = nb.void(params_signature)
+cuda_signature = nb.void(params_signature)
+indicator_count = len(indicators_id_array)
 
 
 if nb_params["mode"] in ["normal", "njit"]:
+    from src.core_logic import core_calc_tail
+    from src.calculate_indicators import calc_indicators_tail
+
+    indicators_signature = nb.void(
+        params_signature,
+        nb_int_type[:, :],  # indicator_tasks (task_count, 3)
+        nb_int_type[:],  # indicator_offsets (slot_count + 1,)
+        profile_counters_type,
+    )
 
     @nb_wrapper(
         mode=nb_params["mode"],
-        signature=signature,
+        signature=indicators_signature,
         cache_enabled=nb_params.get("cache", True),
         parallel=True,
     )
-    def parallel_calc(params):
+    def parallel_calc_indicators(
+        params, indicator_tasks, indicator_offsets, profile_counters
+    ):
+        """
+        指标阶段: 每个指标只并发计算去重后的参数行, 必须在 parallel_calc 之前运行。
+        所有指标的参数行在一个 prange 中计算, 每行 indicator_tasks 是 (timeframe, 指标id, 参数行),
+        第 slot 个工作线程处理 indicator_offsets[slot]:indicator_offsets[slot + 1] 的任务,
+        见 utils.schedule_utils.get_kernel_schedule。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+
+        # 临时数组按工作线程分配, 每个 slot 独占第 slot 份
+        slot_count = indicator_offsets.shape[0] - 1
+
+        for slot in nb.prange(slot_count):
+            for k in range(indicator_offsets[slot], indicator_offsets[slot + 1]):
+                timeframe = indicator_tasks[k, 0]
+                _id = indicator_tasks[k, 1]
+                row = indicator_tasks[k, 2]
+                # 和 parallel_calc 一样, 在 prange 内部重新组装元组, 避免 parfor 传递嵌套元组参数报错
+                _indicator_args = (
+                    indicator_params,
+                    indicator_params2,
+                    indicator_enabled,
+                    indicator_enabled2,
+                    indicator_result,
+                    indicator_result2,
+                    indicator_index,
+                    indicator_index2,
+                )
+                _params = (
+                    data_args,
+                    _indicator_args,
+                    signal_args,
+                    backtest_args,
+                    temp_args,
+                )
+                start = profile_start(profile_counters)
+                calc_indicators_unique(_params, timeframe, _id, row, slot)
+                profile_stop(
+                    profile_counters,
+                    slot,
+                    ProfileStage.indicator + timeframe * indicator_count + _id,
+                    start,
+                )
+
+    calc_signature = nb.void(
+        params_signature,
+        nb_int_type[:],  # config_order (conf_count,)
+        nb_int_type[:],  # config_offsets (slot_count + 1,)
+        profile_counters_type,
+    )
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=calc_signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_calc(params, config_order, config_offsets, profile_counters):
+        """
+        信号和回测阶段, 第 slot 个工作线程依次处理 config_order[config_offsets[slot]:config_offsets[slot + 1]]
+        中的 config, 见 utils.schedule_utils.get_kernel_schedule。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+
+        slot_count = config_offsets.shape[0] - 1
+
+        # 每个 slot 独占一份工作缓冲区
+        for slot in nb.prange(slot_count):
+            for k in range(config_offsets[slot], config_offsets[slot + 1]):
+                idx = config_order[k]
+                _indicator_args = (
+                    indicator_params,
+                    indicator_params2,
+                    indicator_enabled,
+                    indicator_enabled2,
+                    indicator_result,
+                    indicator_result2,
+                    indicator_index,
+                    indicator_index2,
+                )
+                _params = (
+                    data_args,
+                    _indicator_args,
+                    signal_args,
+                    backtest_args,
+                    temp_args,
+                )
+                _params_child = unpack_params_child(_params, idx, slot)
+
+                core_calc(_params_child, profile_counters, slot)
+
+    tail_signature = nb.void(
+        params_signature,
+        nb.types.UniTuple(nb_int_type[:], indicator_count),  # indicator_start
+        nb.types.UniTuple(nb_int_type[:], indicator_count),  # indicator_start2
+        nb_int_type,  # start
+        nb_int_type,  # start2
+    )
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=tail_signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_calc_indicators_tail(
+        params, indicator_start, indicator_start2, start, start2
+    ):
+        """
+        增量计算的指标阶段: 去重后的每行参数从 indicator_start 开始重新计算,
+        第 start (tohlcv) 或 start2 (tohlcv2) 根k线之前的结果保持不变, 见 calc_indicators_tail。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+
+        slot_count = get_slot_count_from_params(params)
+
+        for i in range(len(indicators_id_array)):
+            _id = indicators_id_array[i]
+
+            if indicator_enabled[_id]:
+                row_count = indicator_params[_id].shape[0]
+                for slot in nb.prange(min(slot_count, row_count)):
+                    for row in range(slot, row_count, slot_count):
+                        _indicator_args = (
+                            indicator_params,
+                            indicator_params2,
+                            indicator_enabled,
+                            indicator_enabled2,
+                            indicator_result,
+                            indicator_result2,
+                            indicator_index,
+                            indicator_index2,
+                        )
+                        _params = (
+                            data_args,
+                            _indicator_args,
+                            signal_args,
+                            backtest_args,
+                            temp_args,
+                        )
+                        calc_indicators_tail(
+                            _params, 0, _id, row, slot, indicator_start[_id][row], start
+                        )
+
+            if indicator_enabled2[_id]:
+                row_count = indicator_params2[_id].shape[0]
+                for slot in nb.prange(min(slot_count, row_count)):
+                    for row in range(slot, row_count, slot_count):
+                        _indicator_args = (
+                            indicator_params,
+                            indicator_params2,
+                            indicator_enabled,
+                            indicator_enabled2,
+                            indicator_result,
+                            indicator_result2,
+                            indicator_index,
+                            indicator_index2,
+                        )
+                        _params = (
+                            data_args,
+                            _indicator_args,
+                            signal_args,
+                            backtest_args,
+                            temp_args,
+                        )
+                        calc_indicators_tail(
+                            _params,
+                            1,
+                            _id,
+                            row,
+                            slot,
+                            indicator_start2[_id][row],
+                            start2,
+                        )
+
+    tail_signature = nb.void(params_signature, nb_int_type, nb_int_type)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=tail_signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+    )
+    def parallel_calc_tail(params, start, lookback):
+        """
+        增量计算的信号和回测阶段, 每个 config 只从第 start 根k线 (或者它所在仓位的开仓k线) 开始重新计算,
+        见 core_calc_tail。
+        """
         (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
 
         (
@@ -37,36 +279,85 @@ if nb_params["mode"] in ["normal", "njit"]:
             indicator_enabled2,
             indicator_result,
             indicator_result2,
+            indicator_index,
+            indicator_index2,
         ) = indicator_args
 
         conf_count = get_conf_count(params)
+        slot_count = get_slot_count_from_params(params)
+
+        for slot in nb.prange(slot_count):
+            for idx in range(slot, conf_count, slot_count):
+                _indicator_args = (
+                    indicator_params,
+                    indicator_params2,
+                    indicator_enabled,
+                    indicator_enabled2,
+                    indicator_result,
+                    indicator_result2,
+                    indicator_index,
+                    indicator_index2,
+                )
+                _params = (
+                    data_args,
+                    _indicator_args,
+                    signal_args,
+                    backtest_args,
+                    temp_args,
+                )
+                _params_child = unpack_params_child(_params, idx, slot)
 
-        for idx in nb.prange(conf_count):
-            _indicator_args = (
-                indicator_params,
-                indicator_params2,
-                indicator_enabled,
-                indicator_enabled2,
-                indicator_result,
-                indicator_result2,
-            )
-            _params = (
-                data_args,
-                _indicator_args,
-                signal_args,
-                backtest_args,
-                temp_args,
-            )
-            _params_child = unpack_params_child(_params, idx)
-
-            core_calc(_params_child)
+                core_calc_tail(_params_child, start, lookback)
 
 
 elif nb_params["mode"] == "cuda":
 
     @nb_wrapper(
         mode=nb_params["mode"],
-        signature=signature,
+        signature=cuda_signature,
+        cache_enabled=nb_params.get("cache", True),
+        parallel=True,
+        max_registers=nb_params.get("max_registers", 24),
+    )
+    def parallel_calc_indicators(params):
+        """
+        指标阶段: 每个指标只并发计算去重后的参数行, 必须在 parallel_calc 之前单独启动。
+        config 之间共享指标结果, 需要整个 grid 同步, 所以不能和 parallel_calc 合并成一个内核。
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+        (
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            indicator_result,
+            indicator_result2,
+            indicator_index,
+            indicator_index2,
+        ) = indicator_args
+
+        slot_count = get_slot_count_from_params(params)
+        start_idx = nb.cuda.grid(1)
+        stride = nb.cuda.gridsize(1)
+
+        for i in range(len(indicators_id_array)):
+            _id = indicators_id_array[i]
+
+            if indicator_enabled[_id]:
+                row_count = indicator_params[_id].shape[0]
+                for slot in range(start_idx, min(slot_count, row_count), stride):
+                    for row in range(slot, row_count, slot_count):
+                        calc_indicators_unique(params, 0, _id, row, slot)
+
+            if indicator_enabled2[_id]:
+                row_count = indicator_params2[_id].shape[0]
+                for slot in range(start_idx, min(slot_count, row_count), stride):
+                    for row in range(slot, row_count, slot_count):
+                        calc_indicators_unique(params, 1, _id, row, slot)
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=cuda_signature,
         cache_enabled=nb_params.get("cache", True),
         parallel=True,
         max_registers=nb_params.get("max_registers", 24),
@@ -81,9 +372,12 @@ elif nb_params["mode"] == "cuda":
             indicator_enabled2,
             indicator_result,
             indicator_result2,
+            indicator_index,
+            indicator_index2,
         ) = indicator_args
 
         conf_count = get_conf_count(params)
+        slot_count = get_slot_count_from_params(params)
 
         # 获取当前线程的唯一ID（起始索引）
         start_idx = nb.cuda.grid(1)
@@ -93,22 +387,31 @@ elif nb_params["mode"] == "cuda":
         # 步长循环：确保所有任务都被处理。
         # 当任务数多于线程数时，简单的处理方式会遗漏任务。
         # 这个循环让每个线程跳着处理属于自己的任务，保证所有任务都被覆盖且不重复。
-        for idx in range(start_idx, conf_count, stride):
-            _indicator_args = (
-                indicator_params,
-                indicator_params2,
-                indicator_enabled,
-                indicator_enabled2,
-                indicator_result,
-                indicator_result2,
-            )
-            _params = (
-                data_args,
-                _indicator_args,
-                signal_args,
-                backtest_args,
-                temp_args,
-            )
-            _params_child = unpack_params_child(_params, idx)
-
-            core_calc(_params_child)
+        # 每个 slot 独占一份工作缓冲区, 依次处理 idx = slot, slot + slot_count, ... 的 config
+        for slot in range(start_idx, slot_count, stride):
+            for idx in range(slot, conf_count, slot_count):
+                _indicator_args = (
+                    indicator_params,
+                    indicator_params2,
+                    indicator_enabled,
+                    indicator_enabled2,
+                    indicator_result,
+                    indicator_result2,
+                    indicator_index,
+                    indicator_index2,
+                )
+                _params = (
+                    data_args,
+                    _indicator_args,
+                    signal_args,
+                    backtest_args,
+                    temp_args,
+                )
+                _params_child = unpack_params_child(_params, idx, slot)
+
+                # cuda 模式不支持阶段计时
+                core_calc(_params_child, None, slot)
+
+    # 增量计算依赖上一次计算保留在 cpu 上的结果, 只支持 normal 和 njit 模式
+    parallel_calc_indicators_tail = None
+    parallel_calc_tail = None
@@ -163,3 +163,148 @@ elif nb_params["mode"] in ["cuda"]:
             elif trigger_mode == TriggerOperator.EDGE:
                 if i >= 1:
                     output[i] = output[i] & ~output[i - 1]
+
+
+# 按位保存的布尔序列, 每个 uint64 字保存 64 根k线, 第 i 根k线是第 i // 64 个字的第 i % 64 位
+word_bits = 64
+
+signature = nb.void(
+    nb_float_type[:],  # array1
+    nb_float_type[:],  # array2
+    nb.uint64[:],  # output_bits
+    nb_int_type,  # comparison_mode
+    nb_int_type,  # assign_mode
+    nb_int_type,  # trigger_mode
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def bool_compare_bits(
+    array1, array2, output_bits, comparison_mode, assign_mode, trigger_mode
+):
+    """
+    按位保存结果的 bool_compare, 结果相同。
+    每次比较 64 根k线得到一个字, 赋值和边缘触发都按字计算, 不需要临时数组。
+    最后一个字中超出k线数量的位保持为 0。
+    """
+    n = len(array1)
+    if len(array2) != n or len(output_bits) * word_bits < n:
+        return
+
+    zero = np.uint64(0)
+    one = np.uint64(1)
+    # 边缘触发需要上一个字赋值之后的最高位
+    carry = zero
+    for w in range(len(output_bits)):
+        begin = w * word_bits
+        word = zero
+        for j in range(min(word_bits, n - begin)):
+            i = begin + j
+            # 计算大小比较
+            if comparison_mode == ComparisonOperator.eq:
+                hit = array1[i] == array2[i]
+            elif comparison_mode == ComparisonOperator.ne:
+                hit = array1[i] != array2[i]
+            elif comparison_mode == ComparisonOperator.gt:
+                hit = array1[i] > array2[i]
+            elif comparison_mode == ComparisonOperator.ge:
+                hit = array1[i] >= array2[i]
+            elif comparison_mode == ComparisonOperator.lt:
+                hit = array1[i] < array2[i]
+            else:
+                hit = array1[i] <= array2[i]
+            if hit:
+                word |= one << np.uint64(j)
+
+        # 计算完大小比较后,按字计算异或
+        if assign_mode == AssignOperator.BITWISE_AND:
+            word = output_bits[w] & word
+        elif assign_mode == AssignOperator.BITWISE_OR:
+            word = output_bits[w] | word
+
+        # 计算完大小比较和异或后,计算边缘触发, 上一根k线的位由左移一位和上一个字的最高位组成
+        if trigger_mode == TriggerOperator.EDGE:
+            last = (word << one) | carry
+            carry = word >> np.uint64(word_bits - 1)
+            word = word & ~last
+
+        output_bits[w] = word
+
+
+signature = nb.void(
+    nb_bool_type[:],  # array
+    nb.uint64[:],  # output_bits
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def pack_bits(array, output_bits):
+    """
+    把布尔序列按位写入 output_bits, 超出 array 长度的位为 0。
+    """
+    n = len(array)
+    zero = np.uint64(0)
+    one = np.uint64(1)
+    for w in range(len(output_bits)):
+        begin = w * word_bits
+        word = zero
+        for j in range(min(word_bits, n - begin)):
+            if array[begin + j]:
+                word |= one << np.uint64(j)
+        output_bits[w] = word
+
+
+signature = nb.void(
+    nb.uint64[:],  # array_bits
+    nb_bool_type[:],  # output
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def unpack_bits(array_bits, output):
+    """
+    pack_bits 的逆运算, 把按位保存的序列展开到 output。
+    """
+    n = min(len(output), len(array_bits) * word_bits)
+    zero = np.uint64(0)
+    one = np.uint64(1)
+    for i in range(n):
+        word = array_bits[i // word_bits]
+        output[i] = (word >> np.uint64(i % word_bits)) & one != zero
+
+
+signature = nb.void(
+    nb_float_type[:],  # array2
+    nb_int_type[:],  # mapping_data
+    nb_float_type[:],  # output
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def map_timeframe(array2, mapping_data, output):
+    """
+    把 tohlcv2 上的序列按 mapping_data 对齐到 tohlcv 的长度, 每根k线 O(1) 查找。
+    mapping_data[i] 为 -1 时没有已收盘的大周期k线, 输出 nan。
+    """
+    for i in range(min(len(mapping_data), len(output))):
+        j = mapping_data[i]
+        if j < 0 or j >= len(array2):
+            output[i] = np.nan
+        else:
+            output[i] = array2[j]
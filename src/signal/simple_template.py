@@ -31,6 +31,8 @@ simple_spec = {
     "name": "simple",
     "dependency": {"sma": True, "sma2": True},
     "dependency2": {"sma": True, "sma2": True},
+    # 计算一根k线的信号最多需要最近几根k线, 流式计算按这个长度保留窗口, EDGE 触发需要上一根k线
+    "lookback": 2,
     "exit_control": {
         "pct_sl_enable": True,
         "pct_tp_enable": False,
@@ -49,6 +51,7 @@ simple_dependency2 = simple_spec["dependency2"]
 signature = nb.void(
     nb_float_type[:, :],  # tohlcv
     nb_float_type[:, :],  # tohlcv2
+    nb_int_type[:],  # mapping_data
     get_indicator_result_child(nb_int_type, nb_float_type, nb_bool_type),
     get_indicator_result_child(nb_int_type, nb_float_type, nb_bool_type),
     nb_int_type[:],  # signal_params
@@ -65,12 +68,17 @@ signature = nb.void(
 def simple_signal(
     tohlcv,
     tohlcv2,
+    mapping_data,
     indicator_result_child,
     indicator_result2_child,
     signal_params,
     signal_result_child,
     temp_args,
 ):
+    """
+    tohlcv2 的指标和 tohlcv 不等长, 第 i 根k线对应的大周期k线是 mapping_data[i],
+    -1 表示还没有已收盘的大周期k线, 可以用 map_timeframe 对齐到 tohlcv 的长度。
+    """
     (
         int_temp_array_child,
         int_temp_array2_child,
@@ -0,0 +1,217 @@
+import numpy as np
+
+from src.calculate_stream import parallel_stream
+from src.indicators.indicators_wrapper import indicators_spec
+from src.indicators.atr import atr_state_count
+from src.calculate_signals import signal_result_count
+from utils.config_utils import get_signal_lookback, default_dtype_dict
+from utils.numba_unpack import (
+    unpack_params,
+    create_outputs,
+    get_outputs_spec,
+    get_unique_indicator_params,
+    get_slot_count,
+)
+from utils.numba_utils import compile_lazy_kernels
+
+
+def create_indicator_state(indicator_params, indicator_enabled):
+    """
+    每个指标一个 (unique_count, state_count) 的 float64 状态数组, 未启用的指标不计算, 只占一个元素。
+    所有指标的状态都从 0 开始。
+    """
+    state = []
+    for spec in indicators_spec.values():
+        params = indicator_params[spec["id"]]
+        if indicator_enabled[spec["id"]] and params.shape[0] > 0:
+            state.append(np.zeros((params.shape[0], spec["state_count"](params))))
+        else:
+            state.append(np.zeros((1, 1)))
+    return tuple(state)
+
+
+class StreamEngine:
+    """
+    实盘中逐根k线更新的流式计算, 每加入一根k线每个 config 的计算量是 O(1)
+    (默认的逐窗口 sma/bbands 每行参数是 O(period), rolling=1 时是 O(1)),
+    结果和对完整数据调用 entry_func 得到的最后一行相同。
+
+    - 指标按去重后的参数行保存状态 (sma 的累加和和窗口, atr 的 rma, psar 的状态元组等)
+    - 信号模版和回测的逐k线函数在最近 W 根k线的窗口上运行, W 是信号模版的 lookback
+    - 回测的持仓状态 (入场价, 止盈止损价, psar, 余额和最大余额) 按 config 保存在窗口中
+
+    不计算 backtest_summary 和交易记录, 需要时对完整数据调用 entry_func。
+    只支持 normal 和 njit 模式。
+    """
+
+    def __init__(
+        self,
+        mode,
+        indicator_params,
+        indicator_enabled,
+        signal_params,
+        backtest_params,
+        indicator_params2=None,
+        indicator_enabled2=None,
+        dtype_dict=default_dtype_dict,
+        slot_count=None,
+    ):
+        if mode not in ["normal", "njit"]:
+            raise ValueError(f"Invalid mode: {mode}")
+
+        # lazy 模式下第一次调用时才编译或加载缓存
+        compile_lazy_kernels()
+
+        if indicator_params2 is None:
+            indicator_params2 = tuple(i.copy() for i in indicator_params)
+        if indicator_enabled2 is None:
+            indicator_enabled2 = np.zeros_like(indicator_enabled)
+
+        np_int_type = dtype_dict["np"]["int"]
+        np_float_type = dtype_dict["np"]["float"]
+        np_bool_type = dtype_dict["np"]["bool"]
+
+        self.mode = mode
+        self.dtype_dict = dtype_dict
+        self.window = get_signal_lookback(signal_params)
+        conf_count = backtest_params.shape[0]
+
+        indicator_params, indicator_index = get_unique_indicator_params(
+            indicator_params, indicator_enabled, dtype_dict
+        )
+        indicator_params2, indicator_index2 = get_unique_indicator_params(
+            indicator_params2, indicator_enabled2, dtype_dict
+        )
+        slot_count = get_slot_count(mode, conf_count, slot_count)
+
+        # 所有逐k线的数组都只保留最近 window 根k线
+        tohlcv = np.full((self.window, 6), np.nan, dtype=np_float_type)
+        tohlcv2 = np.full((self.window, 6), np.nan, dtype=np_float_type)
+        mapping_data = np.full(self.window, -1, dtype=np_int_type)
+
+        outputs_spec = get_outputs_spec(
+            mode,
+            tohlcv,
+            tohlcv2,
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            conf_count,
+            dtype_dict,
+            temp_int_num=1,
+            temp_float_num=4,
+            temp_bool_num=4,
+            min_rows=self.window,
+            slot_count=slot_count,
+        )
+        outputs = create_outputs(mode, outputs_spec)
+        (
+            tohlcv_smooth,
+            tohlcv_smooth2,
+            indicator_result,
+            indicator_result2,
+            signal_result,
+            signal_bits,
+            backtest_result,
+            backtest_summary,
+            trade_result,
+            trade_count,
+            temp_args,
+        ) = outputs
+        for i in indicator_result + indicator_result2:
+            i[:] = np.nan
+        signal_result[:] = False
+        backtest_result[:] = np.nan
+        backtest_summary[:] = np.nan
+        for i in temp_args:
+            i[:] = 0
+
+        inputs = (
+            tohlcv,
+            tohlcv2,
+            mapping_data,
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            signal_params,
+            backtest_params,
+            indicator_index,
+            indicator_index2,
+        )
+        self.params = unpack_params(outputs, inputs)
+
+        self.stream_args = (
+            create_indicator_state(indicator_params, indicator_enabled),
+            create_indicator_state(indicator_params2, indicator_enabled2),
+            np.zeros((conf_count, self.window, 3), dtype=np_float_type),
+            np.zeros((conf_count, self.window), dtype=np_bool_type),
+            np.zeros((conf_count, atr_state_count)),
+            np.zeros(conf_count, dtype=np_bool_type),
+            np.zeros(
+                (slot_count, self.window, signal_result_count), dtype=np_bool_type
+            ),
+            np.zeros(2, dtype=np_int_type),
+        )
+        self._empty_bars = np.empty((0, 6), dtype=np_float_type)
+
+    @property
+    def bar_count(self):
+        """
+        已经加入的 tohlcv 的k线数量。
+        """
+        return int(self.stream_args[-1][0])
+
+    def update_many(self, tohlcv, tohlcv2=None, mapping_data=None):
+        """
+        依次加入多根k线, 用于用历史数据预热状态, 不需要在 python 中逐根循环。
+        tohlcv2 是这段时间内新收盘的大周期k线, mapping_data 和 entry_func 的含义相同,
+        下标相对于这次传入的 tohlcv2, 见 config_utils.get_mapping_data。
+        返回最新一根k线的结果, 见 get_latest。
+        """
+        np_float_type = self.dtype_dict["np"]["float"]
+        np_int_type = self.dtype_dict["np"]["int"]
+
+        tohlcv = np.ascontiguousarray(tohlcv, dtype=np_float_type).reshape(-1, 6)
+        if tohlcv2 is None:
+            tohlcv2 = self._empty_bars
+            mapping_data = np.full(tohlcv.shape[0], -1, dtype=np_int_type)
+        else:
+            tohlcv2 = np.ascontiguousarray(tohlcv2, dtype=np_float_type)
+            tohlcv2 = tohlcv2.reshape(-1, 6)
+            if mapping_data is None:
+                raise ValueError("传入 tohlcv2 时必须同时传入 mapping_data")
+            mapping_data = np.ascontiguousarray(mapping_data, dtype=np_int_type)
+
+        parallel_stream(self.params, self.stream_args, tohlcv, tohlcv2, mapping_data)
+        return self.get_latest()
+
+    def update(self, bar, bar2=None):
+        """
+        加入一根新的k线 bar (time, open, high, low, close, volume)。
+        bar2 不为 None 时, 是在 bar 收盘时 (或之前) 新收盘的大周期k线, 先于 bar 加入。
+        """
+        if bar2 is None:
+            return self.update_many(bar)
+        return self.update_many(bar, bar2, np.zeros(1))
+
+    def get_latest(self):
+        """
+        最新一根k线的结果, 数组是拷贝:
+        - indicator_result: 每个指标 (conf_count, result_count), 按 indicator_index 展开到每个 config
+        - signal_result: (conf_count, signal_result_count), 包含回测阶段触发的离场信号
+        - backtest_result: (conf_count, backtest_result_count)
+        """
+        (data_args, indicator_args, signal_args, backtest_args, temp_args) = self.params
+        indicator_result = indicator_args[4]
+        indicator_index = indicator_args[6]
+        return {
+            "indicator_result": tuple(
+                r[indicator_index[:, spec["id"]], -1]
+                for r, spec in zip(indicator_result, indicators_spec.values())
+            ),
+            "signal_result": signal_args[1][:, -1].copy(),
+            "backtest_result": backtest_args[1][:, -1].copy(),
+        }
+
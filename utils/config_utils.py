@@ -1,4 +1,9 @@
-from utils.data_loading import load_tohlcv_from_csv, convert_tohlcv_numpy
+from utils.data_loading import (
+    load_tohlcv_from_csv,
+    convert_tohlcv_numpy,
+    load_tohlcv_numpy,
+    convert_tohlcv_dataframe,
+)
 from utils.data_types import get_numba_data_types
 import numpy as np
 
@@ -79,9 +84,6 @@ def get_params(
         indicator_enabled=indicator_enabled2, dtype_dict=dtype_dict
     )
 
-    # todo 待完善
-    mapping_data = get_mapping_data([], [], dtype_dict=dtype_dict)
-
     return {
         "indicator_params": indicator_params,
         "indicator_name": indicator_name,
@@ -93,7 +95,6 @@ def get_params(
         "indicator_name2": indicator_name2,
         "indicator_col_name2": indicator_col_name2,
         "indicator_enabled2": indicator_enabled2,
-        "mapping_data": mapping_data,
     }
 
 
@@ -106,7 +107,8 @@ def get_indicator_params(
     参数:
         num (int): 每个指标默认参数列表的长度。
         update (dict): 用于更新默认参数的字典。
-                       键必须是已知的指标名称，值必须与默认参数的结构匹配。
+                       键必须是已知的指标名称，值必须与默认参数的结构匹配,
+                       每组参数可以省略尾部的可选参数,省略部分使用默认值。
 
     返回:
         dict: 包含所有指标参数的字典。
@@ -140,14 +142,17 @@ def get_indicator_params(
             f"指标 '{key}' 的参数列表数量不匹配: 预期 {len(default_params[key])}, 实际 {len(value_list)}"
         )
 
-        # 验证每个参数项的长度
+        # 验证每个参数项的长度, 允许省略尾部的可选参数(如 rolling), 用默认值补齐
         for i, item in enumerate(value_list):
-            assert len(default_params[key][i]) == len(item), (
+            assert len(item) <= len(default_params[key][i]), (
                 f"指标 '{key}' 的第 {i + 1} 组参数长度不匹配: 预期 {len(default_params[key][i])}, 实际 {len(item)}"
             )
 
         # 更新参数
-        default_params[key] = value_list
+        default_params[key] = [
+            [*item, *default_params[key][i][len(item) :]]
+            for i, item in enumerate(value_list)
+        ]
 
     return tuple(
         ensure_c_contiguous(np.array(v, dtype=dtype_dict["np"]["float"]))
@@ -193,6 +198,17 @@ def get_signal_params(signal_name="", dtype_dict=default_dtype_dict):
         raise RuntimeError(f"检测不到合法的signal name: {signal_name}")
 
 
+def get_signal_lookback(signal_params):
+    """
+    信号模版计算一根k线需要的k线数量, 至少是 2 (回测用上一根k线的信号交易)。
+    流式计算按这个长度保留窗口, 增量计算按这个长度往前重新计算信号。
+    """
+    for spec in default_signal_template.values():
+        if spec["id"] == signal_params[0]:
+            return max(2, spec.get("lookback", 2))
+    raise RuntimeError(f"检测不到合法的signal id: {signal_params[0]}")
+
+
 def get_backtest_params(num=1, params={}, dtype_dict=default_dtype_dict):
     check_keys_exist(default_backtest_params, params)
     res = []
@@ -207,15 +223,58 @@ def get_backtest_params(num=1, params={}, dtype_dict=default_dtype_dict):
     return ensure_c_contiguous(params)
 
 
-def get_mapping_data(data1, data2, dtype_dict=default_dtype_dict):
-    # todo 具体逻辑待完善
-    params = np.array([1, 2, 3], dtype=dtype_dict["np"]["int"])
-    return ensure_c_contiguous(params)
+def get_bar_duration(time, interval_ms=None):
+    """
+    k线周期, 取相邻时间差的最小正值, 数据中的缺口不影响结果。
+    interval_ms 不为 None 时直接使用。少于 2 个不同的时间戳时无法推断周期, 抛出 ValueError,
+    不能当作 0 处理, 否则k线的收盘时间等于开盘时间, 开盘时就对小周期可见 (未来函数)。
+    """
+    if interval_ms is not None:
+        return interval_ms
+    diff = np.diff(time)
+    diff = diff[diff > 0]
+    if len(diff) == 0:
+        raise ValueError("少于 2 个不同的时间戳, 无法推断k线周期, 需要传入 interval_ms")
+    return diff.min()
+
 
+def get_mapping_data(
+    data1, data2, dtype_dict=default_dtype_dict, interval_ms=None, interval_ms2=None
+):
+    """
+    把 data1 的每根k线映射到 data2 中最后一根已收盘的k线, 没有未来函数。
+    time 列是k线的开盘时间, 收盘时间 = 开盘时间 + 周期。
+    data2 的k线收盘时间 <= data1 的k线收盘时间, 才算对 data1 的这根k线可见。
+    没有可见的k线时为 -1。
+    interval_ms, interval_ms2 是 data1, data2 的周期 (毫秒), 为 None 时用 get_bar_duration 推断。
+
+    返回:
+    - 长度等于 data1 行数的 int 数组, 信号中用 mapping_data[i] 索引 data2 的指标结果。
+    """
+    time1 = data1[:, 0]
+    time2 = data2[:, 0]
+    close_time1 = time1 + get_bar_duration(time1, interval_ms)
+    close_time2 = time2 + get_bar_duration(time2, interval_ms2)
 
-def perpare_data(path, data_size=None, dtype_dict=default_dtype_dict):
-    df_data = load_tohlcv_from_csv(path, data_size, dtype_dict)
-    np_data = convert_tohlcv_numpy(df_data, dtype_dict)
+    mapping_data = np.searchsorted(close_time2, close_time1, side="right") - 1
+    return ensure_c_contiguous(mapping_data.astype(dtype_dict["np"]["int"]))
+
+
+def perpare_data(path, data_size=None, dtype_dict=default_dtype_dict, use_cache=True):
+    """
+    use_cache 为 True 时通过二进制缓存加载, 避免每次运行都解析完整的 csv, 见 load_tohlcv_numpy。
+    两种方式的 df_data 的 index 相同, 但是使用缓存时只有 tohlcv 和 date 列, 见 convert_tohlcv_dataframe。
+    """
+    if use_cache:
+        np_data = load_tohlcv_numpy(path, None, dtype_dict)
+        start = 0
+        if data_size and len(np_data) > data_size:
+            start = len(np_data) - data_size
+            np_data = np_data[start:]
+        df_data = convert_tohlcv_dataframe(np_data, start)
+    else:
+        df_data = load_tohlcv_from_csv(path, data_size, dtype_dict)
+        np_data = convert_tohlcv_numpy(df_data, dtype_dict)
 
     return df_data, ensure_c_contiguous(np_data)
 
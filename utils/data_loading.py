@@ -1,3 +1,7 @@
+import os
+import json
+from pathlib import Path
+
 import numpy as np
 import numba as nb
 import pandas as pd
@@ -45,6 +49,165 @@ def convert_tohlcv_numpy(df, dtype_dict=default_dtype_dict):
     return df[tohlcv_name].to_numpy().astype(dtype_dict["np"]["float"])
 
 
+tohlcv_cache_version = 1
+
+
+def get_tohlcv_cache_path(file_path, dtype_dict=default_dtype_dict, cache_dir=None):
+    """
+    返回 csv 对应的二进制缓存路径 (数据文件, 元数据文件)。
+    默认放在 csv 同目录下的 .tohlcv_cache 文件夹, float32 和 float64 各自一份缓存。
+    """
+    file_path = Path(file_path)
+    cache_dir = (
+        Path(cache_dir) if cache_dir is not None else file_path.parent / ".tohlcv_cache"
+    )
+    dtype_name = np.dtype(dtype_dict["np"]["float"]).name
+    stem = f"{file_path.name}.{dtype_name}"
+    return cache_dir / f"{stem}.npy", cache_dir / f"{stem}.json"
+
+
+def _get_source_meta(file_path, dtype_dict):
+    stat = os.stat(file_path)
+    return {
+        "version": tohlcv_cache_version,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "dtype": np.dtype(dtype_dict["np"]["float"]).name,
+        "columns": tohlcv_name,
+    }
+
+
+def write_tohlcv_cache(file_path, dtype_dict=default_dtype_dict, cache_dir=None):
+    """
+    解析完整的 csv, 写入二进制缓存, 返回解析出的 tohlcv 数组。
+    先写临时文件再替换, 中途中断不会留下损坏的缓存。
+    """
+    data_path, meta_path = get_tohlcv_cache_path(file_path, dtype_dict, cache_dir)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    meta = _get_source_meta(file_path, dtype_dict)
+    df = load_tohlcv_from_csv(file_path, data_size=None, dtype_dict=dtype_dict)
+    np_data = np.ascontiguousarray(convert_tohlcv_numpy(df, dtype_dict))
+    meta["rows"] = np_data.shape[0]
+
+    tmp_data_path = data_path.with_name(data_path.name + ".tmp")
+    tmp_meta_path = meta_path.with_name(meta_path.name + ".tmp")
+    with open(tmp_data_path, "wb") as file:
+        np.save(file, np_data)
+    with open(tmp_meta_path, "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+    # 元数据最后替换, 数据文件替换之前元数据不会指向新数据
+    os.replace(tmp_data_path, data_path)
+    os.replace(tmp_meta_path, meta_path)
+
+    return np_data
+
+
+def read_tohlcv_cache(file_path, dtype_dict=default_dtype_dict, cache_dir=None):
+    """
+    以内存映射方式读取二进制缓存, 缓存不存在或者 csv 的 mtime/size 变化时返回 None。
+    """
+    data_path, meta_path = get_tohlcv_cache_path(file_path, dtype_dict, cache_dir)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    source_meta = _get_source_meta(file_path, dtype_dict)
+    if any(meta.get(k) != v for k, v in source_meta.items()):
+        return None
+
+    try:
+        # mmap_mode="c" 是写时复制, 数组可写但不会改动缓存文件, numba 的签名要求可写数组
+        np_data = np.load(data_path, mmap_mode="c")
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if np_data.shape != (meta.get("rows"), len(tohlcv_name)):
+        return None
+    return np_data
+
+
+def load_tohlcv_numpy(
+    file_path: str,
+    data_size: int = None,
+    dtype_dict=default_dtype_dict,
+    use_cache: bool = True,
+    cache_dir=None,
+) -> np.ndarray:
+    """
+    加载 tohlcv 的 numpy 数组, 和 convert_tohlcv_numpy(load_tohlcv_from_csv(...)) 结果相同。
+
+    第一次加载时解析 csv 并写入二进制缓存, 之后内存映射缓存文件,
+    取最后 data_size 行是零拷贝的切片, 只有实际访问到的页才会从磁盘读入。
+    csv 的 mtime 或 size 变化时缓存自动失效并重建。
+
+    Args:
+        file_path (str): CSV 文件的路径。
+        data_size (int): 需要加载的数据大小, 取最后 data_size 行。
+        use_cache (bool): 为 False 时直接解析 csv, 不读写缓存。
+        cache_dir: 缓存目录, 默认是 csv 同目录下的 .tohlcv_cache。
+
+    Returns:
+        np.ndarray: 形状 (rows, 6) 的 C 连续数组。
+    """
+    if not use_cache:
+        df = load_tohlcv_from_csv(file_path, data_size, dtype_dict)
+        return np.ascontiguousarray(convert_tohlcv_numpy(df, dtype_dict))
+
+    np_data = read_tohlcv_cache(file_path, dtype_dict, cache_dir)
+    if np_data is None:
+        np_data = write_tohlcv_cache(file_path, dtype_dict, cache_dir)
+
+    if data_size and len(np_data) > data_size:
+        np_data = np_data[-data_size:]
+
+    # 转成普通 ndarray 视图, 不拷贝数据
+    return np.asarray(np_data)
+
+
+def convert_tohlcv_dataframe(np_data, start=0):
+    """
+    convert_tohlcv_numpy 的逆操作, 从 tohlcv 数组构造 load_tohlcv_from_csv 的 tohlcv 和 date 列。
+    index 从 start 开始, np_data 是 csv 的最后几行时传入第一行在 csv 中的行号,
+    index 就和 load_tohlcv_from_csv 相同, 按 index 对齐不会错位。
+    csv 中 tohlcv 以外的其他列不会保留, 二进制缓存只保存 tohlcv。
+    """
+    df = pd.DataFrame(
+        np_data,
+        columns=tohlcv_name,
+        index=pd.RangeIndex(start, start + len(np_data)),
+    )
+    df["date"] = pd.to_datetime(df["time"], unit="ms")
+    return df
+
+
+def get_synthetic_tohlcv(rows, dtype_dict=default_dtype_dict, seed=0, interval_ms=15 * 60 * 1000):
+    """
+    随机游走生成 rows 行 tohlcv, 不依赖 database 下的 csv 文件, 用于基准测试。
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    # 避免价格变成负数
+    close = close - min(0.0, close.min()) + 2
+    open_ = np.r_[close[0], close[:-1]]
+    return np.ascontiguousarray(
+        np.stack(
+            [
+                1677600000000 + np.arange(rows) * float(interval_ms),
+                open_,
+                np.maximum(open_, close) + rng.random(rows),
+                np.minimum(open_, close) - rng.random(rows),
+                close,
+                rng.random(rows) * 100,
+            ],
+            axis=1,
+        ),
+        dtype=dtype_dict["np"]["float"],
+    )
+
+
 def transform_data_recursive(data, mode="to_device"):
     """
     递归地根据模式转换嵌套的元组、列表和数组。
@@ -114,18 +114,24 @@ def get_params_signature(nb_int_type, nb_float_type, nb_bool_type):
                     get_indicator_result(nb_int_type, nb_float_type, nb_bool_type),
                     # indicator_result2
                     get_indicator_result(nb_int_type, nb_float_type, nb_bool_type),
+                    nb_int_type[:, :],  # indicator_index
+                    nb_int_type[:, :],  # indicator_index2
                 )
             ),
             nb.types.Tuple(
                 (  # signal_args
                     nb_int_type[:],  # signal_params
                     nb_bool_type[:, :, :],  # signal_result
+                    nb.uint64[:, :, :],  # signal_bits
                 )
             ),
             nb.types.Tuple(
                 (  # backtest_args
                     nb_float_type[:, :],  # backtest_params
                     nb_float_type[:, :, :],  # backtest_result
+                    nb_float_type[:, :],  # backtest_summary
+                    nb_float_type[:, :, :],  # trade_result
+                    nb_int_type[:],  # trade_count
                 )
             ),
             nb.types.Tuple(
@@ -175,12 +181,16 @@ def get_params_child_signature(nb_int_type, nb_float_type, nb_bool_type):
                 (  # signal_args
                     nb_int_type[:],  # signal_params
                     nb_bool_type[:, :],  # signal_result_child
+                    nb.uint64[:, :],  # signal_bits_child
                 )
             ),
             nb.types.Tuple(
                 (  # backtest_args
                     nb_float_type[:],  # backtest_params_child
                     nb_float_type[:, :],  # backtest_result_child
+                    nb_float_type[:],  # backtest_summary_child
+                    nb_float_type[:, :],  # trade_result_child
+                    nb_int_type[:],  # trade_count_child
                 )
             ),
             nb.types.Tuple(
@@ -206,11 +216,21 @@ def loop_indicators_signature(nb_int_type, nb_float_type, nb_bool_type):
     )
 
 
+def stream_indicators_signature(nb_int_type, nb_float_type, nb_bool_type):
+    return (
+        nb_float_type[:],  # bar, tohlcv 中新的一行
+        nb_float_type[:],  # indicator_params_row
+        nb.float64[:],  # indicator_state_row
+        nb_float_type[:],  # indicator_result_row
+    )
+
+
 def loop_signals_signature(nb_int_type, nb_float_type, nb_bool_type):
     return (
         nb_int_type,  # signal_id
         nb_float_type[:, :],  # tohlcv
         nb_float_type[:, :],  # tohlcv2
+        nb_int_type[:],  # mapping_data
         get_indicator_result_child(
             nb_int_type, nb_float_type, nb_bool_type
         ),  # indicator_result_child
@@ -0,0 +1,372 @@
+import os
+import glob
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# worker 进程中导入 src 之前要先设置环境变量和 cpu 亲和性, 这个模块不能在顶层导入 src
+
+# worker 进程中已经打开的共享数组, 同一个数组在多个任务之间只打开一次
+_attached_arrays = {}
+
+# entry_func 的 summary_only 输出中按 config 合并的数组, max_trades 为 0 时没有交易记录
+merge_name = ["backtest_summary", "trade_result", "trade_count"]
+
+
+def parse_cpulist(cpulist):
+    """
+    解析 /sys/devices/system/node/node*/cpulist 的格式, 例如 "0-3,8-11" -> [0, 1, 2, 3, 8, 9, 10, 11]。
+    """
+    cpus = []
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, stop = part.split("-")
+            cpus.extend(range(int(start), int(stop) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def get_numa_cpus():
+    """
+    每个 NUMA 节点上当前进程可以使用的 cpu 列表。
+    读取不到 NUMA 拓扑 (非 linux, 单节点虚拟机等) 时把所有可用 cpu 当作一个节点。
+    """
+    if hasattr(os, "sched_getaffinity"):
+        available = os.sched_getaffinity(0)
+    else:
+        available = set(range(os.cpu_count() or 1))
+
+    nodes = []
+    paths = glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")
+    for path in sorted(paths, key=lambda p: int(p.split("node")[-1].split("/")[0])):
+        with open(path, "r", encoding="utf-8") as file:
+            cpus = sorted(set(parse_cpulist(file.read())) & available)
+        if cpus:
+            nodes.append(cpus)
+    return nodes if nodes else [sorted(available)]
+
+
+def init_worker(cpus, environ=None):
+    """
+    worker 进程的初始化, 在导入 src 之前运行:
+    设置环境变量 (numba 配置等), numba 的线程数等于绑定的 cpu 数, 并把进程绑定到这些 cpu 上。
+    linux 默认按首次访问分配内存, 绑定之后 worker 分配的结果数组和临时数组都在本地 NUMA 节点上。
+    """
+    if environ:
+        os.environ.update(environ)
+    os.environ["NUMBA_NUM_THREADS"] = str(len(cpus))
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+def share_array_shm(array):
+    """
+    把数组拷贝到共享内存, 返回 (handle, shm), handle 可以 pickle, 用 attach_array 在 worker 中打开。
+    调用方负责在所有任务结束后 close 和 unlink shm。
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    handle = {
+        "kind": "shm",
+        "name": shm.name,
+        "shape": array.shape,
+        "dtype": array.dtype.str,
+    }
+    return handle, shm
+
+
+def share_array_npy(array, path):
+    """
+    把数组保存成 .npy 文件, worker 以内存映射方式打开, 适用于共享文件系统上的多台机器。
+    """
+    np.save(path, np.ascontiguousarray(array))
+    return {"kind": "npy", "path": str(path)}
+
+
+def attach_array(handle):
+    """
+    在 worker 中打开 share_array_shm 或 share_array_npy 共享的数组, 不拷贝数据。
+    worker 只读取这些数组, 返回的数组是可写的只是因为 numba 的签名要求可写数组。
+    """
+    if handle is None:
+        return None
+    key = handle.get("name", handle.get("path"))
+    if key in _attached_arrays:
+        return _attached_arrays[key][0]
+
+    if handle["kind"] == "shm":
+        # 由创建共享内存的进程负责 unlink, worker 不注册到 resource_tracker
+        shm = shared_memory.SharedMemory(name=handle["name"], track=False)
+        array = np.ndarray(handle["shape"], dtype=handle["dtype"], buffer=shm.buf)
+        _attached_arrays[key] = (array, shm)
+    elif handle["kind"] == "npy":
+        # mmap_mode="c" 是写时复制, 不会改动文件
+        array = np.asarray(np.load(handle["path"], mmap_mode="c"))
+        _attached_arrays[key] = (array, None)
+    else:
+        raise ValueError(f"Invalid handle kind: {handle['kind']}")
+    return array
+
+
+def _release_stale_arrays(handles):
+    # 上一次 run 共享的数组已经被创建方释放, worker 中也关闭, 避免长期运行的 worker 占用内存
+    keys = {h.get("name", h.get("path")) for h in handles if h is not None}
+    for key in [k for k in _attached_arrays if k not in keys]:
+        array, shm = _attached_arrays.pop(key)
+        del array
+        if shm is not None:
+            shm.close()
+
+
+def run_configs(mode, shared, inputs, entry_kwargs):
+    """
+    worker 任务: 用共享的k线数据和一段 config 的参数调用 entry_func (summary_only),
+    返回 merge_name 中的数组的拷贝。
+    """
+    from src.interface import entry_func
+    from utils.config_utils import get_dtype_dict
+    from utils.numba_params import nb_params
+
+    (
+        indicator_params,
+        indicator_enabled,
+        signal_params,
+        backtest_params,
+        indicator_params2,
+        indicator_enabled2,
+    ) = inputs
+    _release_stale_arrays(shared.values())
+    result = entry_func(
+        mode,
+        attach_array(shared["tohlcv"]),
+        indicator_params,
+        indicator_enabled,
+        signal_params,
+        backtest_params,
+        tohlcv2=attach_array(shared["tohlcv2"]),
+        mapping_data=attach_array(shared["mapping_data"]),
+        indicator_params2=indicator_params2,
+        indicator_enabled2=indicator_enabled2,
+        dtype_dict=get_dtype_dict(nb_params.get("enable64", True)),
+        summary_only=True,
+        **entry_kwargs,
+    )
+    # 结果数组是 outputs_global 缓存的视图, 下一个任务会覆盖
+    return {k: np.array(result[k]) for k in merge_name if k in result}
+
+
+class LocalTransport:
+    """
+    默认的本地传输: 每个 NUMA 节点一个 worker 进程 (spawn), 绑定到节点上的 cpu,
+    k线数据通过共享内存 (share="shm") 或者内存映射的 .npy 文件 (share="npy") 共享。
+
+    其他传输 (例如多台机器) 实现相同的接口即可替换:
+    - worker_count: worker 的数量
+    - start(): 启动 worker
+    - submit(worker, func, *args): 在第 worker 个 worker 上运行 func(*args), 返回 concurrent.futures.Future
+    - share_array(array): 返回可以 pickle 的 handle, worker 中用 attach_array 打开
+    - release(): 释放 share_array 创建的资源
+    - shutdown(): 关闭 worker
+    """
+
+    def __init__(self, cpu_sets=None, environ=None, share="shm"):
+        """
+        cpu_sets: 每个 worker 绑定的 cpu 列表, 默认每个 NUMA 节点一个 worker, 见 get_numa_cpus。
+        environ: 额外传给 worker 的环境变量, numba 配置的环境变量会从当前进程继承。
+        """
+        if share not in ["shm", "npy"]:
+            raise ValueError(f"Invalid share: {share}")
+        self.cpu_sets = (
+            get_numa_cpus() if cpu_sets is None else [sorted(i) for i in cpu_sets]
+        )
+        self.environ = environ
+        self.share = share
+        self._executors = None
+        self._shared = []
+        self._share_count = 0
+        self._tmp_dir = None
+
+    @property
+    def worker_count(self):
+        return len(self.cpu_sets)
+
+    def start(self):
+        if self._executors is not None:
+            return
+        context = multiprocessing.get_context("spawn")
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(cpus, self.environ),
+            )
+            for cpus in self.cpu_sets
+        ]
+
+    def submit(self, worker, func, *args):
+        self.start()
+        return self._executors[worker].submit(func, *args)
+
+    def share_array(self, array):
+        if self.share == "npy":
+            if self._tmp_dir is None:
+                self._tmp_dir = tempfile.TemporaryDirectory(prefix="numba_quant_")
+            # 文件名不重复, worker 按路径缓存打开的数组
+            path = os.path.join(self._tmp_dir.name, f"{self._share_count}.npy")
+            self._share_count += 1
+            self._shared.append(path)
+            return share_array_npy(array, path)
+        handle, shm = share_array_shm(array)
+        self._shared.append(shm)
+        return handle
+
+    def release(self):
+        for item in self._shared:
+            if isinstance(item, str):
+                # windows 上 worker 还打开着内存映射时不能删除, 留给 shutdown 清理临时目录
+                try:
+                    os.remove(item)
+                except OSError:
+                    pass
+            else:
+                item.close()
+                item.unlink()
+        self._shared = []
+
+    def shutdown(self):
+        if self._executors is not None:
+            for executor in self._executors:
+                executor.shutdown()
+            self._executors = None
+        self.release()
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+
+
+class DistributedExecutor:
+    """
+    把一次参数扫描的 config 范围拆分到多个 worker 进程, 每个 worker 用 summary_only 模式调用 entry_func,
+    合并每个 worker 的 backtest_summary 和交易记录, 结果和在一个进程中调用 entry_func 相同。
+    一个进程中 nb.prange 的扩展性受限于共享的结果数组的内存带宽, 多个 NUMA 节点各自运行一个进程,
+    工作缓冲区都在本地节点上。worker 在多次 run 之间保持运行, 复用已经编译或加载的内核。
+    只支持 normal 和 njit 模式。
+    """
+
+    def __init__(self, transport=None):
+        self.transport = LocalTransport() if transport is None else transport
+
+    def __enter__(self):
+        self.transport.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.transport.shutdown()
+
+    def run(
+        self,
+        mode,
+        tohlcv,
+        indicator_params,
+        indicator_enabled,
+        signal_params,
+        backtest_params,
+        tohlcv2=None,
+        mapping_data=None,
+        indicator_params2=None,
+        indicator_enabled2=None,
+        tohlcv2_multiple=None,
+        chunk_count=None,
+        dtype_dict=None,
+        **entry_kwargs,
+    ):
+        """
+        参数和 entry_func 相同, 返回 {"backtest_summary", "trade_result", "trade_count", "bounds"} (没有交易记录时和 entry_func 一样不包含),
+        bounds[i]:bounds[i + 1] 是第 i 块的 config 范围。
+        chunk_count 是拆分的块数, 默认等于 worker 数量, 块按顺序轮流分配给 worker。
+        tohlcv2 和 mapping_data 在当前进程中生成一次, 和 tohlcv 一起共享给所有 worker。
+        """
+        from utils.config_utils import get_mapping_data, default_dtype_dict
+        from utils.resample_data import resample_tohlcv
+
+        if mode not in ["normal", "njit"]:
+            raise ValueError(f"DistributedExecutor 不支持 {mode} 模式")
+        if dtype_dict is None:
+            dtype_dict = default_dtype_dict
+
+        if tohlcv2 is None and tohlcv2_multiple is not None:
+            tohlcv2, _mapping_data = resample_tohlcv(
+                tohlcv, tohlcv2_multiple, dtype_dict
+            )
+            if mapping_data is None:
+                mapping_data = _mapping_data
+        tohlcv2_given = tohlcv2 is not None
+        if tohlcv2 is None:
+            tohlcv2 = tohlcv.copy()
+        if indicator_params2 is None:
+            indicator_params2 = tuple(i.copy() for i in indicator_params)
+        if indicator_enabled2 is None:
+            indicator_enabled2 = np.zeros_like(indicator_enabled)
+        if mapping_data is None:
+            if tohlcv2_given and indicator_enabled2.any():
+                mapping_data = get_mapping_data(tohlcv, tohlcv2, dtype_dict)
+            else:
+                # 规则和 entry_func 相同
+                mapping_data = np.zeros(tohlcv.shape[0], dtype=dtype_dict["np"]["int"])
+
+        conf_count = backtest_params.shape[0]
+        worker_count = self.transport.worker_count
+        if chunk_count is None:
+            chunk_count = worker_count
+        chunk_count = max(1, min(chunk_count, conf_count))
+        bounds = np.linspace(0, conf_count, chunk_count + 1).astype(np.int64)
+
+        try:
+            shared = {
+                "tohlcv": self.transport.share_array(tohlcv),
+                "tohlcv2": self.transport.share_array(tohlcv2),
+                "mapping_data": self.transport.share_array(mapping_data),
+            }
+            futures = []
+            for i in range(chunk_count):
+                start, stop = bounds[i], bounds[i + 1]
+                inputs = (
+                    tuple(p[start:stop] for p in indicator_params),
+                    indicator_enabled,
+                    signal_params,
+                    backtest_params[start:stop],
+                    tuple(p[start:stop] for p in indicator_params2),
+                    indicator_enabled2,
+                )
+                futures.append(
+                    self.transport.submit(
+                        i % worker_count,
+                        run_configs,
+                        mode,
+                        shared,
+                        inputs,
+                        entry_kwargs,
+                    )
+                )
+            results = [f.result() for f in futures]
+        finally:
+            self.transport.release()
+
+        output = {
+            k: np.concatenate([r[k] for r in results])
+            for k in merge_name
+            if k in results[0]
+        }
+        output["bounds"] = bounds
+        return output
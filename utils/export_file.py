@@ -1,7 +1,11 @@
+import os
+import json
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from utils.data_loading import tohlcv_name
+
 
 def export_csv(
     name,
@@ -15,9 +19,17 @@ def export_csv(
     indicator_enabled2,
     index=0,
     write_csv=False,
+    indicator_index=None,
+    indicator_index2=None,
+    output_dir="output",
 ):
-    root_path = Path(f"output/{name}")
-    root_path.mkdir(exist_ok=True)
+    """
+    indicator_result 的第一维是去重后的参数行, 需要用 indicator_index 把 config index 映射过去,
+    不传 indicator_index 时直接用 index 取行。
+    csv 写入 output_dir/name 目录。
+    """
+    root_path = Path(output_dir) / name
+    root_path.mkdir(parents=True, exist_ok=True)
 
     (columns, np_data) = np_data_obj
     tohlcv_df = pd.DataFrame(np_data, columns=columns)
@@ -32,7 +44,11 @@ def export_csv(
         tohlcv2_df.to_csv(_name, index=False)
 
     (columns, indicator_result) = indicator_result_obj
-    _res = [indicator_result[k][index] for k, v in enumerate(indicator_enabled) if v]
+    _res = [
+        indicator_result[k][index if indicator_index is None else indicator_index[index, k]]
+        for k, v in enumerate(indicator_enabled)
+        if v
+    ]
     _res = np.hstack(_res)
     _col = [i for i in columns for i in i]
     indicator_df = pd.DataFrame(_res, columns=_col)
@@ -41,7 +57,13 @@ def export_csv(
         indicator_df.to_csv(_name, index=False)
 
     (columns, indicator_result2) = indicator_result2_obj
-    _res = [indicator_result2[k][index] for k, v in enumerate(indicator_enabled2) if v]
+    _res = [
+        indicator_result2[k][
+            index if indicator_index2 is None else indicator_index2[index, k]
+        ]
+        for k, v in enumerate(indicator_enabled2)
+        if v
+    ]
     _res = np.hstack(_res)
     _col = [i for i in columns for i in i]
     indicator2_df = pd.DataFrame(_res, columns=_col)
@@ -69,3 +91,221 @@ def export_csv(
         "signal_df": signal_df,
         "backtest_df": backtest_df,
     }
+
+
+columnar_version = 1
+columnar_manifest_name = "manifest.json"
+
+
+def _get_columnar_tables(result, rows=None):
+    """
+    按表列出要写入的列, 每一列是 (列名, dtype, 每个 config 的行数, get_block)。
+    get_block(c) 返回 config c 这一列的一维数组, 写入时逐个 config 调用, 不需要先拼出整张表。
+    """
+    from src.indicators.indicators_wrapper import indicators_spec
+    from src.calculate_signals import signal_result_name, unpack_signal_bits
+    from src.backtest.calculate_backtest import backtest_result_name
+    from src.backtest.calculate_summary import backtest_summary_name
+
+    conf_count = result["backtest_summary"].shape[0]
+    tables = {}
+
+    for table, key in [("tohlcv", "tohlcv"), ("tohlcv2", "tohlcv2")]:
+        np_data = result.get(key)
+        if np_data is None or np_data.shape[0] == 0:
+            continue
+        # k线数据和 config 无关, 只写一份
+        tables[table] = [
+            (name, np_data.dtype, None, lambda c, col=col, d=np_data: d[:, col])
+            for col, name in enumerate(tohlcv_name)
+        ]
+
+    for table, key, index_key in [
+        ("indicator", "indicator_result", "indicator_index"),
+        ("indicator2", "indicator_result2", "indicator_index2"),
+    ]:
+        if key not in result:
+            continue
+        columns = []
+        for spec in indicators_spec.values():
+            result_array = result[key][spec["id"]]
+            if result_array.shape[1] == 0:
+                continue
+            index = result[index_key][:, spec["id"]]
+            for col, name in enumerate(spec["result_name"]):
+                columns.append(
+                    (
+                        name,
+                        result_array.dtype,
+                        result_array.shape[1],
+                        lambda c, col=col, r=result_array, i=index: r[i[c], :, col],
+                    )
+                )
+        if columns:
+            tables[table] = columns
+
+    signal_result = result.get("signal_result")
+    signal_bits = result.get("signal_bits")
+    if "tohlcv" in result:
+        rows = result["tohlcv"].shape[0]
+    if signal_result is not None and signal_result.shape[0] == conf_count:
+        tables["signal"] = [
+            (
+                name,
+                signal_result.dtype,
+                rows,
+                lambda c, col=col: signal_result[c, :, col],
+            )
+            for col, name in enumerate(signal_result_name)
+        ]
+    elif signal_bits is not None and signal_bits.shape[2] > 0 and rows is not None:
+        # pack_signals=True 时按位保存的信号逐个 config 展开
+        tables["signal"] = [
+            (
+                name,
+                np.bool_,
+                rows,
+                lambda c, col=col: unpack_signal_bits(signal_bits[c : c + 1], rows)[
+                    0, :, col
+                ],
+            )
+            for col, name in enumerate(signal_result_name)
+        ]
+
+    backtest_result = result.get("backtest_result")
+    if backtest_result is not None and backtest_result.shape[0] == conf_count:
+        tables["backtest"] = [
+            (
+                name,
+                backtest_result.dtype,
+                backtest_result.shape[1],
+                lambda c, col=col: backtest_result[c, :, col],
+            )
+            for col, name in enumerate(backtest_result_name)
+        ]
+
+    backtest_summary = result["backtest_summary"]
+    tables["summary"] = [
+        (
+            name,
+            backtest_summary.dtype,
+            1,
+            lambda c, col=col: backtest_summary[c, col : col + 1],
+        )
+        for col, name in enumerate(backtest_summary_name)
+    ]
+    return tables
+
+
+def export_columnar(path, result, config_idx=None, int_dtype=np.int64, rows=None):
+    """
+    把 entry_func 的输出按列写成二进制文件, 每个 config 的结果按 config_idx 的顺序依次排列:
+    path/<表>/<列名>.npy, 表包括 tohlcv, tohlcv2, indicator, indicator2, signal, backtest, summary。
+    除了 tohlcv 和 tohlcv2, 每张表都有 config_idx 列, 一个 config 的行是连续的, 行数见 manifest.json。
+
+    每一列先用 open_memmap 预分配文件, 再逐个 config 写入, 峰值内存和 config 数量无关,
+    指标结果用 indicator_index 展开到每个 config, 不需要先拼出 (conf_count, rows, n) 的数组。
+    summary_only 时没有每根k线的 backtest_result, 不写 backtest 表; pack_signals 时信号从 signal_bits 展开,
+    summary_only 的输出里没有 tohlcv, 需要传入 rows 才能展开。
+    manifest.json 最后写入, 写入中断时 load_columnar 不会读到不完整的结果。
+
+    Args:
+        path: 输出目录。
+        result: entry_func 的返回值。
+        config_idx: 要写入的 config 下标, 默认全部。
+        int_dtype: config_idx 列的类型。
+        rows: k线数量, 只在输出里没有 tohlcv 时用于展开 signal_bits。
+
+    Returns:
+        dict: manifest 的内容。
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    manifest_path = path / columnar_manifest_name
+    manifest_path.unlink(missing_ok=True)
+
+    conf_count = result["backtest_summary"].shape[0]
+    if config_idx is None:
+        config_idx = np.arange(conf_count)
+    config_idx = np.asarray(config_idx, dtype=int_dtype).reshape(-1)
+    if np.any((config_idx < 0) | (config_idx >= conf_count)):
+        raise IndexError(f"config_idx 超出范围 [0, {conf_count})")
+
+    manifest = {
+        "version": columnar_version,
+        "config_count": len(config_idx),
+        "tables": {},
+    }
+    for table, columns in _get_columnar_tables(result, rows).items():
+        table_path = path / table
+        table_path.mkdir(exist_ok=True)
+        config_rows = columns[0][2]
+        if config_rows is None:
+            total_rows = len(columns[0][3](0))
+        else:
+            total_rows = config_rows * len(config_idx)
+            index_array = np.lib.format.open_memmap(
+                table_path / "config_idx.npy",
+                mode="w+",
+                dtype=int_dtype,
+                shape=(total_rows,),
+            )
+            index_array[:] = np.repeat(config_idx, config_rows)
+            del index_array
+
+        for name, dtype, _, get_block in columns:
+            array = np.lib.format.open_memmap(
+                table_path / f"{name}.npy",
+                mode="w+",
+                dtype=dtype,
+                shape=(total_rows,),
+            )
+            if config_rows is None:
+                array[:] = get_block(0)
+            else:
+                for n, c in enumerate(config_idx):
+                    array[n * config_rows : (n + 1) * config_rows] = get_block(c)
+            array.flush()
+            del array
+
+        manifest["tables"][table] = {
+            "rows": total_rows,
+            "config_rows": config_rows,
+            "columns": ([] if config_rows is None else ["config_idx"])
+            + [name for name, *_ in columns],
+        }
+
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def load_columnar(path, tables=None):
+    """
+    读取 export_columnar 写入的结果, 每一列以只读内存映射的方式打开, 不拷贝数据,
+    只有实际访问到的页才会从磁盘读入。
+
+    Args:
+        path: export_columnar 的输出目录。
+        tables: 要读取的表名, 默认全部。
+
+    Returns:
+        dict: {表名: {列名: 一维数组}}, config c 在某张表中的行是 config_idx == c 的连续区间。
+    """
+    path = Path(path)
+    with open(path / columnar_manifest_name, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("version") != columnar_version:
+        raise ValueError(f"不支持的列存版本: {manifest.get('version')}")
+
+    output = {}
+    for table, meta in manifest["tables"].items():
+        if tables is not None and table not in tables:
+            continue
+        output[table] = {
+            name: np.load(path / table / f"{name}.npy", mmap_mode="r")
+            for name in meta["columns"]
+        }
+    return output
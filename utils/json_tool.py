@@ -1,50 +1,73 @@
-from pathlib import Path
-import json
+import os
+import sys
 
 
-numba_params_path = "utils/numba_params_temp.json"
-
 default_mode = "njit"
 default_cache = True
 default_enable64 = True
 default_max_registers = 24
+default_lazy = True
+default_profile = False
+
+# 通过环境变量传递 numba 配置, 子进程会自动继承, 不需要临时文件
+numba_config_env = {
+    "mode": "NUMBA_QUANT_MODE",
+    "cache": "NUMBA_QUANT_CACHE",
+    "enable64": "NUMBA_QUANT_ENABLE64",
+    "max_registers": "NUMBA_QUANT_MAX_REGISTERS",
+    "lazy": "NUMBA_QUANT_LAZY",
+    "profile": "NUMBA_QUANT_PROFILE",
+}
+
 
+def _parse_bool(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
 
-def read_numba_config(path=numba_params_path):
-    try:
-        with open(path, "r", encoding="utf-8") as file:
-            numba_params = json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        numba_params = {
-            "mode": default_mode,
-            "cache": default_cache,
-            "enable64": default_enable64,
-            "max_registers": default_max_registers,
-        }
-        print(f"警告: 无法加载 {numba_params_path}，使用默认 Numba 配置。")
-    return numba_params
+
+def read_numba_config(environ=os.environ):
+    """
+    从环境变量读取 numba 配置, 没有设置的项使用默认值。
+
+    - lazy: 为 True 时导入模块时不编译也不读取缓存,
+      第一次调用 entry_func 时才按签名编译或者从缓存加载, 见 compile_lazy_kernels。
+    - profile: 为 True 时内核按阶段累计时钟周期, 见 utils/profile_utils.py, 关闭时没有任何开销。
+    """
+    return {
+        "mode": environ.get(numba_config_env["mode"], default_mode),
+        "cache": _parse_bool(environ.get(numba_config_env["cache"], default_cache)),
+        "enable64": _parse_bool(
+            environ.get(numba_config_env["enable64"], default_enable64)
+        ),
+        "max_registers": int(
+            environ.get(numba_config_env["max_registers"], default_max_registers)
+        ),
+        "lazy": _parse_bool(environ.get(numba_config_env["lazy"], default_lazy)),
+        "profile": _parse_bool(
+            environ.get(numba_config_env["profile"], default_profile)
+        ),
+    }
 
 
 def write_numba_config(
-    path=numba_params_path,
     mode: str = default_mode,
     cache: bool = default_cache,
     enable64: bool = default_enable64,
     max_registers: int = default_max_registers,
+    lazy: bool = default_lazy,
+    profile: bool = default_profile,
+    environ=os.environ,
 ):
-    """将 Numba 配置写入临时 JSON 文件。"""
+    """将 Numba 配置写入环境变量。"""
     config_to_write = {
         "mode": mode,
         "cache": cache,
         "enable64": enable64,
         "max_registers": max_registers,
+        "lazy": lazy,
+        "profile": profile,
     }
-    with open(path, "w", encoding="utf-8") as file:
-        json.dump(config_to_write, file, ensure_ascii=False, indent=4)
-
-
-def delete_numba_config(path=numba_params_path):
-    Path(path).unlink(missing_ok=True)
+    for k, v in config_to_write.items():
+        environ[numba_config_env[k]] = str(v)
 
 
 def load_numba_config(
@@ -52,12 +75,32 @@ def load_numba_config(
     cache: bool = default_cache,
     enable64: bool = default_enable64,
     max_registers: int = default_max_registers,
+    lazy: bool = default_lazy,
+    profile: bool = default_profile,
 ):
+    """
+    显式初始化 numba 配置, 必须在导入 src 下的模块之前调用。
+    utils.numba_params 已经导入并且配置不同时抛出异常, 因为内核的签名已经按旧配置生成了。
+    """
     write_numba_config(
-        mode=mode, cache=cache, enable64=enable64, max_registers=max_registers
+        mode=mode,
+        cache=cache,
+        enable64=enable64,
+        max_registers=max_registers,
+        lazy=lazy,
+        profile=profile,
     )
+    config = read_numba_config()
+
+    if "utils.numba_params" in sys.modules:
+        nb_params = sys.modules["utils.numba_params"].nb_params
+        if nb_params != config:
+            raise RuntimeError(
+                f"numba 配置已经初始化为 {nb_params}, 无法修改为 {config}, "
+                "请在导入 src 下的模块之前调用 load_numba_config"
+            )
+        return nb_params
 
     from utils.numba_params import nb_params
 
-    delete_numba_config()
     return nb_params
@@ -12,6 +12,7 @@ def get_gpu_properties():
             "max_threads_per_block": device.MAX_THREADS_PER_BLOCK,
             "warp_size": device.WARP_SIZE,
             "multiprocessor_count": device.MULTIPROCESSOR_COUNT,
+            "max_threads_per_multiprocessor": device.MAX_THREADS_PER_MULTI_PROCESSOR,
             "max_registers_per_block": device.MAX_REGISTERS_PER_BLOCK,
             "max_shared_memory_per_block": device.MAX_SHARED_MEMORY_PER_BLOCK,
             "major": device.compute_capability[0],  # 添加计算能力主版本
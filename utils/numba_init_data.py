@@ -92,8 +92,14 @@ def init_data_child(params_child):
         indicator_result_child,
         indicator_result2_child,
     ) = indicator_args
-    (signal_params, signal_result_child) = signal_args
-    (backtest_params_child, backtest_result_child) = backtest_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+    (
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
     (
         int_temp_array_child,
         int_temp_array2_child,
@@ -106,11 +112,7 @@ def init_data_child(params_child):
     tohlcv_smooth[:] = np.nan
     tohlcv_smooth2[:] = np.nan
 
-    for i in indicator_result_child:
-        i[:] = np.nan
-    for i in indicator_result2_child:
-        i[:] = np.nan
-
+    # indicator_result_child 是多个 config 共享的去重结果, 由指标阶段负责初始化, 这里不能再写入
     signal_result_child[:] = False
     backtest_result_child[:] = np.nan
     int_temp_array_child[:] = 0
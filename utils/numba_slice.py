@@ -0,0 +1,128 @@
+import numba as nb
+from utils.numba_utils import nb_wrapper
+from utils.data_types import (
+    get_numba_data_types,
+    get_params_child_signature,
+    get_indicator_result_child,
+)
+
+from utils.numba_params import nb_params
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+
+indicator_result_child_type = get_indicator_result_child(
+    nb_int_type, nb_float_type, nb_bool_type
+)
+signature = indicator_result_child_type(indicator_result_child_type, nb_int_type)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def slice_indicator_result_child(indicator_result_child, start):
+    """
+    每个指标的结果数组都从第 start 根k线开始切片, 不拷贝数据。
+    """
+    (sma_result, sma2_result, bbands_result, atr_result, psar_result) = (
+        indicator_result_child
+    )
+    return (
+        sma_result[start:],
+        sma2_result[start:],
+        bbands_result[start:],
+        atr_result[start:],
+        psar_result[start:],
+    )
+
+
+params_child_type = get_params_child_signature(nb_int_type, nb_float_type, nb_bool_type)
+signature = params_child_type(params_child_type, nb_int_type)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def slice_params_child(params_child, start):
+    """
+    tohlcv 的逐k线数组 (数据, mapping_data, 指标, 信号, 回测和临时数组) 都从第 start 根k线开始切片,
+    用于增量计算时只在尾部运行 calc_signal 等函数。
+    tohlcv2 和它的指标通过 mapping_data 访问, 不切片。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params_child
+    (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
+    (
+        indicator_params_child,
+        indicator_params2_child,
+        indicator_enabled,
+        indicator_enabled2,
+        indicator_result_child,
+        indicator_result2_child,
+    ) = indicator_args
+    (signal_params, signal_result_child, signal_bits_child) = signal_args
+    (
+        backtest_params_child,
+        backtest_result_child,
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    ) = backtest_args
+    (
+        int_temp_array_child,
+        int_temp_array2_child,
+        float_temp_array_child,
+        float_temp_array2_child,
+        bool_temp_array_child,
+        bool_temp_array2_child,
+    ) = temp_args
+
+    data_args_child = (
+        tohlcv[start:],
+        tohlcv2,
+        tohlcv_smooth[start:],
+        tohlcv_smooth2,
+        mapping_data[start:],
+    )
+    indicator_args_child = (
+        indicator_params_child,
+        indicator_params2_child,
+        indicator_enabled,
+        indicator_enabled2,
+        slice_indicator_result_child(indicator_result_child, start),
+        indicator_result2_child,
+    )
+    # signal_bits 每个字对应 64 根k线, 不能按k线切片, 增量计算不支持 pack_signals
+    signal_args_child = (
+        signal_params,
+        signal_result_child[start:],
+        signal_bits_child,
+    )
+    backtest_args_child = (
+        backtest_params_child,
+        backtest_result_child[start:],
+        backtest_summary_child,
+        trade_result_child,
+        trade_count_child,
+    )
+    temp_args_child = (
+        int_temp_array_child[start:],
+        int_temp_array2_child,
+        float_temp_array_child[start:],
+        float_temp_array2_child,
+        bool_temp_array_child[start:],
+        bool_temp_array2_child,
+    )
+    return (
+        data_args_child,
+        indicator_args_child,
+        signal_args_child,
+        backtest_args_child,
+        temp_args_child,
+    )
@@ -1,17 +1,25 @@
 import numpy as np
+from typing import NamedTuple
 import numba as nb
 from utils.numba_utils import nb_wrapper
 from utils.data_types import (
     get_params_signature,
     get_params_child_signature,
     get_numba_data_types,
+    get_indicator_params,
+    get_indicator_params_child,
+    get_indicator_result,
+    get_indicator_result_child,
 )
-from src.indicators.indicators_wrapper import indicators_spec
-from src.calculate_signals import signal_result_count
+from src.indicators.indicators_wrapper import indicators_spec, IndicatorsId
+from src.calculate_signals import signal_result_count, get_signal_words
 from src.backtest.calculate_backtest import backtest_result_count
+from src.backtest.calculate_summary import backtest_summary_count
+from src.backtest.calculate_trades import trade_result_count
 
 
 from utils.numba_params import nb_params
+from utils.numba_gpu_utils import get_gpu_properties
 
 dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
 nb_int_type = dtype_dict["nb"]["int"]
@@ -19,6 +27,15 @@ nb_float_type = dtype_dict["nb"]["float"]
 nb_bool_type = dtype_dict["nb"]["bool"]
 
 
+class ArraySpec(NamedTuple):
+    """
+    数组的形状和类型, 用于在分配之前描述输出数组。
+    """
+
+    shape: tuple
+    dtype: np.dtype
+
+
 def create_array(
     mode: str,
     shape: tuple[int, ...],
@@ -64,24 +81,58 @@ def get_max_temp_float_num(indicators_spec: dict, min_temp_float_num: int) -> in
     return max(max_from_specs, min_temp_float_num)
 
 
-def create_indicator_results(
-    mode,
+def get_unique_indicator_params(indicator_params, indicator_enabled, dtype_dict):
+    """
+    计划阶段: 找出每个指标不重复的参数行, 相同参数的指标只计算一次。
+
+    参数:
+    - indicator_params: 每个指标一个 (conf_count, param_count) 的参数数组。
+    - indicator_enabled: 指标启用数组, 未启用的指标只保留一行参数。
+
+    返回:
+    - unique_params: 每个指标一个 (unique_count, param_count) 的参数数组。
+    - indicator_index: (conf_count, indicator_count) 的索引数组,
+      indicator_index[idx, indicator_id] 是 config idx 在该指标 unique_params 中的行号。
+    """
+    np_int_type = dtype_dict["np"]["int"]
+
+    conf_count = indicator_params[0].shape[0] if indicator_params else 0
+    indicator_index = np.zeros((conf_count, len(indicator_params)), dtype=np_int_type)
+
+    unique_params = []
+    for spec in indicators_spec.values():
+        indicator_id = spec["id"]
+        params = indicator_params[indicator_id]
+
+        if indicator_enabled[indicator_id] and params.shape[0] > 0:
+            _unique, _inverse = np.unique(params, axis=0, return_inverse=True)
+            indicator_index[:, indicator_id] = _inverse.reshape(-1)
+        else:
+            # 未启用的指标不会被计算, 保留一行参数即可
+            _unique = params[:1]
+
+        unique_params.append(np.ascontiguousarray(_unique))
+
+    return tuple(unique_params), indicator_index
+
+
+def get_indicator_results_spec(
     indicators_spec: dict,
+    indicator_params,
     indicator_enabled: np.ndarray,
     tohlcv_rows: int,
     min_rows: int,
-    conf_count: int,
     dtype_dict: dict,
 ):
     """
-    根据指标规格动态创建指标结果数组。
+    根据指标规格动态生成指标结果数组的 ArraySpec。
+    结果数组的第一维是去重后的参数行数, 不是 conf_count。
     """
 
     np_int_type = dtype_dict["np"]["int"]
     np_float_type = dtype_dict["np"]["float"]
     np_bool_type = dtype_dict["np"]["bool"]
 
-    # 动态创建指标结果数组
     indicator_results = []
     for spec in indicators_spec.values():
         indicator_id = spec["id"]
@@ -90,16 +141,36 @@ def create_indicator_results(
         # 根据指标是否启用确定行数
         rows = tohlcv_rows if indicator_enabled[indicator_id] else min_rows
 
-        # 定义数组形状并创建数组
-        shape = (conf_count, rows, output_dim)
-        result_array = create_array(mode, shape, np_float_type)
-
-        indicator_results.append(result_array)
+        # 定义数组形状
+        shape = (indicator_params[indicator_id].shape[0], rows, output_dim)
+        indicator_results.append(ArraySpec(shape, np_float_type))
 
     return tuple(indicator_results)
 
 
-def initialize_outputs(
+def get_slot_count(mode, conf_count, slot_count=None):
+    """
+    计算工作缓冲区(slot)的数量。
+    每个 slot 被一个工作线程独占, 依次处理 idx = slot, slot + slot_count, ... 的 config。
+
+    - normal/njit: 默认等于 numba 的线程数。
+    - cuda: 默认等于 gpu 上能同时驻留的线程数。
+    """
+    if slot_count is None:
+        if mode in ["normal", "njit"]:
+            slot_count = nb.get_num_threads()
+        elif mode == "cuda":
+            props = get_gpu_properties()
+            slot_count = props.get("multiprocessor_count", 1) * props.get(
+                "max_threads_per_multiprocessor", 2048
+            )
+        else:
+            raise ValueError(f"Invalid mode: {mode}")
+
+    return max(1, min(conf_count, slot_count))
+
+
+def get_outputs_spec(
     mode,
     tohlcv,
     tohlcv2,
@@ -113,23 +184,37 @@ def initialize_outputs(
     temp_float_num,
     temp_bool_num,
     min_rows=0,
+    summary_only=False,
+    slot_count=None,
+    max_trades=0,
+    pack_signals=False,
 ):
     """
-    初始化并返回所有计算所需的输出数组和临时数组。
+    计算所有输出数组和临时数组的形状和类型, 结构和 initialize_outputs 的返回值相同,
+    每个数组是一个 ArraySpec, 可以在分配内存之前用来查找可复用的数组。
 
     参数:
     - tohlcv_shape: 形状元组，表示主OHLCV数据的形状 (rows, cols)。
     - tohlcv2_shape: 形状元组，表示第二组OHLCV数据的形状 (rows, cols)。
+    - indicator_params, indicator_params2: 去重后的指标参数 (get_unique_indicator_params)。
     - conf_count: 并发策略的数量 (对应于 backtest_params 的第一维)。
     - dtype_dict: 包含 numpy 和 numba 数据类型的字典。
     - temp_num: 临时数组的最后一维大小。
+    - summary_only: 为 True 时 signal_result, backtest_result 的第一维也是 slot_count,
+      只作为工作线程的临时缓冲区, 每个 config 只保留 backtest_summary 中的标量统计。
+    - slot_count: 工作缓冲区的数量, 见 get_slot_count。
+      临时数组的第一维总是 slot_count, 内存随线程数增长, 不随 conf_count 增长。
+    - max_trades: 每个 config 最多保留的交易记录数, 见 calculate_trades, 为 0 时不提取交易记录。
+    - pack_signals: 为 True 时每个 config 的信号按位保存在 signal_bits (conf_count, signal_result_count, words) 中,
+      每个 uint64 保存 64 根k线, signal_result 的第一维是 slot_count, 只作为工作线程的临时缓冲区。
+      为 False 时 signal_bits 的最后一维是 0。
 
     返回:
-    一个元组，包含所有初始化好的 numpy 数组：
+    一个元组，包含所有数组的 ArraySpec：
     (tohlcv_smooth, tohlcv_smooth2,
      indicator_result, indicator_result2,
-     signal_result, signal_result2,
-     backtest_result, temp_arrays)
+     signal_result, signal_bits, backtest_result,
+     backtest_summary, trade_result, trade_count, temp_arrays)
     """
 
     np_int_type = dtype_dict["np"]["int"]
@@ -143,62 +228,80 @@ def initialize_outputs(
 
     tohlcv_smooth_shape = tohlcv_shape
     tohlcv_smooth2_shape = tohlcv2_shape
-    tohlcv_smooth = create_array(mode, tohlcv_smooth_shape, np_float_type)
-    tohlcv_smooth2 = create_array(mode, tohlcv_smooth2_shape, np_float_type)
+    tohlcv_smooth = ArraySpec(tohlcv_smooth_shape, np_float_type)
+    tohlcv_smooth2 = ArraySpec(tohlcv_smooth2_shape, np_float_type)
 
     signal_output_dim = signal_result_count
     backtest_output_dim = backtest_result_count
 
     temp_float_num = get_max_temp_float_num(indicators_spec, temp_float_num)
 
+    # 临时数组只按工作线程数分配, 每个线程在处理的多个 config 之间复用
+    # summary_only 模式下, 逐k线的结果数组也只按工作线程数分配
+    slot_count = get_slot_count(mode, conf_count, slot_count)
+    row_count = slot_count if summary_only else conf_count
+
     # --- Indicator Result Arrays ---
-    indicator_result = create_indicator_results(
-        mode,
+    indicator_result = get_indicator_results_spec(
         indicators_spec,
+        indicator_params,
         indicator_enabled,
         tohlcv_rows,
         min_rows,
-        conf_count,
         dtype_dict,
     )
 
-    indicator_result2 = create_indicator_results(
-        mode,
+    indicator_result2 = get_indicator_results_spec(
         indicators_spec,
+        indicator_params2,
         indicator_enabled2,
         tohlcv2_rows,
         min_rows,
-        conf_count,
         dtype_dict,
     )
 
     # --- Signal Result Arrays ---
-    signal_shape = (conf_count, tohlcv_rows, signal_output_dim)
-    signal_result = create_array(mode, signal_shape, np_bool_type)
+    signal_row_count = slot_count if pack_signals else row_count
+    signal_shape = (signal_row_count, tohlcv_rows, signal_output_dim)
+    signal_result = ArraySpec(signal_shape, np_bool_type)
+
+    # 每个字保存 64 根k线的一个信号, 内存是 signal_result 的 1/8
+    signal_words = get_signal_words(tohlcv_rows) if pack_signals else 0
+    signal_bits_shape = (conf_count, signal_output_dim, signal_words)
+    signal_bits = ArraySpec(signal_bits_shape, np.uint64)
 
     # --- Backtest Result Array ---
-    backtest_shape = (conf_count, tohlcv_rows, backtest_output_dim)
-    backtest_result = create_array(mode, backtest_shape, np_float_type)
+    backtest_shape = (row_count, tohlcv_rows, backtest_output_dim)
+    backtest_result = ArraySpec(backtest_shape, np_float_type)
+
+    # --- Backtest Summary Array ---
+    backtest_summary_shape = (conf_count, backtest_summary_count)
+    backtest_summary = ArraySpec(backtest_summary_shape, np_float_type)
+
+    # --- Trade Arrays ---
+    trade_result_shape = (conf_count, max_trades, trade_result_count)
+    trade_result = ArraySpec(trade_result_shape, np_float_type)
+    trade_count = ArraySpec((conf_count,), np_int_type)
 
     # --- Temporary Arrays ---
-    int_temp_shape = (conf_count, tohlcv_rows, temp_int_num)
-    int_temp_array = create_array(mode, int_temp_shape, np_int_type)
+    int_temp_shape = (slot_count, tohlcv_rows, temp_int_num)
+    int_temp_array = ArraySpec(int_temp_shape, np_int_type)
 
-    float_temp_shape = (conf_count, tohlcv_rows, temp_float_num)
-    float_temp_array = create_array(mode, float_temp_shape, np_float_type)
+    float_temp_shape = (slot_count, tohlcv_rows, temp_float_num)
+    float_temp_array = ArraySpec(float_temp_shape, np_float_type)
 
-    bool_temp_shape = (conf_count, tohlcv_rows, temp_bool_num)
-    bool_temp_array = create_array(mode, bool_temp_shape, np_bool_type)
+    bool_temp_shape = (slot_count, tohlcv_rows, temp_bool_num)
+    bool_temp_array = ArraySpec(bool_temp_shape, np_bool_type)
 
     # --- Temporary Arrays ---
-    int_temp_shape2 = (conf_count, tohlcv2_rows, temp_int_num)
-    int_temp_array2 = create_array(mode, int_temp_shape2, np_int_type)
+    int_temp_shape2 = (slot_count, tohlcv2_rows, temp_int_num)
+    int_temp_array2 = ArraySpec(int_temp_shape2, np_int_type)
 
-    float_temp_shape2 = (conf_count, tohlcv2_rows, temp_float_num)
-    float_temp_array2 = create_array(mode, float_temp_shape2, np_float_type)
+    float_temp_shape2 = (slot_count, tohlcv2_rows, temp_float_num)
+    float_temp_array2 = ArraySpec(float_temp_shape2, np_float_type)
 
-    bool_temp_shape2 = (conf_count, tohlcv2_rows, temp_bool_num)
-    bool_temp_array2 = create_array(mode, bool_temp_shape2, np_bool_type)
+    bool_temp_shape2 = (slot_count, tohlcv2_rows, temp_bool_num)
+    bool_temp_array2 = ArraySpec(bool_temp_shape2, np_bool_type)
 
     temp_args = (
         int_temp_array,
@@ -215,11 +318,31 @@ def initialize_outputs(
         indicator_result,
         indicator_result2,
         signal_result,
+        signal_bits,
         backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
         temp_args,
     )
 
 
+def create_outputs(mode, spec):
+    """
+    按 get_outputs_spec 的结构递归分配数组。
+    """
+    if isinstance(spec, ArraySpec):
+        return create_array(mode, spec.shape, spec.dtype)
+    return tuple(create_outputs(mode, i) for i in spec)
+
+
+def initialize_outputs(mode, *args, **kwargs):
+    """
+    初始化并返回所有计算所需的输出数组和临时数组, 参数和 get_outputs_spec 相同。
+    """
+    return create_outputs(mode, get_outputs_spec(mode, *args, **kwargs))
+
+
 def unpack_params(outputs, inputs):
     (
         tohlcv_smooth,
@@ -227,7 +350,11 @@ def unpack_params(outputs, inputs):
         indicator_result,
         indicator_result2,
         signal_result,
+        signal_bits,
         backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
         temp_args,
     ) = outputs
     (
@@ -240,6 +367,8 @@ def unpack_params(outputs, inputs):
         indicator_enabled2,
         signal_params,
         backtest_params,
+        indicator_index,
+        indicator_index2,
     ) = inputs
     data_args = (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data)
     indicator_args = (
@@ -249,9 +378,17 @@ def unpack_params(outputs, inputs):
         indicator_enabled2,
         indicator_result,
         indicator_result2,
+        indicator_index,
+        indicator_index2,
+    )
+    signal_args = (signal_params, signal_result, signal_bits)
+    backtest_args = (
+        backtest_params,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
     )
-    signal_args = (signal_params, signal_result)
-    backtest_args = (backtest_params, backtest_result)
 
     cpu_params = (data_args, indicator_args, signal_args, backtest_args, temp_args)
     return cpu_params
@@ -259,7 +396,7 @@ def unpack_params(outputs, inputs):
 
 params_type = get_params_signature(nb_int_type, nb_float_type, nb_bool_type)
 return_type = get_params_child_signature(nb_int_type, nb_float_type, nb_bool_type)
-signature = return_type(params_type, nb_int_type)
+signature = return_type(params_type, nb_int_type, nb_int_type)
 
 
 @nb_wrapper(
@@ -267,10 +404,14 @@ signature = return_type(params_type, nb_int_type)
     signature=signature,
     cache_enabled=nb_params.get("cache", True),
 )
-def unpack_params_child(params, idx):
+def unpack_params_child(params, idx, slot):
     """
     indicator_enabled, indicator_enabled2, signal_params 不需要用idx传递
     data_args, 不需要用idx传递
+    indicator_params, indicator_result 通过 indicator_index 映射到去重后的行
+    signal_result, backtest_result, 第一维等于 conf_count 时用idx传递,
+    否则是工作线程的临时缓冲区(summary_only 模式, 或 pack_signals 模式下的 signal_result), 用 slot 传递
+    临时数组按工作线程分配, 总是用 slot 传递
     其他都需要用idx传递
     """
     (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
@@ -282,9 +423,17 @@ def unpack_params_child(params, idx):
         indicator_enabled2,
         indicator_result,
         indicator_result2,
+        indicator_index,
+        indicator_index2,
     ) = indicator_args
-    (signal_params, signal_result) = signal_args
-    (backtest_params, backtest_result) = backtest_args
+    (signal_params, signal_result, signal_bits) = signal_args
+    (
+        backtest_params,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
+    ) = backtest_args
     (
         int_temp_array,
         int_temp_array2,
@@ -303,33 +452,36 @@ def unpack_params_child(params, idx):
         indicator_result2
     )
 
+    _index = indicator_index[idx]
+    _index2 = indicator_index2[idx]
+
     indicator_params_child = (
-        sma_params[idx],
-        sma2_params[idx],
-        bbands_params[idx],
-        atr_params[idx],
-        psar_params[idx],
+        sma_params[_index[IndicatorsId.sma]],
+        sma2_params[_index[IndicatorsId.sma2]],
+        bbands_params[_index[IndicatorsId.bbands]],
+        atr_params[_index[IndicatorsId.atr]],
+        psar_params[_index[IndicatorsId.psar]],
     )
     indicator_params2_child = (
-        sma_params2[idx],
-        sma2_params2[idx],
-        bbands_params2[idx],
-        atr_params2[idx],
-        psar_params2[idx],
+        sma_params2[_index2[IndicatorsId.sma]],
+        sma2_params2[_index2[IndicatorsId.sma2]],
+        bbands_params2[_index2[IndicatorsId.bbands]],
+        atr_params2[_index2[IndicatorsId.atr]],
+        psar_params2[_index2[IndicatorsId.psar]],
     )
     indicator_result_child = (
-        sma_result[idx],
-        sma2_result[idx],
-        bbands_result[idx],
-        atr_result[idx],
-        psar_result[idx],
+        sma_result[_index[IndicatorsId.sma]],
+        sma2_result[_index[IndicatorsId.sma2]],
+        bbands_result[_index[IndicatorsId.bbands]],
+        atr_result[_index[IndicatorsId.atr]],
+        psar_result[_index[IndicatorsId.psar]],
     )
     indicator_result2_child = (
-        sma_result2[idx],
-        sma2_result2[idx],
-        bbands_result2[idx],
-        atr_result2[idx],
-        psar_result2[idx],
+        sma_result2[_index2[IndicatorsId.sma]],
+        sma2_result2[_index2[IndicatorsId.sma2]],
+        bbands_result2[_index2[IndicatorsId.bbands]],
+        atr_result2[_index2[IndicatorsId.atr]],
+        psar_result2[_index2[IndicatorsId.psar]],
     )
 
     indicator_args_child = (
@@ -341,17 +493,27 @@ def unpack_params_child(params, idx):
         indicator_result2_child,
     )
 
-    signal_args_child = (signal_params, signal_result[idx])
+    conf_count = backtest_params.shape[0]
+    result_idx = idx if backtest_result.shape[0] == conf_count else slot
+    signal_idx = idx if signal_result.shape[0] == conf_count else slot
+
+    signal_args_child = (signal_params, signal_result[signal_idx], signal_bits[idx])
 
-    backtest_args_child = (backtest_params[idx], backtest_result[idx])
+    backtest_args_child = (
+        backtest_params[idx],
+        backtest_result[result_idx],
+        backtest_summary[idx],
+        trade_result[idx],
+        trade_count[idx : idx + 1],
+    )
 
     temp_args_child = (
-        int_temp_array[idx],
-        int_temp_array2[idx],
-        float_temp_array[idx],
-        float_temp_array2[idx],
-        bool_temp_array[idx],
-        bool_temp_array2[idx],
+        int_temp_array[slot],
+        int_temp_array2[slot],
+        float_temp_array[slot],
+        float_temp_array2[slot],
+        bool_temp_array[slot],
+        bool_temp_array2[slot],
     )
 
     params_child = (
@@ -365,6 +527,49 @@ def unpack_params_child(params, idx):
     return params_child
 
 
+signature = nb.types.Tuple(
+    (
+        get_indicator_params_child(nb_int_type, nb_float_type, nb_bool_type),
+        get_indicator_result_child(nb_int_type, nb_float_type, nb_bool_type),
+    )
+)(
+    get_indicator_params(nb_int_type, nb_float_type, nb_bool_type),
+    get_indicator_result(nb_int_type, nb_float_type, nb_bool_type),
+    nb_int_type,
+    nb_int_type,
+)
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def unpack_indicator_child(indicator_params, indicator_result, indicator_id, row):
+    """
+    取出去重后第 row 行参数对应的指标参数和结果数组, 用于只计算 indicator_id 这一个指标。
+    其他指标没有被计算, 取第 0 行只是为了凑齐元组的类型。
+    """
+    (sma_params, sma2_params, bbands_params, atr_params, psar_params) = indicator_params
+    (sma_result, sma2_result, bbands_result, atr_result, psar_result) = indicator_result
+
+    indicator_params_child = (
+        sma_params[row if indicator_id == IndicatorsId.sma else 0],
+        sma2_params[row if indicator_id == IndicatorsId.sma2 else 0],
+        bbands_params[row if indicator_id == IndicatorsId.bbands else 0],
+        atr_params[row if indicator_id == IndicatorsId.atr else 0],
+        psar_params[row if indicator_id == IndicatorsId.psar else 0],
+    )
+    indicator_result_child = (
+        sma_result[row if indicator_id == IndicatorsId.sma else 0],
+        sma2_result[row if indicator_id == IndicatorsId.sma2 else 0],
+        bbands_result[row if indicator_id == IndicatorsId.bbands else 0],
+        atr_result[row if indicator_id == IndicatorsId.atr else 0],
+        psar_result[row if indicator_id == IndicatorsId.psar else 0],
+    )
+    return indicator_params_child, indicator_result_child
+
+
 def get_output(params):
     (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
     (tohlcv, tohlcv2, tohlcv_smooth, tohlcv_smooth2, mapping_data) = data_args
@@ -375,9 +580,17 @@ def get_output(params):
         indicator_enabled2,
         indicator_result,
         indicator_result2,
+        indicator_index,
+        indicator_index2,
     ) = indicator_args
-    (signal_params, signal_result) = signal_args
-    (backtest_params, backtest_result) = backtest_args
+    (signal_params, signal_result, signal_bits) = signal_args
+    (
+        backtest_params,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
+    ) = backtest_args
     (
         int_temp_array,
         int_temp_array2,
@@ -393,8 +606,14 @@ def get_output(params):
         "mapping_data": mapping_data,
         "indicator_result": indicator_result,
         "indicator_result2": indicator_result2,
+        "indicator_index": indicator_index,
+        "indicator_index2": indicator_index2,
         "signal_result": signal_result,
+        "signal_bits": signal_bits,
         "backtest_result": backtest_result,
+        "backtest_summary": backtest_summary,
+        "trade_result": trade_result,
+        "trade_count": trade_count,
         "int_temp_array": int_temp_array,
         "int_temp_array2": int_temp_array2,
         "float_temp_array": float_temp_array,
@@ -404,6 +623,32 @@ def get_output(params):
     }
 
 
+def get_summary_output(params):
+    """
+    summary_only 模式的输出, 只包含每个 config 的标量统计 (包括风险收益指标), cuda 模式下也只需要拷贝这一个数组。
+    max_trades > 0 时还包含交易记录, pack_signals 模式下还包含按位保存的信号。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+    (signal_params, signal_result, signal_bits) = signal_args
+    (
+        backtest_params,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
+    ) = backtest_args
+
+    output = {
+        "backtest_summary": backtest_summary,
+    }
+    if trade_result.shape[1] > 0:
+        output["trade_result"] = trade_result
+        output["trade_count"] = trade_count
+    if signal_bits.shape[2] > 0:
+        output["signal_bits"] = signal_bits
+    return output
+
+
 params_signature = get_params_signature(nb_int_type, nb_float_type, nb_bool_type)
 signature = nb_int_type(params_signature)
 
@@ -415,5 +660,32 @@ signature = nb_int_type(params_signature)
 )
 def get_conf_count(params):
     (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
-    (backtest_params, backtest_result) = backtest_args
+    (
+        backtest_params,
+        backtest_result,
+        backtest_summary,
+        trade_result,
+        trade_count,
+    ) = backtest_args
     return backtest_params.shape[0]
+
+
+@nb_wrapper(
+    mode=nb_params["mode"],
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def get_slot_count_from_params(params):
+    """
+    工作缓冲区(slot)的数量, 等于临时数组的第一维。
+    """
+    (data_args, indicator_args, signal_args, backtest_args, temp_args) = params
+    (
+        int_temp_array,
+        int_temp_array2,
+        float_temp_array,
+        float_temp_array2,
+        bool_temp_array,
+        bool_temp_array2,
+    ) = temp_args
+    return float_temp_array.shape[0]
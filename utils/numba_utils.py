@@ -1,6 +1,18 @@
+import threading
+
 from numba import jit, njit, cuda
 import numpy as np
 
+from utils.numba_params import nb_params
+
+# lazy 模式下等待编译的 (dispatcher, signature), 按装饰顺序排列,
+# 被调用的函数总是先于调用者装饰, 所以按顺序编译时调用者能找到已编译的签名
+lazy_registry = []
+lazy_registry_lock = threading.Lock()
+
+# 所有 normal/njit 模式的 (dispatcher, signature), 用于检查预编译包是否完整
+dispatcher_registry = []
+
 
 def nb_wrapper(
     mode: str,
@@ -16,13 +28,21 @@ def nb_wrapper(
     if set_inline_to_always:
         decorator_kwargs["inline"] = "always"  # 'always' or 'never'
 
+    # lazy 模式下装饰时不编译也不读取缓存, 在 compile_lazy_kernels 中按签名编译或加载缓存
+    lazy = nb_params.get("lazy", False) and signature is not None
+
     # 如果不在全局缓存中，则执行 Numba 编译
     if mode == "normal":
         decorator_kwargs["nopython"] = False
-        return jit(signature, **decorator_kwargs)
+        if lazy:
+            return _lazy_decorator(jit(**decorator_kwargs), signature)
+        return _registry_decorator(jit(signature, **decorator_kwargs), signature)
     elif mode == "njit":
-        return njit(signature, **decorator_kwargs)
+        if lazy:
+            return _lazy_decorator(njit(**decorator_kwargs), signature)
+        return _registry_decorator(njit(signature, **decorator_kwargs), signature)
     elif mode == "cuda":
+        # cuda 内核和设备函数仍然在装饰时编译
         decorator_kwargs["device"] = not parallel
         if max_registers is not None:
             decorator_kwargs["max_registers"] = max_registers
@@ -30,3 +50,39 @@ def nb_wrapper(
         return cuda.jit(signature, **decorator_kwargs)
     else:
         raise ValueError(f"Invalid mode: {mode}")
+
+
+def _registry_decorator(decorator, signature):
+    def _register(func):
+        dispatcher = decorator(func)
+        if signature is not None:
+            dispatcher_registry.append((dispatcher, signature))
+        return dispatcher
+
+    return _register
+
+
+def _lazy_decorator(decorator, signature):
+    def _register(func):
+        dispatcher = decorator(func)
+        with lazy_registry_lock:
+            lazy_registry.append((dispatcher, signature))
+            dispatcher_registry.append((dispatcher, signature))
+        return dispatcher
+
+    return _register
+
+
+def compile_lazy_kernels():
+    """
+    按签名编译 (或从缓存加载) 所有 lazy 模式下还没编译的函数, 已经编译过的不会重复处理。
+    和装饰时传签名一样, 编译后禁止按其他参数类型再编译, 调用时参数会按签名转换类型。
+    入口函数在第一次调用内核之前调用, 返回本次编译的函数数量。
+    """
+    with lazy_registry_lock:
+        count = len(lazy_registry)
+        for dispatcher, signature in lazy_registry:
+            dispatcher.compile(signature)
+            dispatcher.disable_compile()
+        lazy_registry.clear()
+    return count
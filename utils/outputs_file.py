@@ -0,0 +1,250 @@
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+from utils.numba_unpack import ArraySpec, create_outputs
+from src.indicators.indicators_wrapper import indicators_spec
+
+outputs_file_version = 1
+outputs_manifest_name = "manifest.json"
+
+# get_outputs_spec 中每个位置的数组名, temp_args 和平滑后的 tohlcv 是工作缓冲区, 不写文件
+outputs_name = [
+    "tohlcv_smooth",
+    "tohlcv_smooth2",
+    "indicator_result",
+    "indicator_result2",
+    "signal_result",
+    "signal_bits",
+    "backtest_result",
+    "backtest_summary",
+    "trade_result",
+    "trade_count",
+    "temp_args",
+]
+# 第一维是 conf_count 的结果数组, 第一维是 slot_count 时 (summary_only 等) 只是工作缓冲区
+config_outputs_name = [
+    "signal_result",
+    "signal_bits",
+    "backtest_result",
+    "backtest_summary",
+    "trade_result",
+    "trade_count",
+]
+inputs_name = [
+    "tohlcv",
+    "tohlcv2",
+    "mapping_data",
+    "indicator_params",
+    "indicator_params2",
+    "indicator_enabled",
+    "indicator_enabled2",
+    "signal_params",
+    "backtest_params",
+    "indicator_index",
+    "indicator_index2",
+]
+
+
+def _get_file_name(name, indicator_name=None):
+    if indicator_name is None:
+        return f"{name}.npy"
+    return f"{name}_{indicator_name}.npy"
+
+
+def _open_file(path, spec):
+    """
+    按 spec 创建 .npy 文件并内存映射, 返回 (ndarray 视图, memmap)。
+    numba 的签名要求普通的 ndarray, 视图共享 memmap 的内存, memmap 用于 flush。
+    """
+    array = np.lib.format.open_memmap(
+        path, mode="w+", dtype=spec.dtype, shape=spec.shape
+    )
+    return np.asarray(array), array
+
+
+def create_outputs_file(spec, output_dir, conf_count):
+    """
+    和 create_outputs 相同, 但指标结果和第一维是 conf_count 的结果数组分配成 output_dir 中的内存映射文件,
+    数组可以比内存大, 写入的页由操作系统换出到文件。临时数组和平滑后的 tohlcv 仍然在内存中分配。
+
+    Returns:
+        (outputs, files): outputs 的结构和 create_outputs 相同,
+        files 是 {文件名: memmap}, 用于 flush 和写入 manifest。
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # 先删除 manifest, 计算中断时 load_outputs_file 不会读到不完整的结果
+    (output_dir / outputs_manifest_name).unlink(missing_ok=True)
+
+    files = {}
+    outputs = []
+    for name, item in zip(outputs_name, spec):
+        if name in ["indicator_result", "indicator_result2"]:
+            arrays = []
+            for indicator_name, s in zip(indicators_spec, item):
+                file_name = _get_file_name(name, indicator_name)
+                array, files[file_name] = _open_file(output_dir / file_name, s)
+                arrays.append(array)
+            outputs.append(tuple(arrays))
+        elif name in config_outputs_name and item.shape[0] == conf_count:
+            file_name = _get_file_name(name)
+            array, files[file_name] = _open_file(output_dir / file_name, item)
+            outputs.append(array)
+        else:
+            outputs.append(create_outputs("njit", item))
+    return tuple(outputs), files
+
+
+def write_outputs_manifest(output_dir, inputs, files, conf_count):
+    """
+    计算完成后 flush 所有结果文件, 保存输入数组, 最后写入 manifest。
+    """
+    output_dir = Path(output_dir)
+    for array in files.values():
+        array.flush()
+
+    input_files = {}
+    for name, item in zip(inputs_name, inputs):
+        if isinstance(item, tuple):
+            for indicator_name, array in zip(indicators_spec, item):
+                file_name = _get_file_name(name, indicator_name)
+                np.save(output_dir / file_name, array)
+                input_files[file_name] = name
+        else:
+            file_name = _get_file_name(name)
+            np.save(output_dir / file_name, item)
+            input_files[file_name] = name
+
+    manifest = {
+        "version": outputs_file_version,
+        "conf_count": conf_count,
+        "outputs": sorted(files),
+        "inputs": sorted(input_files),
+    }
+    manifest_path = output_dir / outputs_manifest_name
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def load_outputs_file(output_dir):
+    """
+    读取 entry_func(output_dir=...) 写入的结果, 不需要重新计算。
+    每个数组以只读内存映射打开, 返回的字典和 get_output 的键相同 (没有写文件的结果数组不包含在内),
+    另外包含去重后的 indicator_params, indicator_params2 和 indicator_enabled, signal_params, backtest_params。
+    """
+    output_dir = Path(output_dir)
+    with open(output_dir / outputs_manifest_name, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("version") != outputs_file_version:
+        raise ValueError(f"不支持的结果文件版本: {manifest.get('version')}")
+
+    available = set(manifest["outputs"]) | set(manifest["inputs"])
+    result = {}
+    for name in inputs_name + outputs_name:
+        if name in ["indicator_result", "indicator_result2"] or name in [
+            "indicator_params",
+            "indicator_params2",
+        ]:
+            file_names = [_get_file_name(name, i) for i in indicators_spec]
+            if all(i in available for i in file_names):
+                result[name] = tuple(
+                    np.load(output_dir / i, mmap_mode="r") for i in file_names
+                )
+        elif _get_file_name(name) in available:
+            result[name] = np.load(output_dir / _get_file_name(name), mmap_mode="r")
+    return result
+
+
+def get_outputs_chunk_size(item_nbytes, working_set_bytes, minimum):
+    """
+    每块处理的 config (或者去重后的指标参数行) 数量, 使每块写入的结果不超过 working_set_bytes,
+    至少是 minimum (工作线程数), 保证每块都能用满所有线程。
+    """
+    if item_nbytes <= 0:
+        return None
+    return max(minimum, int(working_set_bytes // item_nbytes))
+
+
+def get_config_nbytes(outputs, conf_count):
+    """
+    每个 config 在第一维是 conf_count 的结果数组中占用的字节数。
+    """
+    nbytes = 0
+    for name, item in zip(outputs_name, outputs):
+        if name in config_outputs_name and item.shape[0] == conf_count:
+            nbytes += item.nbytes // max(conf_count, 1)
+    return nbytes
+
+
+def get_indicator_row_nbytes(outputs, inputs):
+    """
+    去重后每行指标参数在所有启用的指标结果数组中占用的字节数。
+    """
+    (_, _, indicator_result, indicator_result2, *_) = outputs
+    (_, _, _, _, _, indicator_enabled, indicator_enabled2, *_) = inputs
+    nbytes = 0
+    for results, enabled in [
+        (indicator_result, indicator_enabled),
+        (indicator_result2, indicator_enabled2),
+    ]:
+        for k, array in enumerate(results):
+            if enabled[k] and array.shape[0] > 0:
+                nbytes += array.nbytes // array.shape[0]
+    return nbytes
+
+
+def slice_config_chunk(outputs, inputs, conf_count, start, stop):
+    """
+    取出 config [start, stop) 的输入和结果数组视图, 指标结果和临时数组不切片。
+    indicator_index 仍然指向完整的去重后的指标结果。
+    """
+    outputs = tuple(
+        (
+            item[start:stop]
+            if name in config_outputs_name and item.shape[0] == conf_count
+            else item
+        )
+        for name, item in zip(outputs_name, outputs)
+    )
+    inputs = tuple(
+        (
+            item[start:stop]
+            if name in ["backtest_params", "indicator_index", "indicator_index2"]
+            else item
+        )
+        for name, item in zip(inputs_name, inputs)
+    )
+    return outputs, inputs
+
+
+def slice_indicator_chunk(outputs, inputs, start, stop):
+    """
+    取出去重后第 [start, stop) 行指标参数和结果的视图, 用于分块运行 parallel_calc_indicators。
+    参数行数不超过 start 的指标在这一块中禁用, 保留第一行只是为了凑齐元组的类型, 不会被计算。
+    """
+    outputs = list(outputs)
+    inputs = list(inputs)
+    for params_pos, result_pos, enabled_pos in [(3, 2, 5), (4, 3, 6)]:
+        params = inputs[params_pos]
+        results = outputs[result_pos]
+        enabled = inputs[enabled_pos].copy()
+        params_chunk = []
+        results_chunk = []
+        for k in range(len(params)):
+            if enabled[k] and start < params[k].shape[0]:
+                params_chunk.append(params[k][start:stop])
+                results_chunk.append(results[k][start:stop])
+            else:
+                enabled[k] = False
+                params_chunk.append(params[k][:1])
+                results_chunk.append(results[k][:1])
+        inputs[params_pos] = tuple(params_chunk)
+        outputs[result_pos] = tuple(results_chunk)
+        inputs[enabled_pos] = enabled
+    return tuple(outputs), tuple(inputs)
@@ -1,65 +1,256 @@
-global_outputs = []
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
 
+import numpy as np
 
-def find_outputs(lookup_dict, global_outputs, find_key="outputs"):
+default_max_bytes = 1024 * 1024 * 1024  # 结果数组缓存的总字节数上限
+
+
+def _is_leaf(spec):
+    # ArraySpec 和数组都有 shape 和 dtype, 其他元组是嵌套结构
+    return hasattr(spec, "shape") and hasattr(spec, "dtype")
+
+
+def get_spec_key(spec):
+    """
+    把 get_outputs_spec 的结果转换成可哈希的键, 每个数组是 (shape, dtype)。
+    """
+    if _is_leaf(spec):
+        return (tuple(int(i) for i in spec.shape), np.dtype(spec.dtype).str)
+    return tuple(get_spec_key(i) for i in spec)
+
+
+def get_spec_nbytes(key):
+    """
+    get_spec_key 的结果对应的总字节数。
+    """
+    if len(key) == 2 and isinstance(key[1], str):
+        return int(np.prod(key[0], dtype=np.int64)) * np.dtype(key[1]).itemsize
+    return sum(get_spec_nbytes(i) for i in key)
+
+
+def _fits(cached_key, key):
+    """
+    结构和 dtype 都相同, 并且每个数组的每一维都不小于请求的形状时, 可以切片复用。
+    """
+    if len(cached_key) != len(key):
+        return False
+    if len(key) == 2 and isinstance(key[1], str):
+        return (
+            cached_key[1] == key[1]
+            and len(cached_key[0]) == len(key[0])
+            and all(c >= r for c, r in zip(cached_key[0], key[0]))
+        )
+    return all(_fits(c, r) for c, r in zip(cached_key, key))
+
+
+def _slice_outputs(outputs, key):
+    """
+    从较大的数组中切出请求形状的视图, 不拷贝数据, cuda 数组同样适用。
+    """
+    if len(key) == 2 and isinstance(key[1], str):
+        return outputs[tuple(slice(0, n) for n in key[0])]
+    return tuple(_slice_outputs(o, k) for o, k in zip(outputs, key))
+
+
+def slice_outputs(outputs, spec):
+    """
+    从 outputs 中切出 spec (get_outputs_spec 的结果) 形状的视图。
+    """
+    return _slice_outputs(outputs, get_spec_key(spec))
+
+
+def copy_outputs_overlap(src, dst):
+    """
+    把 src 中每个数组和 dst 重叠的部分 (每一维都从 0 开始) 拷贝到 dst, 用于数组变大时保留之前的结果。
+    """
+    if _is_leaf(dst):
+        region = tuple(slice(0, min(a, b)) for a, b in zip(src.shape, dst.shape))
+        dst[region] = src[region]
+        return
+    for s, d in zip(src, dst):
+        copy_outputs_overlap(s, d)
+
+
+class WarmStartState(NamedTuple):
+    """
+    增量计算需要的上一次计算的输入, 和结果数组一起保存在缓存中。
+    key 是除了k线数据之外的所有输入的摘要, 见 get_warm_start_key。
+    """
+
+    key: str
+    tohlcv: np.ndarray
+    tohlcv2: np.ndarray
+    mapping_data: np.ndarray
+
+
+def get_warm_start_key(*args):
+    """
+    参数的摘要, 数组按形状, 类型和内容计算, 其他参数按 repr 计算。
     """
-    根据给定的字典查找并返回 global_outputs 中匹配项的指定键的值，
-    不创建任何字典副本。
+    digest = hashlib.sha1()
+    for arg in args:
+        if isinstance(arg, (tuple, list)):
+            digest.update(get_warm_start_key(*arg).encode())
+        elif isinstance(arg, np.ndarray):
+            digest.update(repr((arg.shape, arg.dtype.str)).encode())
+            digest.update(np.ascontiguousarray(arg).tobytes())
+        else:
+            digest.update(repr(arg).encode())
+    return digest.hexdigest()
 
-    参数:
-    - lookup_dict (dict): 用于查找的字典，不包含 'find_key' 指定的键。
-    - global_outputs (list): 全局列表，其中每个元素都是一个字典。
-    - find_key (str, optional): 默认为 "outputs"，指定要返回的键名。
 
-    返回:
-    - 匹配项的 find_key 对应的值，如果未找到则返回 None。
+class OutputsCache:
     """
-    # 查找字典的键集合
-    lookup_keys = set(lookup_dict.keys())
+    按总字节数限制的 LRU 结果数组缓存, 线程安全。
+
+    acquire 取出的数组在 release 之前不会再被其他调用取到, 并发调用不会共享同一份数组。
+    形状完全相同时直接命中, 否则复用一份结构相同, 每一维都足够大的数组的切片视图。
+    """
+
+    def __init__(self, max_bytes=default_max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.view_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.warm_hits = 0
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # entry_id -> (mode, key, outputs, nbytes, warm_state), 按最近使用排序
+        self._entries = OrderedDict()
+        # (mode, key) -> [entry_id, ...], 用于形状完全相同时 O(1) 查找
+        self._index = {}
+
+    def _pop(self, entry_id):
+        mode, key, outputs, nbytes, warm_state = self._entries.pop(entry_id)
+        ids = self._index[(mode, key)]
+        ids.remove(entry_id)
+        if not ids:
+            del self._index[(mode, key)]
+        self.nbytes -= nbytes
+        return mode, key, outputs, nbytes
+
+    def acquire(self, mode, key):
+        """
+        返回 (outputs, handle), 没有可复用的数组时 outputs 为 None。
+        handle 是缓存中完整的数组, 用完之后传给 release 放回缓存。
+        """
+        with self._lock:
+            ids = self._index.get((mode, key))
+            if ids:
+                _, _, outputs, _ = self._pop(ids[-1])
+                self.hits += 1
+                return outputs, (key, outputs)
+
+            best_id = None
+            best_nbytes = None
+            for entry_id, (_mode, _key, _, nbytes, _) in self._entries.items():
+                if _mode == mode and _fits(_key, key):
+                    if best_nbytes is None or nbytes < best_nbytes:
+                        best_id, best_nbytes = entry_id, nbytes
+
+            if best_id is not None:
+                _, _key, outputs, _ = self._pop(best_id)
+                self.view_hits += 1
+                return _slice_outputs(outputs, key), (_key, outputs)
 
-    # 遍历 global_outputs 中的每一个字典
-    for item in global_outputs:
-        # 获取当前项的键集合，并移除 find_key 以进行比较
-        item_keys = set(item.keys())
-        item_keys.discard(find_key)
+            self.misses += 1
+            return None, None
 
-        # 1. 首先检查键的数量和内容是否完全匹配
-        if lookup_keys != item_keys:
-            continue
+    def acquire_warm(self, mode, key, warm_key):
+        """
+        取出上一次用相同参数 (warm_key) 计算并放回的结果数组, 返回 (outputs, handle, warm_state)。
+        数组足够大时 outputs 是视图, 之前的结果还在原来的位置; 不够大时 outputs 为 None,
+        handle 中是之前的完整数组, 由调用者分配更大的数组并拷贝。
+        没有找到时和 acquire 相同, warm_state 为 None。
+        """
+        with self._lock:
+            for entry_id, entry in reversed(self._entries.items()):
+                _mode, _key, _, _, warm_state = entry
+                if _mode == mode and warm_state is not None and warm_state.key == warm_key:
+                    _, _key, outputs, _ = self._pop(entry_id)
+                    self.warm_hits += 1
+                    if _fits(_key, key):
+                        return _slice_outputs(outputs, key), (_key, outputs), warm_state
+                    return None, (_key, outputs), warm_state
 
-        # 2. 如果键匹配，则逐个检查对应的值是否也匹配
-        match = True
-        for key in lookup_keys:
-            if item.get(key) != lookup_dict.get(key):
-                match = False
-                break
+        outputs, handle = self.acquire(mode, key)
+        return outputs, handle, None
 
-        # 3. 如果所有键和值都匹配，则找到了，返回其 find_key 对应的值
-        if match:
-            return item.get(find_key)
+    def release(self, mode, handle, max_bytes=None, warm_state=None):
+        """
+        把数组放回缓存, 超过 max_bytes 时淘汰最久没有使用的数组。
+        warm_state 是计算这些结果的输入, 用于下一次增量计算, 其他调用取出数组之后就不再保留。
+        """
+        key, outputs = handle
+        nbytes = get_spec_nbytes(key)
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if nbytes > self.max_bytes:
+                return
 
-    # 如果遍历完所有项都未找到匹配，则返回 None
-    return None
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (mode, key, outputs, nbytes, warm_state)
+            self._index.setdefault((mode, key), []).append(entry_id)
+            self.nbytes += nbytes
 
+            while self.nbytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
 
-def get_outputs_from_global(lookup_dict: dict):
-    outputs = find_outputs(lookup_dict, global_outputs, "outputs")
-    return outputs
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "view_hits": self.view_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "warm_hits": self.warm_hits,
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+            }
 
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self.nbytes = 0
 
-def set_outputs_from_global(lookup_dict, outputs, max_size=1):
+
+global_outputs = OutputsCache()
+
+
+def acquire_outputs(mode, spec):
+    """
+    从全局缓存中取出可复用的结果数组, 返回 (outputs, handle)。
     """
-    将新的结果字典添加到全局缓存中，并根据 max_size 进行缓存淘汰。
+    return global_outputs.acquire(mode, get_spec_key(spec))
 
-    参数:
-    - lookup_dict (dict): 用于查找的字典。
-    - outputs: 要缓存的结果对象。
-    - max_size (int, optional): 缓存的最大容量。默认为 MAX_CACHE_SIZE。
+
+def acquire_warm_outputs(mode, spec, warm_key):
+    """
+    从全局缓存中取出上一次相同参数的结果数组, 返回 (outputs, handle, warm_state), 见 OutputsCache.acquire_warm。
     """
-    # 将新的字典添加到全局列表中
-    new_item = {**lookup_dict, "outputs": outputs}
-    global_outputs.append(new_item)
+    return global_outputs.acquire_warm(mode, get_spec_key(spec), warm_key)
+
+
+def release_outputs(mode, handle, max_bytes=default_max_bytes, warm_state=None):
+    """
+    把 acquire_outputs 取出的或者新分配的结果数组放回全局缓存。
+    """
+    global_outputs.release(mode, handle, max_bytes=max_bytes, warm_state=warm_state)
+
+
+def get_outputs_cache_stats():
+    return global_outputs.stats()
+
 
-    # 如果列表超过最大容量，则移除最旧（第一个）的元素
-    if len(global_outputs) > max_size:
-        global_outputs.pop(0)
+def clear_outputs_cache():
+    global_outputs.clear()
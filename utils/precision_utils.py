@@ -0,0 +1,80 @@
+import numpy as np
+
+from src.indicators.indicators_wrapper import indicators_spec
+from src.backtest.calculate_backtest import backtest_result_name
+from src.backtest.calculate_summary import backtest_summary_name
+
+
+def get_precision_columns(result):
+    """
+    把 entry_func 的输出展开成 {列名: float64 数组}, 用于比较 float32 和 float64 模式的结果:
+    - indicator:<结果列名> 和 indicator2:<结果列名>, 按 indicator_index 展开到每个 config, (conf_count, rows)
+    - backtest:<backtest_result_name>, (conf_count, rows)
+    - summary:<backtest_summary_name>, (conf_count,)
+    没有启用的指标不包含在内。
+    """
+    columns = {}
+    for prefix, key, index_key in [
+        ("indicator", "indicator_result", "indicator_index"),
+        ("indicator2", "indicator_result2", "indicator_index2"),
+    ]:
+        for spec in indicators_spec.values():
+            result_array = result[key][spec["id"]]
+            if result_array.shape[1] == 0:
+                continue
+            rows = result_array[result[index_key][:, spec["id"]]]
+            for col, name in enumerate(spec["result_name"]):
+                columns[f"{prefix}:{name}"] = rows[:, :, col].astype(np.float64)
+
+    backtest_result = result["backtest_result"]
+    if backtest_result.shape[0] == result["backtest_summary"].shape[0]:
+        for col, name in enumerate(backtest_result_name):
+            columns[f"backtest:{name}"] = backtest_result[:, :, col].astype(np.float64)
+    for col, name in enumerate(backtest_summary_name):
+        columns[f"summary:{name}"] = result["backtest_summary"][:, col].astype(
+            np.float64
+        )
+    return columns
+
+
+def compare_precision(reference, candidate, threshold=1e-4):
+    """
+    逐列比较两组 get_precision_columns 的结果, 返回每列的偏差:
+    - max_abs: 两边都是有限值的位置上的最大绝对偏差
+    - max_rel: max_abs 除以参考结果的最大绝对值, 和价格的量级无关
+    - nan_mismatch: 只有一边是 NaN (或者 inf 不相同) 的元素数量
+    - mismatch: 偏差超过 threshold 倍参考结果最大绝对值的元素数量, 加上 nan_mismatch
+    - size: 元素总数
+    PSAR 反转这类离散事件在价格和阈值几乎相等时可能在某一根k线上不同, 这时 max_rel 很大,
+    但 mismatch 只有几个元素, 用 mismatch / size 判断偏差是否只是个别的边界情况。
+    只比较两边都有的列。
+    """
+    rows = []
+    for name, ref in reference.items():
+        if name not in candidate:
+            continue
+        cand = candidate[name]
+        both = np.isfinite(ref) & np.isfinite(cand)
+        # 两边都是 NaN 或者相同的 inf 视为相同
+        nan_mismatch = ~both & (ref != cand) & ~(np.isnan(ref) & np.isnan(cand))
+        if both.any():
+            diff = np.abs(ref[both] - cand[both])
+            max_abs = float(np.max(diff))
+            scale = float(np.max(np.abs(ref[both])))
+        else:
+            diff = np.zeros(0)
+            max_abs = 0.0
+            scale = 0.0
+        nan_count = int(np.count_nonzero(nan_mismatch))
+        rows.append(
+            {
+                "name": name,
+                "max_abs": max_abs,
+                "max_rel": max_abs / scale if scale > 0 else max_abs,
+                "nan_mismatch": nan_count,
+                "mismatch": int(np.count_nonzero(diff > threshold * scale))
+                + nan_count,
+                "size": int(ref.size),
+            }
+        )
+    return rows
@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import platform
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path and str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+from utils.json_tool import write_numba_config
+
+bundle_manifest_name = "manifest.json"
+bundle_cache_name = "numba_cache"
+# 可移植的预编译包使用通用的 cpu 指令集, 运行时也必须使用相同的 cpu 名称, 否则缓存不会命中
+portable_cpu_name = "generic"
+
+
+def get_missing_signatures():
+    """
+    返回当前进程中编译时没有命中缓存的 (函数名, 签名), 需要在 compile_lazy_kernels 之后调用。
+    加载了完整的预编译包时应该返回空列表, 否则说明预编译包缺少这些签名, 它们被重新编译了。
+    """
+    from utils.numba_utils import dispatcher_registry
+
+    missing = []
+    for dispatcher, signature in dispatcher_registry:
+        if sum(dispatcher.stats.cache_misses.values()) > 0:
+            missing.append(_get_dispatcher_item(dispatcher, signature))
+    return missing
+
+
+def _get_dispatcher_item(dispatcher, signature):
+    py_func = dispatcher.py_func
+    return {
+        "name": f"{py_func.__module__}.{py_func.__qualname__}",
+        "signature": str(signature),
+        "file": py_func.__code__.co_filename,
+    }
+
+
+def _child_compile():
+    """
+    子进程: 导入整个 parallel_calc 调用链, 按签名编译或从缓存加载, 输出 JSON。
+    """
+    import src.interface  # noqa: F401
+    from utils.numba_utils import compile_lazy_kernels, dispatcher_registry
+
+    compile_lazy_kernels()
+    print(
+        json.dumps(
+            {
+                "compiled": [
+                    _get_dispatcher_item(d, s) for d, s in dispatcher_registry
+                ],
+                "missing": get_missing_signatures(),
+            }
+        )
+    )
+
+
+def _run_child(env):
+    output = subprocess.run(
+        [sys.executable, __file__, "child"],
+        env=env,
+        cwd=root_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    # 导入时可能打印其他信息, 结果在最后一行
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _get_cache_subpath(source_dir):
+    from numba.core.caching import UserProvidedCacheLocator
+
+    # numba 按源文件所在目录的绝对路径生成缓存子目录
+    return UserProvidedCacheLocator.get_suitable_cache_subpath(
+        str(Path(source_dir) / "__init__.py")
+    )
+
+
+def _get_bundle_env(
+    bundle_dir, manifest, enable64, environ=os.environ, cache_dir=None
+):
+    env = dict(environ)
+    write_numba_config(
+        mode=manifest["mode"], cache=True, enable64=enable64, lazy=True, environ=env
+    )
+    if cache_dir is None:
+        cache_dir = Path(bundle_dir) / bundle_cache_name
+    env["NUMBA_CACHE_DIR"] = str(cache_dir)
+    if manifest["cpu_name"]:
+        env["NUMBA_CPU_NAME"] = manifest["cpu_name"]
+    return env
+
+
+def build_bundle(bundle_dir, enable64_list=(True, False), mode="njit", portable=True):
+    """
+    预编译整个 parallel_calc 调用链, 每个 enable64 设置在单独的子进程中编译,
+    所有签名写入同一个 numba 缓存目录, 连同 manifest.json 组成可分发的预编译包。
+
+    - portable: 为 True 时用通用 cpu 指令集编译, 可以在不同型号的 cpu 上加载,
+      为 False 时使用本机的指令集, 只能在相同型号的 cpu 上加载。
+    """
+    bundle_dir = Path(bundle_dir).resolve()
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+
+    import numba
+
+    manifest = {
+        "numba_version": numba.__version__,
+        "python_version": platform.python_version(),
+        "machine": platform.machine(),
+        "mode": mode,
+        "cpu_name": portable_cpu_name if portable else "",
+        "root": str(root_path),
+        "source_dirs": {},
+        "signatures": {},
+    }
+
+    for enable64 in enable64_list:
+        env = _get_bundle_env(bundle_dir, manifest, enable64)
+        result = _run_child(env)
+        manifest["signatures"][str(enable64)] = [
+            {"name": i["name"], "signature": i["signature"]}
+            for i in result["compiled"]
+        ]
+        for i in result["compiled"]:
+            source_dir = Path(i["file"]).parent
+            rel_dir = source_dir.relative_to(root_path).as_posix()
+            manifest["source_dirs"][rel_dir] = _get_cache_subpath(source_dir)
+
+    with open(bundle_dir / bundle_manifest_name, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=4)
+    return manifest
+
+
+def _read_manifest(bundle_dir):
+    """
+    读取预编译包的 manifest, 检查 numba 版本。
+    """
+    with open(Path(bundle_dir) / bundle_manifest_name, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    import numba
+
+    if manifest["numba_version"] != numba.__version__:
+        raise RuntimeError(
+            f"预编译包的 numba 版本 {manifest['numba_version']} 和当前版本 {numba.__version__} 不同"
+        )
+    return manifest
+
+
+def _relocate_cache(manifest, cache_dir):
+    """
+    项目的安装路径和构建时不同时, 重命名 cache_dir 中的缓存子目录以匹配新的路径, 同时更新 manifest。
+    返回 manifest 是否被修改。
+    """
+    if manifest["root"] == str(root_path):
+        return False
+    for rel_dir, old_subpath in manifest["source_dirs"].items():
+        new_subpath = _get_cache_subpath(root_path / rel_dir)
+        if (cache_dir / old_subpath).exists() and not (
+            cache_dir / new_subpath
+        ).exists():
+            (cache_dir / old_subpath).rename(cache_dir / new_subpath)
+        manifest["source_dirs"][rel_dir] = new_subpath
+    manifest["root"] = str(root_path)
+    return True
+
+
+def _prepare_bundle(bundle_dir):
+    """
+    检查 numba 版本, 项目的安装路径和构建时不同时, 重命名缓存子目录以匹配新的路径。
+    """
+    bundle_dir = Path(bundle_dir).resolve()
+    manifest = _read_manifest(bundle_dir)
+    if _relocate_cache(manifest, bundle_dir / bundle_cache_name):
+        with open(bundle_dir / bundle_manifest_name, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=4)
+    return manifest
+
+
+def load_bundle(bundle_dir):
+    """
+    使用预编译包, 必须在导入 src 下的模块之前调用, 之后的编译都会从预编译包的缓存中加载。
+    预编译包的目录需要可写, numba 加载缓存时会检查缓存目录是否可写。
+    """
+    import numba
+
+    manifest = _prepare_bundle(bundle_dir)
+    cache_dir = Path(bundle_dir).resolve() / bundle_cache_name
+    os.environ["NUMBA_CACHE_DIR"] = str(cache_dir)
+    if manifest["cpu_name"]:
+        os.environ["NUMBA_CPU_NAME"] = manifest["cpu_name"]
+    # numba 在导入时读取环境变量, 已经导入时需要重新读取
+    numba.core.config.reload_config()
+    return manifest
+
+
+def check_bundle(bundle_dir):
+    """
+    在新的子进程中加载预编译包, 返回每个 enable64 设置下缺少的签名, 全部为空列表表示预编译包完整。
+    子进程使用预编译包缓存的临时副本, 缺少的签名编译后只写入副本, 检查不修改预编译包。
+    """
+    bundle_dir = Path(bundle_dir).resolve()
+    manifest = _read_manifest(bundle_dir)
+    report = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = Path(temp_dir) / bundle_cache_name
+        shutil.copytree(bundle_dir / bundle_cache_name, cache_dir)
+        _relocate_cache(manifest, cache_dir)
+        for enable64 in manifest["signatures"]:
+            env = _get_bundle_env(
+                bundle_dir, manifest, enable64 == "True", cache_dir=cache_dir
+            )
+            result = _run_child(env)
+
+            expected = {
+                (i["name"], i["signature"]) for i in manifest["signatures"][enable64]
+            }
+            missing = result["missing"] + [
+                i
+                for i in result["compiled"]
+                if (i["name"], i["signature"]) not in expected
+                and i not in result["missing"]
+            ]
+            report[enable64] = missing
+    return report
+
+
+def main(
+    command: str,
+    bundle_dir: str = "numba_bundle",
+    enable64: str = "True,False",
+    mode: str = "njit",
+    portable: bool = True,
+):
+    """
+    command: build 构建预编译包, check 检查预编译包是否缺少签名
+    """
+    if command == "child":
+        _child_compile()
+    elif command == "build":
+        enable64_list = [i.strip() == "True" for i in enable64.split(",")]
+        manifest = build_bundle(bundle_dir, enable64_list, mode, portable)
+        for k, v in manifest["signatures"].items():
+            print(f"enable64={k}: {len(v)} 个签名")
+    elif command == "check":
+        report = check_bundle(bundle_dir)
+        for k, v in report.items():
+            print(f"enable64={k}: 缺少 {len(v)} 个签名")
+            for i in v:
+                print(f"  {i['name']} {i['signature']}")
+        if any(report.values()):
+            raise SystemExit(1)
+    else:
+        raise ValueError(f"Invalid command: {command}")
+
+
+if __name__ == "__main__":
+    import typer
+
+    app = typer.Typer(pretty_exceptions_show_locals=False)
+    app.command()(main)
+    app()
@@ -0,0 +1,145 @@
+from enum import IntEnum
+
+import numba as nb
+import numpy as np
+from llvmlite import ir
+from numba.core import cgutils
+from numba.extending import intrinsic, register_jitable
+
+from utils.numba_params import nb_params
+
+# 只有 normal/njit 模式支持阶段计时, 关闭时计数数组的类型是 none, 计时代码在编译时被剪掉
+profile_enabled = nb_params.get("profile", False) and nb_params["mode"] in [
+    "normal",
+    "njit",
+]
+profile_counters_type = nb.int64[:, :, :] if profile_enabled else nb.types.none
+
+
+class ProfileStage(IntEnum):
+    """
+    profile_counters 第二维的下标, indicator 之后依次是 tohlcv 和 tohlcv2 的每个指标。
+    """
+
+    init_data = 0
+    signal = 1
+    backtest = 2
+    trades = 3
+    pack_signal = 4
+    indicator = 5
+
+
+@intrinsic
+def read_cycle_counter(typingctx):
+    """
+    读取 cpu 的时钟周期计数器 (llvm.readcyclecounter), 不支持的平台上返回 0。
+    """
+    sig = nb.types.int64()
+
+    def codegen(context, builder, signature, args):
+        fnty = ir.FunctionType(ir.IntType(64), [])
+        fn = cgutils.get_or_insert_function(builder.module, fnty, "llvm.readcyclecounter")
+        return builder.call(fn, [])
+
+    return sig, codegen
+
+
+# profile_start/profile_stop 需要同时接受数组和 None, 不能用 nb_wrapper 固定签名,
+# 用 register_jitable 在调用者中按参数类型内联, None 时分支在编译时被剪掉
+@register_jitable
+def profile_start(profile_counters):
+    if profile_counters is None:
+        return 0
+    return read_cycle_counter()
+
+
+@register_jitable
+def profile_stop(profile_counters, slot, stage, start):
+    """
+    把 start 到现在的时钟周期累加到 profile_counters[slot, stage], 次数加 1。
+    返回当前的时钟周期, 可以直接作为下一个阶段的 start。
+    """
+    if profile_counters is None:
+        return 0
+    end = read_cycle_counter()
+    profile_counters[slot, stage, 0] += end - start
+    profile_counters[slot, stage, 1] += 1
+    return end
+
+
+def get_profile_stage_names():
+    from src.indicators.indicators_wrapper import indicators_spec
+
+    names = [i.name for i in ProfileStage if i != ProfileStage.indicator]
+    for prefix in ["indicator", "indicator2"]:
+        names += [f"{prefix}:{name}" for name in indicators_spec]
+    return names
+
+
+def create_profile_counters(slot_count):
+    """
+    分配 (slot_count, stage_count, 2) 的计数数组, 最后一维是 (时钟周期, 次数),
+    每个工作线程只写自己的 slot, 不需要原子操作。关闭时返回 None。
+    """
+    if not profile_enabled:
+        return None
+    return np.zeros((slot_count, len(get_profile_stage_names()), 2), dtype=np.int64)
+
+
+class TimingReport:
+    """
+    entry_func 的结构化耗时报告, 代替分散的 print。
+
+    - timings: 主机端各阶段的耗时 (秒): plan, allocation, kernel, transfer
+    - outputs_reused: 是否复用了缓存中的结果数组
+    - warm_start: 增量计算时重新计算的起始k线 (start, start2), 完整计算时为 None
+    - chunk_count: 结果写入内存映射文件 (output_dir) 时回测阶段分块的数量, 否则为 None
+    - counters: 开启 NUMBA_QUANT_PROFILE 时内核中每个工作线程, 每个阶段的 (时钟周期, 次数),
+      形状 (slot_count, stage_count, 2), 阶段名称见 stage_names, 关闭时为 None
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.outputs_reused = False
+        self.warm_start = None
+        self.chunk_count = None
+        self.counters = None
+        self.stage_names = get_profile_stage_names()
+
+    def stage_totals(self):
+        """
+        所有工作线程合计的 {阶段: (时钟周期, 次数)}, 没有运行过的阶段不包含在内。
+        """
+        if self.counters is None:
+            return {}
+        totals = self.counters.sum(axis=0)
+        return {
+            name: (int(totals[i, 0]), int(totals[i, 1]))
+            for i, name in enumerate(self.stage_names)
+            if totals[i, 1] > 0
+        }
+
+    def to_dict(self):
+        return {
+            "timings": dict(self.timings),
+            "outputs_reused": self.outputs_reused,
+            "warm_start": self.warm_start,
+            "chunk_count": self.chunk_count,
+            "stages": {
+                k: {"cycles": c, "count": n} for k, (c, n) in self.stage_totals().items()
+            },
+        }
+
+    def __str__(self):
+        lines = [f"{k}: {v:.6f} 秒" for k, v in self.timings.items()]
+        lines.append(f"outputs_reused: {self.outputs_reused}")
+        if self.warm_start is not None:
+            lines.append(f"warm_start: {self.warm_start}")
+        if self.chunk_count is not None:
+            lines.append(f"chunk_count: {self.chunk_count}")
+        totals = self.stage_totals()
+        all_cycles = sum(c for c, _ in totals.values())
+        for name, (cycles, count) in totals.items():
+            share = cycles / all_cycles * 100 if all_cycles > 0 else 0.0
+            lines.append(f"{name}: {cycles} cycles, {count} 次, {share:.1f}%")
+        return "\n".join(lines)
@@ -0,0 +1,103 @@
+import numpy as np
+import numba as nb
+
+from utils.numba_utils import nb_wrapper, compile_lazy_kernels
+from utils.numba_params import nb_params
+from utils.data_types import get_numba_data_types
+from utils.config_utils import get_bar_duration, ensure_c_contiguous
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+default_dtype_dict = get_numba_data_types(enable64=True)
+
+# 重采样在主机上运行, 输出的 tohlcv2 再和 tohlcv 一起传给引擎, cuda 模式下也用 njit 编译
+host_mode = "normal" if nb_params["mode"] == "normal" else "njit"
+
+signature = nb_int_type(
+    nb_float_type[:, :],  # tohlcv
+    nb_float_type,  # interval
+    nb_float_type,  # interval2
+    nb_float_type[:, :],  # tohlcv2
+    nb_int_type[:],  # mapping_data
+)
+
+
+@nb_wrapper(
+    mode=host_mode,
+    signature=signature,
+    cache_enabled=nb_params.get("cache", True),
+)
+def resample_tohlcv_kernel(tohlcv, interval, interval2, tohlcv2, mapping_data):
+    """
+    单次遍历, 把 tohlcv 按 interval2 的时间桶合成大周期k线, 同时写入 mapping_data。
+    时间桶按 time 对齐到 interval2 的整数倍, 和交易所的k线开盘时间一致。
+    每个桶: time 取桶的开始时间, open 取第一根, high 取最大, low 取最小, close 取最后一根, volume 求和。
+    mapping_data[i] 是第 i 根k线收盘时最后一根已收盘的大周期k线, 没有时为 -1。
+    tohlcv2 的行数不能少于 tohlcv, 返回实际的大周期k线数量。
+    """
+    k = -1
+    bucket_start = 0.0
+    for i in range(tohlcv.shape[0]):
+        t = tohlcv[i, 0]
+        start = np.floor(t / interval2) * interval2
+
+        if k < 0 or start != bucket_start:
+            k += 1
+            bucket_start = start
+            tohlcv2[k, 0] = start
+            tohlcv2[k, 1] = tohlcv[i, 1]
+            tohlcv2[k, 2] = tohlcv[i, 2]
+            tohlcv2[k, 3] = tohlcv[i, 3]
+            tohlcv2[k, 4] = tohlcv[i, 4]
+            tohlcv2[k, 5] = tohlcv[i, 5]
+        else:
+            if tohlcv[i, 2] > tohlcv2[k, 2]:
+                tohlcv2[k, 2] = tohlcv[i, 2]
+            if tohlcv[i, 3] < tohlcv2[k, 3]:
+                tohlcv2[k, 3] = tohlcv[i, 3]
+            tohlcv2[k, 4] = tohlcv[i, 4]
+            tohlcv2[k, 5] += tohlcv[i, 5]
+
+        # 当前k线收盘时, 当前桶也收盘了才能使用当前桶, 否则只能用上一个桶, 避免未来函数
+        if t + interval >= bucket_start + interval2:
+            mapping_data[i] = k
+        else:
+            mapping_data[i] = k - 1
+
+    return k + 1
+
+
+def resample_tohlcv(tohlcv, multiple, dtype_dict=default_dtype_dict, interval_ms=None):
+    """
+    从基础周期的 tohlcv 生成大周期的 tohlcv2 和 mapping_data, 不需要再加载第二个 csv。
+
+    参数:
+    - multiple: 大周期是基础周期的整数倍, 例如 15m -> 4h 是 16。
+    - interval_ms: 基础周期 (毫秒), 为 None 时用 get_bar_duration 推断, 少于 2 根k线时必须传入。
+
+    返回:
+    - (tohlcv2, mapping_data), mapping_data 和 get_mapping_data 的规则一致。
+    """
+    if int(multiple) != multiple or multiple < 1:
+        raise ValueError(f"multiple 必须是正整数: {multiple}")
+
+    np_int_type = dtype_dict["np"]["int"]
+    np_float_type = dtype_dict["np"]["float"]
+
+    tohlcv = ensure_c_contiguous(np.asarray(tohlcv, dtype=np_float_type))
+    tohlcv2 = np.empty(tohlcv.shape, dtype=np_float_type)
+    mapping_data = np.empty(tohlcv.shape[0], dtype=np_int_type)
+    if tohlcv.shape[0] == 0:
+        return tohlcv2, mapping_data
+
+    interval = get_bar_duration(tohlcv[:, 0], interval_ms)
+    interval2 = interval * int(multiple)
+
+    compile_lazy_kernels()
+    count = resample_tohlcv_kernel(
+        tohlcv, np_float_type(interval), np_float_type(interval2), tohlcv2, mapping_data
+    )
+    return ensure_c_contiguous(tohlcv2[:count].copy()), mapping_data
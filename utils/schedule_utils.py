@@ -0,0 +1,182 @@
+import numpy as np
+import numba as nb
+
+from src.indicators.indicators_wrapper import indicators_spec
+from src.backtest.calculate_backtest import default_backtest_params
+
+from utils.numba_params import nb_params
+from utils.data_types import get_numba_data_types
+from utils.numba_utils import nb_wrapper
+
+dtype_dict = get_numba_data_types(nb_params.get("enable64", True))
+nb_int_type = dtype_dict["nb"]["int"]
+nb_float_type = dtype_dict["nb"]["float"]
+nb_bool_type = dtype_dict["nb"]["bool"]
+
+backtest_params_name = list(default_backtest_params.keys())
+
+# 信号和回测阶段每个 config 的相对计算量: 基础为 1, 启用任意离场方式后每根k线都要检查离场条件。
+# 实测 (40000 根k线) 单独启用每个开关多 8%~21%, 全部启用和只启用一个差不多, 所以不按开关数量累加。
+exit_enable_name = [
+    "pct_sl_enable",
+    "pct_tp_enable",
+    "pct_tsl_enable",
+    "atr_sl_enable",
+    "atr_tp_enable",
+    "atr_tsl_enable",
+    "psar_enable",
+]
+exit_enable_cost = 0.2
+
+
+# 调度只用于 cpu 模式的 prange, cuda 模式仍然按线程号轮流分配
+if nb_params["mode"] in ["normal", "njit"]:
+    signature = nb.void(nb.float64[:], nb_int_type[:], nb.float64[:], nb_int_type[:])
+
+    @nb_wrapper(
+        mode=nb_params["mode"],
+        signature=signature,
+        cache_enabled=nb_params.get("cache", True),
+    )
+    def assign_slots(cost, order, load, assignment):
+        """
+        最长处理时间优先 (LPT) 的贪心分配: 按 order (计算量从大到小) 依次把任务分给当前总计算量最小的 slot。
+        load 的长度是 slot 数量, 初始为 0, assignment[task] 写入任务分到的 slot。
+        """
+        slot_count = load.shape[0]
+        for i in range(order.shape[0]):
+            task = order[i]
+            best = 0
+            for slot in range(1, slot_count):
+                if load[slot] < load[best]:
+                    best = slot
+            assignment[task] = best
+            load[best] += cost[task]
+
+else:
+    assign_slots = None
+
+
+def get_schedule(cost, slot_count, cost_aware=True, np_int_type=np.int64):
+    """
+    把 len(cost) 个任务分给 slot_count 个工作线程, 返回 (order, offsets):
+    第 slot 个工作线程依次处理 order[offsets[slot]:offsets[slot + 1]] 中的任务, 同一个 slot 内按任务下标升序。
+
+    cost_aware=True 时按 cost 用 assign_slots 分配, 使每个 slot 的总计算量接近;
+    否则轮流分配 (task = slot, slot + slot_count, ...)。任务数不超过 slot_count 时两者相同。
+    """
+    task_count = cost.shape[0]
+    if cost_aware and 1 < slot_count < task_count:
+        cost = np.ascontiguousarray(cost, dtype=np.float64)
+        assignment = np.empty(task_count, dtype=np_int_type)
+        assign_slots(
+            cost,
+            np.argsort(-cost, kind="stable").astype(np_int_type),
+            np.zeros(slot_count, dtype=np.float64),
+            assignment,
+        )
+    else:
+        assignment = np.arange(task_count, dtype=np_int_type) % slot_count
+
+    order = np.argsort(assignment, kind="stable").astype(np_int_type)
+    offsets = np.zeros(slot_count + 1, dtype=np_int_type)
+    offsets[1:] = np.cumsum(np.bincount(assignment, minlength=slot_count))
+    return order, offsets
+
+
+def get_config_cost(backtest_params):
+    """
+    每个 config 在信号和回测阶段的相对计算量, 见 exit_enable_cost。
+    """
+    columns = [backtest_params_name.index(i) for i in exit_enable_name]
+    exit_enabled = (backtest_params[:, columns] != 0).any(axis=1)
+    return 1.0 + exit_enable_cost * exit_enabled
+
+
+def get_indicator_tasks(
+    indicator_params, indicator_params2, indicator_enabled, indicator_enabled2
+):
+    """
+    指标阶段的任务列表 (task_count, 3), 每行是 (timeframe, 指标id, 去重后的参数行),
+    和每个任务的相对计算量, 见 indicators_spec 的 cost。
+    """
+    tasks = [np.zeros((0, 3), dtype=np.int64)]
+    cost = [np.zeros(0)]
+    for timeframe, (params, enabled) in enumerate(
+        [
+            (indicator_params, indicator_enabled),
+            (indicator_params2, indicator_enabled2),
+        ]
+    ):
+        for spec in indicators_spec.values():
+            _id = spec["id"]
+            if not enabled[_id]:
+                continue
+            row_count = params[_id].shape[0]
+            task = np.empty((row_count, 3), dtype=np.int64)
+            task[:, 0] = timeframe
+            task[:, 1] = _id
+            task[:, 2] = np.arange(row_count)
+            tasks.append(task)
+            cost.append(spec["cost"](params[_id]))
+    return np.concatenate(tasks), np.concatenate(cost).astype(np.float64)
+
+
+def get_indicator_schedule(
+    indicator_params,
+    indicator_params2,
+    indicator_enabled,
+    indicator_enabled2,
+    slot_count,
+    cost_aware=True,
+    np_int_type=np.int64,
+):
+    """
+    parallel_calc_indicators 的任务分配, 参数是去重后的指标参数。
+    返回 (indicator_tasks, indicator_offsets), indicator_tasks 已经按 slot 排好,
+    第 slot 个工作线程处理第 indicator_offsets[slot] 到 indicator_offsets[slot + 1] 行的任务。
+    """
+    tasks, cost = get_indicator_tasks(
+        indicator_params, indicator_params2, indicator_enabled, indicator_enabled2
+    )
+    order, indicator_offsets = get_schedule(cost, slot_count, cost_aware, np_int_type)
+    return np.ascontiguousarray(tasks[order], dtype=np_int_type), indicator_offsets
+
+
+def get_config_schedule(
+    backtest_params, slot_count, cost_aware=True, np_int_type=np.int64
+):
+    """
+    parallel_calc 的任务分配, 返回 (config_order, config_offsets), 见 get_schedule。
+    """
+    return get_schedule(
+        get_config_cost(backtest_params), slot_count, cost_aware, np_int_type
+    )
+
+
+def get_kernel_schedule(
+    indicator_params,
+    indicator_params2,
+    indicator_enabled,
+    indicator_enabled2,
+    backtest_params,
+    slot_count,
+    cost_aware=True,
+    np_int_type=np.int64,
+):
+    """
+    返回 (indicator_tasks, indicator_offsets, config_order, config_offsets),
+    见 get_indicator_schedule 和 get_config_schedule。
+    """
+    return (
+        *get_indicator_schedule(
+            indicator_params,
+            indicator_params2,
+            indicator_enabled,
+            indicator_enabled2,
+            slot_count,
+            cost_aware,
+            np_int_type,
+        ),
+        *get_config_schedule(backtest_params, slot_count, cost_aware, np_int_type),
+    )